@@ -10,6 +10,8 @@ from app.models.offer import Offer  # noqa: F401
 from app.models.application import Application  # noqa: F401
 from app.models.candidate import Candidate  # noqa: F401
 from app.models.cv_text import CVText  # noqa: F401
+from app.models.embedding import TextEmbedding  # noqa: F401
+from app.models.application_score import ApplicationScoreResult  # noqa: F401
 
 # Alembic Config
 config = context.config
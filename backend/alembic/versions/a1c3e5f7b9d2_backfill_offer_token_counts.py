@@ -0,0 +1,62 @@
+"""Backfill offers.token_counts for offers created before f3b5d7e9a1c2
+
+Revision ID: a1c3e5f7b9d2
+Revises: f9b1d3e5a7c0
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+import re
+from collections import Counter
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c3e5f7b9d2'
+down_revision: Union[str, Sequence[str], None] = 'f9b1d3e5a7c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Même comptage que app.services.token_counts.count_tokens (figé ici)
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+BATCH_SIZE = 500
+
+offers = sa.table(
+    'offers',
+    sa.column('id', sa.Integer),
+    sa.column('description', sa.Text),
+    sa.column('token_counts', sa.JSON),
+)
+
+
+def _count_tokens(text):
+    return dict(Counter(WORD_RE.findall(text.lower()))) if text else {}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(offers.c.id, offers.c.description)
+            .where(offers.c.token_counts.is_(None), offers.c.id > last_id)
+            .order_by(offers.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for offer_id, description in rows:
+            bind.execute(
+                offers.update().where(offers.c.id == offer_id)
+                .values(token_counts=_count_tokens(description))
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Données seulement : les comptes restent valides, rien à annuler
+    pass
@@ -0,0 +1,39 @@
+"""Stage hashes on parsed CVs (idempotent parse / score tasks)
+
+Revision ID: a2c4e6f8b0d3
+Revises: f3b5d7e9a1c2
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c4e6f8b0d3'
+down_revision: Union[str, Sequence[str], None] = 'f3b5d7e9a1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_parsed_cvs() -> bool:
+    # parsed_cvs est créée par seed_database (create_all), pas par une migration
+    return sa.inspect(op.get_bind()).has_table('parsed_cvs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_parsed_cvs():
+        return
+    op.add_column('parsed_cvs', sa.Column('source_hash', sa.String(length=64), nullable=True))
+    op.add_column('parsed_cvs', sa.Column('score_inputs_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _has_parsed_cvs():
+        return
+    op.drop_column('parsed_cvs', 'score_inputs_hash')
+    op.drop_column('parsed_cvs', 'source_hash')
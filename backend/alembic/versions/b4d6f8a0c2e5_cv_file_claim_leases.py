@@ -0,0 +1,41 @@
+"""Processing leases on cv_files (SKIP LOCKED claiming, stalled rows reaper)
+
+Revision ID: b4d6f8a0c2e5
+Revises: a2c4e6f8b0d3
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d6f8a0c2e5'
+down_revision: Union[str, Sequence[str], None] = 'a2c4e6f8b0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cv_files', sa.Column('claimed_by', sa.String(length=255), nullable=True))
+    op.add_column('cv_files', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('cv_files', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    # Index partiel : seules les lignes à prendre ou en cours sont parcourues par le claim / reaper
+    op.create_index(
+        'ix_cv_files_claimable',
+        'cv_files',
+        ['status', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status IN ('UPLOADED', 'EXTRACTING')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cv_files_claimable', table_name='cv_files')
+    op.drop_column('cv_files', 'attempts')
+    op.drop_column('cv_files', 'lease_expires_at')
+    op.drop_column('cv_files', 'claimed_by')
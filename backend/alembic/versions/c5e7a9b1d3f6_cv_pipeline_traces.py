@@ -0,0 +1,62 @@
+"""Per-run CV pipeline traces (queue wait, stage durations, OCR pages, cache hits)
+
+Revision ID: c5e7a9b1d3f6
+Revises: b4d6f8a0c2e5
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a9b1d3f6'
+down_revision: Union[str, Sequence[str], None] = 'b4d6f8a0c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cv_pipeline_traces',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.String(length=64), nullable=False),
+        sa.Column('cv_file_id', sa.Integer(), nullable=True),
+        sa.Column('application_id', sa.Integer(), nullable=True),
+        sa.Column('mime_type', sa.String(length=100), nullable=True),
+        sa.Column('lane', sa.String(length=20), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('queue_wait_ms', sa.Float(), nullable=False),
+        sa.Column('extract_ms', sa.Float(), nullable=True),
+        sa.Column('parse_ms', sa.Float(), nullable=True),
+        sa.Column('score_ms', sa.Float(), nullable=True),
+        sa.Column('total_ms', sa.Float(), nullable=True),
+        sa.Column('page_count', sa.Integer(), nullable=True),
+        sa.Column('ocr_pages', sa.Integer(), nullable=True),
+        sa.Column('cache_hits', sa.JSON(), nullable=False),
+        sa.Column('retries', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['cv_file_id'], ['cv_files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('run_id'),
+    )
+    op.create_index(op.f('ix_cv_pipeline_traces_id'), 'cv_pipeline_traces', ['id'], unique=False)
+    op.create_index(op.f('ix_cv_pipeline_traces_cv_file_id'), 'cv_pipeline_traces', ['cv_file_id'], unique=False)
+    op.create_index(
+        op.f('ix_cv_pipeline_traces_application_id'), 'cv_pipeline_traces', ['application_id'], unique=False
+    )
+    op.create_index(op.f('ix_cv_pipeline_traces_created_at'), 'cv_pipeline_traces', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cv_pipeline_traces_created_at'), table_name='cv_pipeline_traces')
+    op.drop_index(op.f('ix_cv_pipeline_traces_application_id'), table_name='cv_pipeline_traces')
+    op.drop_index(op.f('ix_cv_pipeline_traces_cv_file_id'), table_name='cv_pipeline_traces')
+    op.drop_index(op.f('ix_cv_pipeline_traces_id'), table_name='cv_pipeline_traces')
+    op.drop_table('cv_pipeline_traces')
@@ -0,0 +1,47 @@
+"""Persisted application scores and CV text content hash
+
+Revision ID: d4e8b1c3a7f2
+Revises: c1a7e5d2f901
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e8b1c3a7f2'
+down_revision: Union[str, Sequence[str], None] = 'c1a7e5d2f901'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cv_texts', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_table('application_scores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('application_id', sa.Integer(), nullable=False),
+    sa.Column('cv_hash', sa.String(length=64), nullable=False),
+    sa.Column('offer_hash', sa.String(length=64), nullable=False),
+    sa.Column('scorer_version', sa.String(length=255), nullable=False),
+    sa.Column('keyword_overlap', sa.Integer(), nullable=False),
+    sa.Column('tfidf', sa.Float(), nullable=False),
+    sa.Column('semantic', sa.Float(), nullable=True),
+    sa.Column('combined_score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['application_id'], ['applications.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_application_scores_id'), 'application_scores', ['id'], unique=False)
+    op.create_index(op.f('ix_application_scores_application_id'), 'application_scores', ['application_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_application_scores_application_id'), table_name='application_scores')
+    op.drop_index(op.f('ix_application_scores_id'), table_name='application_scores')
+    op.drop_table('application_scores')
+    op.drop_column('cv_texts', 'content_hash')
@@ -0,0 +1,54 @@
+"""Version stamps on extraction, parsing and scoring outputs
+
+Revision ID: d6f8a0b2c4e7
+Revises: c5e7a9b1d3f6
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f8a0b2c4e7'
+down_revision: Union[str, Sequence[str], None] = 'c5e7a9b1d3f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_parsed_cvs() -> bool:
+    # parsed_cvs est créée par seed_database (create_all), pas par une migration
+    return sa.inspect(op.get_bind()).has_table('parsed_cvs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cv_texts', sa.Column('extractor_version', sa.Integer(), nullable=True))
+    # Versions entières : "version < courante OR NULL" est un parcours d'index
+    # (app.tools.backfill ne lit que les lignes obsolètes)
+    op.create_index(
+        'ix_cv_texts_extractor_version', 'cv_texts', ['extractor_version', 'application_id'], unique=False
+    )
+    if not _has_parsed_cvs():
+        return
+    op.add_column('parsed_cvs', sa.Column('parser_version', sa.Integer(), nullable=True))
+    op.add_column('parsed_cvs', sa.Column('scorer_version', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_parsed_cvs_parser_version', 'parsed_cvs', ['parser_version', 'application_id'], unique=False
+    )
+    op.create_index(
+        'ix_parsed_cvs_scorer_version', 'parsed_cvs', ['scorer_version', 'application_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _has_parsed_cvs():
+        op.drop_index('ix_parsed_cvs_scorer_version', table_name='parsed_cvs')
+        op.drop_index('ix_parsed_cvs_parser_version', table_name='parsed_cvs')
+        op.drop_column('parsed_cvs', 'scorer_version')
+        op.drop_column('parsed_cvs', 'parser_version')
+    op.drop_index('ix_cv_texts_extractor_version', table_name='cv_texts')
+    op.drop_column('cv_texts', 'extractor_version')
@@ -0,0 +1,28 @@
+"""Per-offer CVScorer weight overrides
+
+Revision ID: e7f2a9c4b6d1
+Revises: d4e8b1c3a7f2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f2a9c4b6d1'
+down_revision: Union[str, Sequence[str], None] = 'd4e8b1c3a7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('offers', sa.Column('scoring_weights', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('offers', 'scoring_weights')
@@ -0,0 +1,37 @@
+"""cv_texts.quality_score as a 0..1 float
+
+Revision ID: e8a0c2d4f6b8
+Revises: d6f8a0b2c4e7
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a0c2d4f6b8'
+down_revision: Union[str, Sequence[str], None] = 'd6f8a0b2c4e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # L'extracteur produit un ratio 0..1 : la colonne entière l'arrondissait à 0 ou 1.
+    # Les valeurs existantes (0 / 1) restent dans l'échelle.
+    op.alter_column(
+        'cv_texts', 'quality_score',
+        existing_type=sa.Integer(), type_=sa.Float(), existing_nullable=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'cv_texts', 'quality_score',
+        existing_type=sa.Float(), type_=sa.Integer(), existing_nullable=True,
+        postgresql_using='round(quality_score)::integer',
+    )
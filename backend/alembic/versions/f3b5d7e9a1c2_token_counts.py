@@ -0,0 +1,30 @@
+"""Persisted token counts for CV texts and offer descriptions
+
+Revision ID: f3b5d7e9a1c2
+Revises: e7f2a9c4b6d1
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b5d7e9a1c2'
+down_revision: Union[str, Sequence[str], None] = 'e7f2a9c4b6d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cv_texts', sa.Column('token_counts', sa.JSON(), nullable=True))
+    op.add_column('offers', sa.Column('token_counts', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('offers', 'token_counts')
+    op.drop_column('cv_texts', 'token_counts')
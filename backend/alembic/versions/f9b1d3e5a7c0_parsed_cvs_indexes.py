@@ -0,0 +1,47 @@
+"""Indexes on parsed_cvs stage hash and version columns
+
+Revision ID: f9b1d3e5a7c0
+Revises: e8a0c2d4f6b8
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9b1d3e5a7c0'
+down_revision: Union[str, Sequence[str], None] = 'e8a0c2d4f6b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Déclarés aussi dans ParsedCV.__table_args__ : une table créée par create_all
+# (seed_database) après d6f8a0b2c4e7 les a déjà
+INDEXES = {
+    'ix_parsed_cvs_source_hash': ['source_hash'],
+    'ix_parsed_cvs_parser_version': ['parser_version', 'application_id'],
+    'ix_parsed_cvs_scorer_version': ['scorer_version', 'application_id'],
+}
+
+
+def _existing_indexes() -> set:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('parsed_cvs'):
+        return set(INDEXES)  # rien à faire : create_all créera table et index
+    return {index['name'] for index in inspector.get_indexes('parsed_cvs')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = _existing_indexes()
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'parsed_cvs', columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if sa.inspect(op.get_bind()).has_table('parsed_cvs'):
+        op.drop_index('ix_parsed_cvs_source_hash', table_name='parsed_cvs')
@@ -1,4 +1,6 @@
 # backend/app/api/v1/applications.py
+import time
+import uuid
 from typing import List, Optional
 from fastapi import (
     APIRouter,
@@ -8,6 +10,7 @@ from fastapi import (
     File,
     Form,
     Query,
+    Response,
     status,
 )
 from sqlalchemy.orm import Session, joinedload
@@ -21,8 +24,10 @@ from app.models.cv_file import CVFile, CVFileStatus
 from app.schemas.application import ApplicationRead
 from app.core.auth import require_role
 from app.models.user import UserRole, User
+from app.services import backlog, inline_extraction, pipeline_events, pipeline_traces
 from app.services.storage import save_cv_file_to_disk
-from app.workers.tasks import process_cv_file
+from app.workers.celery_app import queue_lane
+from app.workers.tasks import enqueue_cv_pipeline, enqueue_cv_scoring
 
 router = APIRouter(prefix="/applications", tags=["applications"])
 
@@ -132,6 +137,7 @@ def get_application_by_id(
 )
 def create_application_with_cv(
     offer_id: int,
+    response: Response,
     full_name: str = Form(...),
     email: str | None = Form(None),
     phone: str | None = Form(None),
@@ -162,25 +168,48 @@ def create_application_with_cv(
             detail=f"Unsupported file type: {file.content_type}",
         )
 
-    # 3) Créer le candidat
+    # Contrôle d'admission selon le backlog des workers (cf. services.backlog)
+    admission = backlog.admit_upload()
+    if admission.action == backlog.REJECT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="CV processing backlog is full, retry later",
+            headers={"Retry-After": str(admission.retry_after)},
+        )
+    deferred = admission.action == backlog.DEFER
+
+    # 3) Sauvegarder le fichier ; DOCX / PDF texte : extraction inline
+    #    (budget court, sans OCR), sinon par la file cv_extract. Avant toute
+    #    écriture en base : pas de lignes insérées en attente pendant l'extraction
+    storage_path, size_bytes, sha256 = save_cv_file_to_disk(file)
+    pipeline_started_at = time.time()
+    extracted = None
+    if not deferred:
+        started = time.perf_counter()
+        extracted = inline_extraction.try_extract(storage_path, file.content_type, size_bytes)
+        extract_ms = (time.perf_counter() - started) * 1000
+
+    # 4) Créer le candidat
     candidate = Candidate(full_name=full_name, email=email, phone=phone)
     db.add(candidate)
     db.flush()
 
-    # 4) Créer la candidature
+    # 5) Créer la candidature
     application = Application(offer_id=offer.id, candidate_id=candidate.id)
     db.add(application)
     db.flush()
 
-    # 5) Créer l'entrée CVText
+    # 6) Créer l'entrée CVText (texte déjà extrait le cas échéant)
     cv_text = CVText(
         application_id=application.id,
         status="PENDING",
     )
     db.add(cv_text)
-
-    # 6) Sauvegarder le fichier
-    storage_path, size_bytes, sha256 = save_cv_file_to_disk(file)
+    if extracted is not None:
+        inline_extraction.store(cv_text, extracted)
+        file_status = CVFileStatus.EXTRACTED
+    else:
+        file_status = CVFileStatus.DEFERRED if deferred else CVFileStatus.UPLOADED
     cv_file = CVFile(
         application_id=application.id,
         storage_path=storage_path,
@@ -188,7 +217,7 @@ def create_application_with_cv(
         mime_type=file.content_type,
         size_bytes=size_bytes,
         sha256=sha256,
-        status=CVFileStatus.UPLOADED.value,
+        status=file_status.value,
     )
     db.add(cv_file)
 
@@ -197,8 +226,24 @@ def create_application_with_cv(
     db.refresh(candidate)
     db.refresh(cv_file)
 
-    # 7) Lancer tâche asynchrone
-    process_cv_file.delay(cv_file.id)
+    # 7) Lancer tâche asynchrone (différée : release_deferred_uploads s'en charge)
+    if deferred:
+        response.headers["X-Processing-Deferred"] = "true"
+    elif extracted is not None:
+        pipeline_events.publish(
+            offer.id, application.id, pipeline_events.EXTRACTED, quality_score=cv_text.quality_score, inline=True
+        )
+        # Étape extract de la trace, complétée par la chaîne parse -> score (même run_id)
+        run_id = uuid.uuid4().hex
+        meta = extracted[2] if len(extracted) > 2 else {}
+        pipeline_traces.record_inline_stage(
+            run_id, queue_lane(admission.queue or ""), "extract", extract_ms,
+            cache_hit=False, cv_file_id=cv_file.id, application_id=application.id,
+            mime_type=cv_file.mime_type, page_count=meta.get("page_count"), ocr_pages=meta.get("ocr_pages"),
+        )
+        enqueue_cv_scoring(application.id, queue=admission.queue, run_id=run_id, started_at=pipeline_started_at)
+    else:
+        enqueue_cv_pipeline(cv_file.id, queue=admission.queue)
 
     return application
 
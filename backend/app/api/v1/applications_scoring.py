@@ -1,14 +1,16 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
 from app.db.deps import get_db
 from app.models.application import Application
+from app.models.candidate import Candidate
 from app.models.cv_text import CVText
+from app.models.offer import Offer
 from app.models.user import User, UserRole
 from app.core.auth import require_role
 from app.schemas.scoring import ApplicationScore
-from app.services.scoring import keyword_overlap_score
+from app.services import application_scores
 
 router = APIRouter(prefix="/applications", tags=["scoring"])
 
@@ -20,16 +22,26 @@ def get_application_scoring(
 ):
     """
     Retourne le scoring détaillé d'une candidature spécifique.
+
+    Le score est lu dans application_scores (calculé par le worker) ; il n'est
+    recalculé que si le CV, l'offre ou la version du scorer ont changé.
     """
     
-    # Charger l'application + candidate + cv_text
+    # Colonnes utiles uniquement : jamais le texte complet du CV
     app = (
-        db.query(Application)
-        .options(
-            joinedload(Application.candidate),
-            joinedload(Application.cv_text),
-            joinedload(Application.offer),
+        db.query(
+            Application.id,
+            Application.offer_id,
+            Candidate.full_name,
+            Offer.owner_id,
+            Offer.description,
+            CVText.status,
+            CVText.content_hash,
+            CVText.quality_score,
         )
+        .join(Candidate, Application.candidate_id == Candidate.id)
+        .join(Offer, Application.offer_id == Offer.id)
+        .outerjoin(CVText, CVText.application_id == Application.id)
         .filter(Application.id == application_id)
         .first()
     )
@@ -38,22 +50,34 @@ def get_application_scoring(
         raise HTTPException(status_code=404, detail="Application not found")
     
     # Vérifier les permissions
-    if current_user.role != UserRole.ADMIN and app.offer.owner_id != current_user.id:
+    if current_user.role != UserRole.ADMIN and app.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
     
-    cv_text: CVText | None = app.cv_text
-    
-    # Calculer le score
-    if not cv_text or not cv_text.extracted_text or cv_text.status != "SUCCESS":
-        score = 0
-    else:
-        score = keyword_overlap_score(
-            job_text=app.offer.description or "",
-            cv_text=cv_text.extracted_text or "",
+    if app.status != "SUCCESS":
+        return ApplicationScore(
+            application_id=app.id,
+            candidate_full_name=app.full_name,
+            score=0,
         )
+
+    stored = application_scores.ensure_score(
+        db,
+        application_id=app.id,
+        offer_id=app.offer_id,
+        job_text=app.description or "",
+        cv_hash=app.content_hash,
+        quality_score=app.quality_score,
+    )
+    if db.new or db.dirty:
+        db.commit()
     
     return ApplicationScore(
         application_id=app.id,
-        candidate_full_name=app.candidate.full_name,
-        score=score,
+        candidate_full_name=app.full_name,
+        score=stored.keyword_overlap,
+        combined_score=stored.combined_score,
+        tfidf=stored.tfidf,
+        semantic=stored.semantic,
+        scorer_version=stored.scorer_version,
+        computed_at=stored.computed_at,
     )
@@ -0,0 +1,123 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from sqlalchemy.orm import Session
+
+from app.core.auth import require_role
+from app.core.config import settings
+from app.core.security import create_sse_token
+from app.db.deps import get_db
+from app.db.session import SessionLocal
+from app.models.offer import Offer
+from app.models.user import User, UserRole
+from app.schemas.auth import SSEToken
+from app.services import pipeline_events
+
+router = APIRouter(prefix="/offers", tags=["events"])
+
+# EventSource (navigateur) ne peut pas envoyer d'en-tête Authorization : il
+# passe en ?token= un jeton court propre à l'offre (POST .../events/token),
+# jamais le JWT d'accès, qui finirait dans les logs d'accès et l'historique
+_optional_bearer = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+
+def _check_offer_access(db: Session, user: User, offer_id: int) -> None:
+    offer = db.get(Offer, offer_id)
+    if not offer or offer.deleted:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    if user.role != UserRole.ADMIN and offer.owner_id != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def _token_user_id(bearer: Optional[str], token: Optional[str], offer_id: int) -> int:
+    """JWT d'accès en en-tête, ou jeton SSE de cette offre en paramètre."""
+    if not bearer and not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    try:
+        payload = jwt.decode(bearer or token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        if payload.get("type") != ("access" if bearer else "sse"):
+            raise HTTPException(status_code=401, detail="Invalid token type")
+        if not bearer and payload.get("offer_id") != offer_id:
+            raise HTTPException(status_code=403, detail="Token not valid for this offer")
+        return int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+
+def _authorize(bearer: Optional[str], token: Optional[str], offer_id: int) -> None:
+    """
+    Vérifie le jeton et l'accès à l'offre avec une session courte, fermée
+    avant le début du flux (aucune connexion base gardée par client).
+    """
+    user_id = _token_user_id(bearer, token, offer_id)
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        if not user or not user.is_active:
+            raise HTTPException(status_code=401, detail="Inactive user")
+        if user.role not in (UserRole.ADMIN, UserRole.RECRUITER):
+            raise HTTPException(status_code=403, detail="Forbidden")
+        _check_offer_access(db, user, offer_id)
+
+
+@router.post("/{offer_id}/events/token", response_model=SSEToken)
+def create_offer_events_token(
+    offer_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.RECRUITER)),
+):
+    """
+    Jeton court (SSE_TOKEN_EXPIRE_SECONDS) pour GET /offers/{offer_id}/events
+    depuis un EventSource : valable pour cette offre uniquement, vérifié à
+    l'ouverture du flux. Le client en redemande un avant de se reconnecter.
+    """
+    _check_offer_access(db, current_user, offer_id)
+    return SSEToken(
+        token=create_sse_token(current_user.id, offer_id),
+        expires_in=settings.SSE_TOKEN_EXPIRE_SECONDS,
+    )
+
+
+@router.get("/{offer_id}/events")
+async def stream_offer_events(
+    offer_id: int,
+    request: Request,
+    token: Optional[str] = Query(None, description="jeton SSE (POST /offers/{offer_id}/events/token)"),
+    bearer: Optional[str] = Depends(_optional_bearer),
+):
+    """
+    Flux Server-Sent Events des transitions de traitement des CV de l'offre
+    (extracting, extracted, parsed, scored, failed), publiées par les workers.
+
+    Chaque événement : `event: <stage>` + `data: {offer_id, application_id,
+    stage, ts, ...}`. Un commentaire `: ping` est envoyé toutes les
+    SSE_HEARTBEAT_SECONDS pour garder la connexion ouverte derrière les proxys.
+    """
+    await asyncio.to_thread(_authorize, bearer, token, offer_id)
+
+    queue = pipeline_events.hub.subscribe(offer_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    stage, data = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {stage}\ndata: {data}\n\n"
+        finally:
+            pipeline_events.hub.unsubscribe(offer_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,6 @@
 from typing import List, Optional
+
+import structlog
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
@@ -6,8 +8,25 @@ from app.api.deps import get_db, get_current_active_user
 from app import crud
 from app.schemas.offer import OfferCreate, OfferUpdate, OfferRead
 from app.models.offer import Offer
+from app.workers.tasks import embed_offer, rescore_offer
 
 router = APIRouter()
+logger = structlog.get_logger(__name__)
+
+# Champs d'offre entrant dans le score des candidatures (CVScorer.offer_criteria)
+_SCORING_FIELDS = {"required_skills", "min_experience_years", "required_education", "required_languages"}
+
+
+def _enqueue(task, offer_id: int) -> None:
+    """
+    Envoi best effort après commit : l'offre est enregistrée, un broker
+    indisponible ne doit pas la faire échouer (les endpoints de matching
+    calculent le vecteur manquant à la volée).
+    """
+    try:
+        task.delay(offer_id)
+    except Exception as e:
+        logger.warning("offer_task_enqueue_failed", task=task.name, offer_id=offer_id, error=repr(e))
 
 
 @router.get("/", response_model=List[OfferRead])
@@ -32,6 +51,7 @@ def create_offer(
 ):
     """Crée une nouvelle offre"""
     offer = crud.offer.create(db=db, obj_in=offer_in, owner_id=current_user.id)
+    _enqueue(embed_offer, offer.id)
     return offer
 
 
@@ -62,6 +82,10 @@ def update_offer(
     if not offer:
         raise HTTPException(status_code=404, detail="Offre non trouvée")
     offer = crud.offer.update(db=db, db_obj=offer, obj_in=offer_in)
+    if offer_in.description is not None:
+        _enqueue(embed_offer, offer.id)
+    if _SCORING_FIELDS & offer_in.model_dump(exclude_none=True).keys():
+        _enqueue(rescore_offer, offer.id)
     return offer
 
 
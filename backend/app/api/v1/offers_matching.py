@@ -0,0 +1,280 @@
+import time
+from typing import Optional
+
+import numpy as np
+import structlog
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db.deps import get_db
+from app.models.application import Application
+from app.models.candidate import Candidate
+from app.models.embedding import EmbeddingOwner
+from app.models.offer import Offer
+from app.models.user import User, UserRole
+from app.core.auth import require_role
+from app.core.config import settings
+from app.schemas.matching import (
+    OfferRankingResponse,
+    RankedApplication,
+    SimilarCandidate,
+    SimilarCandidatesResponse,
+    SimulatedRank,
+    WeightSimulationRequest,
+    WeightSimulationResponse,
+)
+from app.services import ann_index, embedding_store, embeddings, ranking, scoring_weights
+from app.services.cv_scorer import CVScorer
+from app.workers.tasks import embed_offer
+
+router = APIRouter(prefix="/offers", tags=["matching"])
+logger = structlog.get_logger(__name__)
+
+
+def _get_offer_for_user(db: Session, offer_id: int, current_user: User) -> Offer:
+    offer = db.get(Offer, offer_id)
+    if not offer or offer.deleted:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    if current_user.role != UserRole.ADMIN and offer.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return offer
+
+
+def _job_vector(db: Session, offer: Offer, job_text: str) -> Optional[np.ndarray]:
+    """
+    Vecteur de l'offre sans écriture en base : le vecteur stocké s'il est à
+    jour, sinon encodé en mémoire ; sa persistance reste au worker (embed_offer).
+    """
+    stored = embedding_store.fresh_vectors(db, EmbeddingOwner.OFFER, [(offer.id, job_text)])
+    if offer.id in stored:
+        return stored[offer.id]
+    try:
+        embed_offer.delay(offer.id)
+    except Exception as e:
+        logger.warning("offer_task_enqueue_failed", task=embed_offer.name, offer_id=offer.id, error=repr(e))
+    encoded = embeddings.encode_documents([job_text])
+    return None if encoded is None else encoded[0]
+
+
+@router.get("/{offer_id}/similar-candidates", response_model=SimilarCandidatesResponse)
+def search_similar_candidates(
+    offer_id: int,
+    top_k: int = Query(20, ge=1, le=200),
+    min_similarity: float = Query(0.0, ge=0.0, le=1.0),
+    exclude_applied: bool = Query(True),
+    source_offer_id: Optional[int] = Query(None),
+    n_probe: Optional[int] = Query(None, ge=1, le=1024),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.RECRUITER)),
+):
+    """
+    Recherche les candidats (toutes candidatures confondues) les plus proches
+    sémantiquement de l'offre, via l'index ANN des embeddings de CV.
+
+    Params:
+    - exclude_applied: ignorer les candidatures déjà déposées sur cette offre
+    - source_offer_id: restreindre aux candidatures d'une autre offre
+    - n_probe: nombre de listes IVF parcourues (rappel vs latence)
+    """
+    offer = _get_offer_for_user(db, offer_id, current_user)
+
+    index = ann_index.get_index()
+    if index is None or len(index) == 0:
+        return SimilarCandidatesResponse(offer_id=offer.id, top_k=top_k, index_size=0, results=[])
+
+    job_vector = _job_vector(db, offer, offer.description)
+    if job_vector is None:
+        raise HTTPException(status_code=503, detail="Embedding model unavailable")
+
+    # Filtres -> ensemble d'ids autorisés (requête sur les ids uniquement)
+    allowed_ids = None
+    if current_user.role != UserRole.ADMIN or exclude_applied or source_offer_id is not None:
+        query = db.query(Application.id)
+        if current_user.role != UserRole.ADMIN:
+            query = query.join(Offer).filter(Offer.owner_id == current_user.id)
+        if exclude_applied:
+            query = query.filter(Application.offer_id != offer.id)
+        if source_offer_id is not None:
+            query = query.filter(Application.offer_id == source_offer_id)
+        allowed_ids = np.fromiter((app_id for (app_id,) in query), dtype=np.int64)
+
+    # L'index peut contenir des candidatures supprimées ou rattachées à une offre
+    # archivée depuis sa dernière synchro : elles sont écartées après la recherche,
+    # qui est relancée avec un k doublé tant que top_k n'est pas atteint.
+    k = top_k
+    while True:
+        hits = index.search(
+            job_vector,
+            k=k,
+            n_probe=n_probe or settings.ANN_N_PROBE,
+            allowed_ids=allowed_ids,
+        )
+        exhausted = len(hits) < k or k >= len(index) or (hits and hits[-1][1] < min_similarity)
+        hits = [(app_id, score) for app_id, score in hits if score >= min_similarity]
+
+        rows = {
+            row.id: row
+            for row in db.query(
+                Application.id,
+                Application.offer_id,
+                Application.candidate_id,
+                Candidate.full_name,
+            )
+            .join(Candidate, Application.candidate_id == Candidate.id)
+            .join(Offer, Application.offer_id == Offer.id)
+            .filter(
+                Application.id.in_([app_id for app_id, _ in hits]),
+                Offer.deleted == False,  # noqa: E712
+            )
+        }
+        results = [
+            SimilarCandidate(
+                application_id=app_id,
+                offer_id=rows[app_id].offer_id,
+                candidate_id=rows[app_id].candidate_id,
+                candidate_full_name=rows[app_id].full_name,
+                similarity=round(score, 4),
+            )
+            for app_id, score in hits
+            if app_id in rows
+        ]
+        if len(results) >= top_k or exhausted:
+            break
+        k = min(2 * k, len(index))
+
+    return SimilarCandidatesResponse(
+        offer_id=offer.id, top_k=top_k, index_size=len(index), results=results[:top_k]
+    )
+
+
+@router.get("/{offer_id}/ranking", response_model=OfferRankingResponse)
+def rank_offer_applications(
+    offer_id: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    shortlist_k: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.RECRUITER)),
+):
+    """
+    Classement de toutes les candidatures de l'offre par score combiné,
+    calculé en une passe (une matrice TF-IDF, vecteurs SBERT stockés ou un
+    seul encodage batch, pondération NumPy), puis paginé.
+
+    Params:
+    - shortlist_k: 0 = score complet pour tous ; sinon SBERT sur le top-K
+      du préfiltre lexical uniquement (cf. app.services.ranking)
+
+    Les candidatures sans texte extrait ne sont pas classées.
+    """
+    offer = _get_offer_for_user(db, offer_id, current_user)
+    job_text = offer.description or ""
+
+    candidates = ranking.load_candidates(db, offer.id)
+    job_vector = None
+    if candidates and job_text.strip():
+        job_vector = _job_vector(db, offer, job_text)
+        if shortlist_k == 0:
+            # Vecteurs manquants : un seul encodage batch, en mémoire (le worker
+            # score_cv les persiste)
+            missing = [c for c in candidates if c.cv_vector is None]
+            if missing:
+                vectors = embeddings.encode_documents([c.cv_text for c in missing])
+                if vectors is not None:
+                    for c, vector in zip(missing, vectors):
+                        c.cv_vector = vector
+
+    result = ranking.rank_candidates(
+        job_text, candidates, shortlist_k=shortlist_k, job_vector=job_vector,
+        job_counts=offer.token_counts,
+    )
+
+    start = (page - 1) * page_size
+    page_items = result.ranked[start:start + page_size]
+    names = {
+        row.id: row
+        for row in db.query(Application.id, Application.candidate_id, Candidate.full_name)
+        .join(Candidate, Application.candidate_id == Candidate.id)
+        .filter(Application.id.in_([r.application_id for r in page_items]))
+    }
+
+    total = len(result.ranked)
+    return OfferRankingResponse(
+        offer_id=offer.id,
+        total=total,
+        page=page,
+        page_size=page_size,
+        total_pages=(total + page_size - 1) // page_size,
+        shortlist_size=result.shortlist_size,
+        semantic_scored=result.semantic_scored,
+        results=[
+            RankedApplication(
+                rank=start + position + 1,
+                application_id=r.application_id,
+                candidate_id=names[r.application_id].candidate_id,
+                candidate_full_name=names[r.application_id].full_name,
+                score=r.score,
+                lexical_score=r.lexical_score,
+                tfidf=round(r.tfidf, 4),
+                overlap=round(r.overlap, 4),
+                semantic=None if r.semantic is None else round(r.semantic, 4),
+                stage=r.stage,
+            )
+            for position, r in enumerate(page_items)
+        ],
+    )
+
+
+@router.post("/{offer_id}/scoring-weights/simulate", response_model=WeightSimulationResponse)
+def simulate_scoring_weights(
+    offer_id: int,
+    payload: WeightSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.RECRUITER)),
+):
+    """
+    Classement des candidatures de l'offre avec d'autres pondérations CVScorer
+    (ex: {"skills": 0.6}), calculé en mémoire à partir des sous-scores stockés.
+
+    Avec save=true, les pondérations sont enregistrées sur l'offre et
+    matching_score est recalculé pour toutes ses candidatures (un seul UPDATE).
+    """
+    offer = _get_offer_for_user(db, offer_id, current_user)
+    try:
+        weights = CVScorer.resolve_weights(payload.weights)
+        previous_weights = CVScorer.resolve_weights(offer.scoring_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    started = time.perf_counter()
+    data = scoring_weights.load_sub_scores(db, offer.id)
+    result = scoring_weights.simulate(data, weights)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    top = scoring_weights.top_changes(result, payload.limit)
+    names = dict(
+        db.query(Application.id, Candidate.full_name)
+        .join(Candidate, Application.candidate_id == Candidate.id)
+        .filter(Application.id.in_([item["application_id"] for item in top]))
+        .all()
+    )
+
+    if payload.save:
+        scoring_weights.save_weights(db, offer, weights)
+        db.commit()
+
+    new_ranks = np.empty(len(result.order), dtype=np.int64)
+    new_ranks[result.order] = np.arange(1, len(result.order) + 1)
+    return WeightSimulationResponse(
+        offer_id=offer.id,
+        weights=weights,
+        previous_weights=previous_weights,
+        total=len(result.scores),
+        moved=int((new_ranks != result.previous_rank).sum()),
+        saved=payload.save,
+        elapsed_ms=elapsed_ms,
+        results=[
+            SimulatedRank(candidate_full_name=names.get(item["application_id"], ""), **item)
+            for item in top
+        ],
+    )
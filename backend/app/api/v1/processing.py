@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.auth import require_role
+from app.core.config import settings
+from app.db.deps import get_db
+from app.models.cv_file import CVFile, CVFileStatus
+from app.models.pipeline_trace import PipelineTrace
+from app.models.user import User, UserRole
+from app.schemas.processing import (
+    PipelineTraceRead, ProcessingBacklogResponse, QueueBacklogRead, TraceStatsResponse,
+)
+from app.services import backlog, pipeline_traces
+
+router = APIRouter(prefix="/processing", tags=["processing"])
+
+
+@router.get("/backlog", response_model=ProcessingBacklogResponse)
+def get_processing_backlog(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN, UserRole.RECRUITER)),
+):
+    """
+    Backlog des files de traitement des CV : profondeur et âge du plus ancien
+    message par file, seuils et politique d'admission, uploads différés.
+    """
+    try:
+        queues = backlog.queue_backlog()
+    except Exception:
+        raise HTTPException(status_code=503, detail="Broker unavailable")
+
+    deferred = (
+        db.query(func.count(CVFile.id))
+        .filter(CVFile.status == CVFileStatus.DEFERRED.value)
+        .scalar()
+    )
+    return ProcessingBacklogResponse(
+        admission_policy=settings.ADMISSION_POLICY,
+        max_depth=settings.BACKLOG_MAX_DEPTH,
+        max_age_seconds=settings.BACKLOG_MAX_AGE_SECONDS,
+        deferred_uploads=deferred or 0,
+        queues=[QueueBacklogRead(**queue.as_dict()) for queue in queues.values()],
+    )
+
+
+@router.get("/traces/stats", response_model=TraceStatsResponse)
+def get_pipeline_trace_stats(
+    hours: float = Query(24.0, gt=0, le=24 * 90, description="fenêtre se terminant à `until`"),
+    until: Optional[datetime] = Query(None),
+    mime_type: Optional[str] = Query(None),
+    lane: Optional[str] = Query(None, description="interactive | bulk | claim"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN)),
+):
+    """
+    p50 / p95 / p99 par étape (attente en file, extraction, parsing, score,
+    total) et par type MIME, sur les traces du pipeline de la fenêtre.
+    """
+    until = until or datetime.now(timezone.utc)
+    since = until - timedelta(hours=hours)
+    groups = pipeline_traces.stage_percentiles(db, since, until, mime_type=mime_type, lane=lane)
+    return TraceStatsResponse(since=since, until=until, groups=groups)
+
+
+@router.get("/traces/cv-files/{cv_file_id}", response_model=List[PipelineTraceRead])
+def get_cv_file_traces(
+    cv_file_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.ADMIN)),
+):
+    """Traces d'un CV, de la plus récente à la plus ancienne."""
+    return (
+        db.query(PipelineTrace)
+        .filter(PipelineTrace.cv_file_id == cv_file_id)
+        .order_by(PipelineTrace.created_at.desc(), PipelineTrace.id.desc())
+        .limit(limit)
+        .all()
+    )
@@ -5,6 +5,9 @@ from app.api.v1.applications import router as applications_router
 from app.api.v1.cv_text import router as cv_text_router
 from app.api.v1.applications_scoring import router as applications_scoring_router
 from app.api.v1.admin import router as admin_router
+from app.api.v1.offers_matching import router as offers_matching_router
+from app.api.v1.offer_events import router as offer_events_router
+from app.api.v1.processing import router as processing_router
 
 
 api_router = APIRouter(prefix="/api/v1")
@@ -15,3 +18,6 @@ api_router.include_router(applications_router)
 api_router.include_router(cv_text_router)
 api_router.include_router(applications_scoring_router)
 api_router.include_router(admin_router)
+api_router.include_router(offers_matching_router)
+api_router.include_router(offer_events_router)
+api_router.include_router(processing_router)
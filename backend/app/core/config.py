@@ -26,7 +26,116 @@ class Settings(BaseSettings):
     # Application
     APP_VERSION: str = "0.1.0"
     ENVIRONMENT: str = "development"
-    
+
+    # Mesure de latence par étape (cf. app.core.timing)
+    TIMING_ENABLED: bool = True
+    TIMING_SLOW_MS: float = 0.0  # > 0 : log "slow_stage" au-delà de ce seuil
+    TIMING_REPORT_INTERVAL_SECONDS: int = 300  # résumé structlog / publication Redis ; 0 = jamais
+
+    # Embeddings (SBERT)
+    SBERT_MODEL_NAME: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    SBERT_DEVICE: str = "cpu"
+    SBERT_TORCH_THREADS: int = 0  # 0 = valeur par défaut de torch
+    # Backend d'inférence : "torch" (SentenceTransformer) ou "onnx" (ONNX Runtime int8)
+    SBERT_BACKEND: str = "torch"
+    SBERT_ONNX_DIR: str = ""  # vide = MODEL_ARTIFACTS_DIR/onnx/<modèle>
+    SBERT_ONNX_THREADS: int = 0  # intra-op ; 0 = défaut onnxruntime
+    # Sidecar d'inférence partagé (socket Unix) ; vide = modèle chargé dans le processus
+    EMBEDDING_SERVER_SOCKET: str = ""
+    EMBEDDING_SERVER_MAX_BATCH: int = 64
+    EMBEDDING_SERVER_MAX_WAIT_MS: float = 5.0
+    # Délai d'une requête au sidecar : workers / API (une requête HTTP ne l'attend pas 60 s)
+    EMBEDDING_SERVER_TIMEOUT_SECONDS: float = 60.0
+    EMBEDDING_SERVER_API_TIMEOUT_SECONDS: float = 5.0
+    SBERT_ENCODE_BATCH_SIZE: int = 32
+    # Textes longs : découpage en fenêtres du modèle puis pooling (mean|max)
+    SBERT_CHUNKING: bool = True
+    SBERT_CHUNK_POOLING: str = "mean"
+
+    # Artefacts de modèles (TF-IDF corpus, ...)
+    MODEL_ARTIFACTS_DIR: str = "/app/data/models"
+
+    # TF-IDF entraîné sur le corpus (CV + offres)
+    TFIDF_MAX_FEATURES: int = 50000
+    TFIDF_MIN_DF: int = 2
+    TFIDF_VECTOR_CACHE_SIZE: int = 4096
+    TFIDF_RELOAD_CHECK_SECONDS: int = 60
+    # LRU des comptes de tokens (keyword_overlap_score), en nombre de textes
+    TOKEN_COUNTS_CACHE_SIZE: int = 4096
+
+    # Index ANN (IVF) sur les embeddings de CV
+    ANN_N_LISTS: int = 0  # 0 = auto (racine du nombre de CV)
+    ANN_N_PROBE: int = 8
+    ANN_QUANTIZE_INT8: bool = True
+    ANN_RELOAD_CHECK_SECONDS: int = 30
+
+    # Classement en deux étapes : préfiltre lexical/structuré puis SBERT sur le top-K
+    RANKING_SHORTLIST_K: int = 50  # 0 = SBERT sur tous les CV
+    RANKING_SEMANTIC_BUDGET_MS: float = 0.0  # budget d'encodage SBERT ; 0 = illimité
+    RANKING_STRUCTURED_WEIGHT: float = 0.2  # part du score CVScorer dans le préfiltre
+
+    # Démarrage des workers Celery (cf. app.workers.bootstrap)
+    WORKER_PRELOAD_MODELS: bool = True  # spaCy / SBERT / TF-IDF chargés avant le fork
+    WORKER_WARMUP: bool = True  # inférence de chauffe dans chaque enfant
+
+    # Single-flight (extraction / parsing d'un même CV envoyé sur plusieurs offres)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_LEASE_SECONDS: int = 300  # expiration du lease (tâche plantée)
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 120.0  # attente max de la tâche qui détient le lease
+
+    # Événements de progression du pipeline (Redis pub/sub -> SSE /offers/{id}/events)
+    PIPELINE_EVENTS_ENABLED: bool = True
+    SSE_HEARTBEAT_SECONDS: float = 15.0  # commentaire ": ping" pour les proxys
+    SSE_CLIENT_QUEUE_SIZE: int = 100  # événements en attente par client (les plus anciens sont perdus)
+    SSE_RETRY_MS: int = 3000  # délai de reconnexion conseillé à EventSource
+    SSE_TOKEN_EXPIRE_SECONDS: int = 60  # jeton du flux (une offre), vérifié à l'ouverture seulement
+
+    # Contrôle d'admission des uploads selon le backlog de la file cv_extract
+    ADMISSION_POLICY: str = "accept"  # accept | defer | reject | bulk
+    BACKLOG_MAX_DEPTH: int = 2000  # messages en attente
+    BACKLOG_MAX_AGE_SECONDS: float = 600.0  # âge du plus ancien message
+    BACKLOG_RETRY_AFTER_SECONDS: int = 120  # en-tête Retry-After des uploads refusés (429)
+    BACKLOG_CACHE_SECONDS: float = 2.0  # cache du relevé Redis par processus
+    DEFERRED_RELEASE_BATCH: int = 200  # uploads différés remis en file par passage
+
+    # Prise en charge des cv_files par lease en base (services.job_claims)
+    CV_PROCESSING_MODE: str = "celery"  # celery | claim (workers app.workers.claim_worker, sans broker)
+    CLAIM_BATCH_SIZE: int = 20  # cv_files pris par lot (SKIP LOCKED)
+    CLAIM_LEASE_SECONDS: float = 600.0  # au-delà, une ligne EXTRACTING est reprise
+    CLAIM_POLL_SECONDS: float = 2.0  # attente quand aucune ligne n'est à prendre
+    CLAIM_MAX_ATTEMPTS: int = 5  # tentatives avant FAILED
+    REAPER_INTERVAL_SECONDS: float = 60.0
+
+    # Extraction isolée dans des sous-processus (services.extraction_pool)
+    EXTRACTION_POOL_ENABLED: bool = True
+    EXTRACTION_POOL_SIZE: int = 2  # enfants par processus worker
+    EXTRACTION_MEMORY_LIMIT_MB: int = 3072  # RLIMIT_AS par enfant (0 : pas de limite)
+    EXTRACTION_TIMEOUT_SECONDS: float = 120.0  # au-delà, l'enfant est tué
+    EXTRACTION_RECYCLE_RSS_MB: int = 1024  # RSS après un job au-delà duquel l'enfant est remplacé
+    EXTRACTION_MAX_JOBS_PER_CHILD: int = 200
+
+    # Extraction inline à l'upload (DOCX / PDF texte, services.inline_extraction)
+    INLINE_EXTRACTION_ENABLED: bool = True
+    INLINE_EXTRACTION_TIMEOUT_SECONDS: float = 1.0
+    INLINE_EXTRACTION_MAX_BYTES: int = 2 * 1024 * 1024
+
+    # Traces par exécution du pipeline CV (services.pipeline_traces)
+    PIPELINE_TRACES_ENABLED: bool = True
+    PIPELINE_TRACE_RETENTION_DAYS: int = 30
+
+    # Retraitement des sorties obsolètes (python -m app.tools.backfill)
+    BACKFILL_CHUNK_SIZE: int = 100  # cv_files par transaction
+    BACKFILL_WORKERS: int = 2  # chunks traités en parallèle
+    BACKFILL_PAUSE_SECONDS: float = 0.5  # pause entre deux chunks d'un même worker
+    BACKFILL_THROTTLE_SECONDS: float = 15.0  # attente tant que le trafic interactif est en backlog
+    BACKFILL_NICE: int = 10  # priorité CPU abaissée (os.nice)
+    BACKFILL_CHECKPOINT_DIR: str = "/app/data/backfill"
+
+    # Ingestion en masse (tâche ingest_cv_batch)
+    BULK_INGEST_CHUNK_SIZE: int = 200  # CV par transaction
+    BULK_EXTRACT_WORKERS: int = 4  # threads d'extraction (pdfminer / OCR)
+    BULK_PARSE_BATCH_SIZE: int = 32  # batch_size de nlp.pipe
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
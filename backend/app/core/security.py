@@ -53,6 +53,17 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+def create_sse_token(user_id: int, offer_id: int) -> str:
+    """Create a short-lived token scoped to one offer's event stream."""
+    expire = datetime.utcnow() + timedelta(seconds=settings.SSE_TOKEN_EXPIRE_SECONDS)
+    to_encode = {"sub": str(user_id), "offer_id": offer_id, "exp": expire, "type": "sse"}
+    return jwt.encode(
+        to_encode,
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+
 def decode_token(token: str) -> dict:
     """Decode and validate JWT token."""
     return jwt.decode(
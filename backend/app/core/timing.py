@@ -0,0 +1,253 @@
+"""
+Mesure de latence par étape du pipeline (extraction, parsing, scoring, SBERT).
+
+    with stage_timer("combined_score.tfidf"):
+        ...
+
+    @timed("cv_parser.parse")
+    def parse(...): ...
+
+Chaque étape alimente un histogramme en mémoire (buckets fixes, en ms).
+Export : résumé périodique dans structlog, endpoint /metrics (format texte
+Prometheus) et, côté worker Celery, publication des histogrammes dans Redis
+pour que l'API les expose aussi. Désactivé (TIMING_ENABLED=false), le coût se
+limite à un test de booléen.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+# Bornes supérieures des buckets (ms) ; le dernier bucket est +Inf
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+REDIS_KEY_PREFIX = "ats:timings:"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation (borne supérieure du bucket) ; None si vide."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "count": self.count, "sum_ms": self.sum_ms, "max_ms": self.max_ms}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Histogram":
+        h = cls()
+        h.counts = list(data["counts"])
+        h.count = data["count"]
+        h.sum_ms = data["sum_ms"]
+        h.max_ms = data["max_ms"]
+        return h
+
+
+class _State:
+    def __init__(self):
+        self.enabled = settings.TIMING_ENABLED
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+        self.last_report = time.monotonic()
+        self.publish_redis_url: Optional[str] = None
+        self._redis = None
+
+
+_state = _State()
+
+
+def configure(enabled: Optional[bool] = None, publish_redis_url: Optional[str] = None) -> None:
+    """Active/désactive la mesure ; publish_redis_url : publier les histogrammes (workers)."""
+    if enabled is not None:
+        _state.enabled = enabled
+    if publish_redis_url is not None:
+        _state.publish_redis_url = publish_redis_url or None
+
+
+def observe(stage: str, ms: float) -> None:
+    with _state.lock:
+        histogram = _state.histograms.get(stage)
+        if histogram is None:
+            histogram = _state.histograms[stage] = Histogram()
+        histogram.observe(ms)
+    if settings.TIMING_SLOW_MS and ms >= settings.TIMING_SLOW_MS:
+        logger.warning("slow_stage", stage=stage, duration_ms=round(ms, 2))
+    _maybe_report()
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        observe(self.stage, (time.perf_counter() - self.started) * 1000)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP = _NoopTimer()
+
+
+def stage_timer(stage: str):
+    """Context manager mesurant le bloc sous le nom `stage`."""
+    return _StageTimer(stage) if _state.enabled else _NOOP
+
+
+def timed(stage: str) -> Callable:
+    """Décorateur : mesure chaque appel de la fonction sous le nom `stage`."""
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, (time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+
+def snapshot() -> Dict[str, Histogram]:
+    """Copie des histogrammes du processus courant."""
+    with _state.lock:
+        return {stage: Histogram.from_dict(h.to_dict()) for stage, h in _state.histograms.items()}
+
+
+def summaries(histograms: Optional[Dict[str, Histogram]] = None) -> Dict[str, Dict[str, float]]:
+    histograms = snapshot() if histograms is None else histograms
+    return {stage: h.summary() for stage, h in sorted(histograms.items())}
+
+
+def reset() -> None:
+    with _state.lock:
+        _state.histograms.clear()
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _maybe_report() -> None:
+    interval = settings.TIMING_REPORT_INTERVAL_SECONDS
+    if interval <= 0 or time.monotonic() - _state.last_report < interval:
+        return
+    with _state.lock:
+        if time.monotonic() - _state.last_report < interval:
+            return
+        _state.last_report = time.monotonic()
+    report()
+
+
+def report() -> None:
+    """Résumé structlog des histogrammes (+ publication Redis si configurée)."""
+    histograms = snapshot()
+    if not histograms:
+        return
+    logger.info("stage_timings", process=process_id(), stages=summaries(histograms))
+    if _state.publish_redis_url:
+        try:
+            if _state._redis is None:
+                from redis import Redis
+                _state._redis = Redis.from_url(_state.publish_redis_url)
+            ttl = max(60, 3 * settings.TIMING_REPORT_INTERVAL_SECONDS)
+            payload = json.dumps({stage: h.to_dict() for stage, h in histograms.items()})
+            _state._redis.set(REDIS_KEY_PREFIX + process_id(), payload, ex=ttl)
+        except Exception as e:
+            logger.warning("stage_timings_publish_failed", error=repr(e))
+
+
+def collect_published(redis_url: str) -> Dict[str, Dict[str, Histogram]]:
+    """Histogrammes publiés par les autres processus (workers), par processus."""
+    from redis import Redis
+
+    client = Redis.from_url(redis_url)
+    result: Dict[str, Dict[str, Histogram]] = {}
+    for key in client.scan_iter(match=REDIS_KEY_PREFIX + "*", count=100):
+        raw = client.get(key)
+        if not raw:
+            continue
+        process = key.decode()[len(REDIS_KEY_PREFIX):]
+        result[process] = {stage: Histogram.from_dict(d) for stage, d in json.loads(raw).items()}
+    return result
+
+
+def render_prometheus(per_process: Dict[str, Dict[str, Histogram]]) -> str:
+    """Format texte Prometheus : histogramme ats_stage_duration_ms{stage, process}."""
+    lines: List[str] = [
+        "# HELP ats_stage_duration_ms Durée des étapes du pipeline (ms)",
+        "# TYPE ats_stage_duration_ms histogram",
+    ]
+    for process, histograms in sorted(per_process.items()):
+        for stage, h in sorted(histograms.items()):
+            labels = f'stage="{stage}",process="{process}"'
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS_MS) + ["+Inf"], h.counts):
+                cumulative += n
+                lines.append(f'ats_stage_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"ats_stage_duration_ms_sum{{{labels}}} {h.sum_ms:.3f}")
+            lines.append(f"ats_stage_duration_ms_count{{{labels}}} {h.count}")
+    return "\n".join(lines) + "\n"
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from app.models.offer import Offer
 from app.schemas.offer import OfferCreate, OfferUpdate
+from app.services import token_counts
 
 
 def get_multi(
@@ -38,6 +39,7 @@ def create(
         dict_data["owner_id"] = owner_id
     
     db_obj = Offer(**dict_data)
+    db_obj.token_counts = token_counts.count_tokens(db_obj.description)
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
@@ -54,6 +56,8 @@ def update(
     update_data = obj_in.model_dump(exclude_unset=True) if hasattr(obj_in, 'model_dump') else obj_in
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    if "description" in update_data:
+        db_obj.token_counts = token_counts.count_tokens(db_obj.description)
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
@@ -2,13 +2,16 @@ from contextlib import asynccontextmanager
 import logging
 
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from redis import Redis
 
 from app.api.v1.router import api_router
-from app.services.embeddings import get_sbert_model
+from app.core import timing
+from app.services import extraction_pool, pipeline_events, single_flight
+from app.services.embeddings import registry as embedding_registry
 from app.core.config import settings
 from app.db.deps import get_db
 
@@ -22,17 +25,27 @@ async def lifespan(app: FastAPI):
     logger.info(f"ATS-IA v{settings.APP_VERSION} starting in {settings.ENVIRONMENT} mode...")
     
     # Préchargement SBERT au démarrage (évite le "1er appel lent")
+    embedding_registry.server_timeout = settings.EMBEDDING_SERVER_API_TIMEOUT_SECONDS
     try:
-        get_sbert_model()
-        logger.info("SBERT preloaded successfully.")
+        embedding_registry.get()
+        logger.info(f"SBERT preload: {embedding_registry.stats()}")
     except Exception as e:
         # Ne bloque pas le démarrage si SBERT échoue
         logger.warning(f"SBERT preload failed (will fallback to 0.0): {repr(e)}")
+
+    # Sous-processus d'extraction démarrés d'avance : extraction inline dès le 1er upload
+    if settings.INLINE_EXTRACTION_ENABLED:
+        try:
+            extraction_pool.warm()
+        except Exception as e:
+            logger.warning(f"Extraction pool warm-up failed: {repr(e)}")
     
     yield
     
     # Shutdown
     logger.info("ATS-IA shutting down...")
+    await pipeline_events.hub.close()
+    extraction_pool.shutdown()
 
 
 app = FastAPI(
@@ -60,6 +73,31 @@ def ping():
     return {"status": "ok", "version": settings.APP_VERSION}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Histogrammes de latence par étape (format texte Prometheus) : processus
+    API courant + histogrammes publiés par les workers Celery dans Redis ;
+    compteur du travail évité par le single-flight ; sous-processus
+    d'extraction tués / recyclés.
+    """
+    per_process = {}
+    dedup_saved = {}
+    pool_events = {}
+    try:
+        per_process.update(timing.collect_published(settings.CELERY_BROKER_URL))
+        dedup_saved = single_flight.saved_counts(settings.CELERY_BROKER_URL)
+        pool_events = extraction_pool.event_counts(settings.CELERY_BROKER_URL)
+    except Exception as e:
+        logger.warning(f"Stage timings from workers unavailable: {repr(e)}")
+    per_process[f"api:{timing.process_id()}"] = timing.snapshot()
+    return (
+        timing.render_prometheus(per_process)
+        + single_flight.render_prometheus(dedup_saved)
+        + extraction_pool.render_prometheus(pool_events)
+    )
+
+
 @app.get("/health")
 def health_check(db: Session = Depends(get_db)):
     """Health check endpoint with dependency checks."""
@@ -89,8 +127,9 @@ def health_check(db: Session = Depends(get_db)):
     
     # Check SBERT
     try:
-        model = get_sbert_model()
-        health_status["checks"]["sbert"] = "loaded" if model else "not_loaded"
+        sbert_stats = embedding_registry.stats()
+        health_status["checks"]["sbert"] = "loaded" if sbert_stats["loaded"] else "not_loaded"
+        health_status["sbert"] = sbert_stats
     except Exception as e:
         health_status["checks"]["sbert"] = f"error: {str(e)}"
     
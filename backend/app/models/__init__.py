@@ -3,4 +3,7 @@ from app.models.offer import Offer
 from app.models.application import Application
 from app.models.candidate import Candidate
 from app.models.cv_file import CVFile
-from app.models.cv_text import CVText 
\ No newline at end of file
+from app.models.cv_text import CVText
+from app.models.embedding import TextEmbedding
+from app.models.application_score import ApplicationScoreResult
+from app.models.pipeline_trace import PipelineTrace
@@ -0,0 +1,33 @@
+"""Scores persistés des candidatures (score affiché + composantes du score combiné)"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ApplicationScoreResult(Base):
+    """
+    Score d'une candidature, valable tant que les hash des entrées (texte du CV,
+    description de l'offre) et la version du scorer n'ont pas changé.
+    """
+    __tablename__ = "application_scores"
+
+    id = Column(Integer, primary_key=True, index=True)
+    application_id = Column(
+        Integer,
+        ForeignKey("applications.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+        index=True,
+    )
+
+    # Validité : sha256 des entrées + version du scorer
+    cv_hash = Column(String(64), nullable=False)
+    offer_hash = Column(String(64), nullable=False)
+    scorer_version = Column(String(255), nullable=False)
+
+    keyword_overlap = Column(Integer, nullable=False)  # 0..100
+    tfidf = Column(Float, nullable=False)  # 0..1
+    semantic = Column(Float, nullable=True)  # 0..1, None si modèle indisponible
+    combined_score = Column(Float, nullable=False)  # 0..100
+
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -9,9 +9,17 @@ class CVFileStatus(str, enum.Enum):
     EXTRACTING = "EXTRACTING"
     EXTRACTED = "EXTRACTED"
     FAILED = "FAILED"
+    DEFERRED = "DEFERRED"  # stocké, mis en file plus tard (admission sous charge)
 
 class CVFile(Base):
     __tablename__ = "cv_files"
+    __table_args__ = (
+        # Index partiel : seules les lignes à prendre ou en cours (claim / reaper)
+        Index(
+            "ix_cv_files_claimable", "status", "id",
+            postgresql_where=text("status IN ('UPLOADED', 'EXTRACTING')"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
@@ -24,4 +32,9 @@ class CVFile(Base):
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Lease de traitement (services.job_claims) : détenteur, expiration, tentatives
+    claimed_by = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
     application = relationship("Application", backref="cv_files")
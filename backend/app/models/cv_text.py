@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Text, String, DateTime, func
+from sqlalchemy import Column, Float, Integer, ForeignKey, Index, JSON, Text, String, DateTime, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base 
@@ -6,6 +6,9 @@ from app.db.base import Base
 
 class CVText(Base):
     __tablename__ = "cv_texts"
+    __table_args__ = (
+        Index("ix_cv_texts_extractor_version", "extractor_version", "application_id"),  # app.tools.backfill
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -20,7 +23,10 @@ class CVText(Base):
     status = Column(String(20), nullable=False, default="PENDING")  # PENDING|SUCCESS|FAILED
     extracted_text = Column(Text, nullable=True)
     language = Column(String(10), nullable=True)
-    quality_score = Column(Integer, nullable=True)  # 0-100, optionnel
+    quality_score = Column(Float, nullable=True)  # 0..1 (cv_extraction._compute_quality_score), optionnel
+    content_hash = Column(String(64), nullable=True)  # sha256 de extracted_text
+    token_counts = Column(JSON, nullable=True)  # {token: nombre}, cf. services.token_counts
+    extractor_version = Column(Integer, nullable=True)  # cv_extraction.EXTRACTOR_VERSION ; NULL : antérieur
     error_message = Column(Text, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,30 @@
+"""Embeddings SBERT persistés pour les CV et les offres"""
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class EmbeddingOwner:
+    CV = "cv"        # owner_id = applications.id
+    OFFER = "offer"  # owner_id = offers.id
+
+
+class TextEmbedding(Base):
+    """Vecteur float32 d'un texte, clé (propriétaire, version du modèle)"""
+    __tablename__ = "text_embeddings"
+    __table_args__ = (
+        UniqueConstraint("owner_type", "owner_id", "model_version", name="uq_text_embeddings_owner_model"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_type = Column(String(20), nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    model_version = Column(String(255), nullable=False)
+
+    # sha256 du texte encodé : on ne ré-encode que si le texte change
+    content_hash = Column(String(64), nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32 little-endian (dim * 4 octets)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -19,6 +19,10 @@ class Offer(Base):
     min_experience_years = Column(Integer, nullable=True, default=0)
     required_education = Column(JSON, nullable=True)
     required_languages = Column(JSON, nullable=True)
+    # Pondérations CVScorer propres à l'offre (ex: {"skills": 0.6}), None = CVScorer.WEIGHTS
+    scoring_weights = Column(JSON, nullable=True)
+    # {token: nombre} de la description, cf. services.token_counts
+    token_counts = Column(JSON, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,5 +1,5 @@
 """Modèle pour stocker les CV parsés avec informations structurées"""
-from sqlalchemy import Column, Integer, String, JSON, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, JSON, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -8,6 +8,13 @@ from app.db.base import Base
 class ParsedCV(Base):
     """Stockage des informations structurées extraites des CV"""
     __tablename__ = "parsed_cvs"
+    # Déclarés ici : la table est créée par create_all (seed_database) quand
+    # elle n'existait pas lors des migrations
+    __table_args__ = (
+        Index("ix_parsed_cvs_source_hash", "source_hash"),  # parsing jumeau (single-flight)
+        Index("ix_parsed_cvs_parser_version", "parser_version", "application_id"),  # app.tools.backfill
+        Index("ix_parsed_cvs_scorer_version", "scorer_version", "application_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     application_id = Column(Integer, ForeignKey("applications.id"), unique=True, nullable=False, index=True)
@@ -38,6 +45,16 @@ class ParsedCV(Base):
     
     # Détails du scoring (JSON object)
     scoring_details = Column(JSON)
+
+    # Idempotence des tâches parse_cv / score_cv : hash du texte parsé et
+    # hash des entrées du dernier scoring (parsing + critères + pondérations)
+    source_hash = Column(String(64))
+    score_inputs_hash = Column(String(64))
+
+    # Versions du code ayant produit le parsing et le score structuré
+    # (CVParser.VERSION, CVScorer.VERSION) ; NULL : antérieur au versionnage
+    parser_version = Column(Integer)
+    scorer_version = Column(Integer)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,36 @@
+"""Trace d'une exécution du pipeline CV (attente en file, durée par étape, OCR, cache)"""
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class PipelineTrace(Base):
+    """
+    Une ligne par exécution (chaîne Celery, lot d'ingestion ou claim), écrite
+    par chaque étape ; purgée après PIPELINE_TRACE_RETENTION_DAYS.
+    """
+    __tablename__ = "cv_pipeline_traces"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String(64), nullable=False, unique=True)  # en-tête pipeline_run_id (tasks._lane_options)
+    cv_file_id = Column(Integer, ForeignKey("cv_files.id", ondelete="CASCADE"), nullable=True, index=True)
+    application_id = Column(Integer, nullable=True, index=True)
+    mime_type = Column(String(100), nullable=True)
+    lane = Column(String(20), nullable=True)  # interactive | bulk | claim
+    status = Column(String(20), nullable=False, default="RUNNING")  # RUNNING | SCORED | FAILED
+
+    # Durées (ms) ; queue_wait_ms cumule l'attente en file des étapes
+    queue_wait_ms = Column(Float, nullable=False, default=0.0)
+    extract_ms = Column(Float, nullable=True)
+    parse_ms = Column(Float, nullable=True)
+    score_ms = Column(Float, nullable=True)
+    total_ms = Column(Float, nullable=True)
+
+    page_count = Column(Integer, nullable=True)
+    ocr_pages = Column(Integer, nullable=True)
+    cache_hits = Column(JSON, nullable=False, default=list)  # étapes servies par une sortie existante
+    retries = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -8,6 +8,12 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class SSEToken(BaseModel):
+    """Short-lived token for one offer's event stream (?token=)."""
+    token: str
+    expires_in: int
+
+
 class RefreshTokenRequest(BaseModel):
     """Refresh token request schema."""
     refresh_token: str
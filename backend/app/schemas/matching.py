@@ -0,0 +1,66 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class SimilarCandidate(BaseModel):
+    application_id: int
+    offer_id: int
+    candidate_id: int
+    candidate_full_name: str
+    similarity: float
+
+
+class SimilarCandidatesResponse(BaseModel):
+    offer_id: int
+    top_k: int
+    index_size: int
+    results: List[SimilarCandidate]
+
+
+class RankedApplication(BaseModel):
+    rank: int
+    application_id: int
+    candidate_id: int
+    candidate_full_name: str
+    score: float
+    lexical_score: float
+    tfidf: float
+    overlap: float
+    semantic: Optional[float] = None
+    stage: str
+
+
+class OfferRankingResponse(BaseModel):
+    offer_id: int
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+    shortlist_size: int
+    semantic_scored: int
+    results: List[RankedApplication]
+
+
+class WeightSimulationRequest(BaseModel):
+    weights: Dict[str, float]  # partiel accepté, complété par CVScorer.WEIGHTS
+    save: bool = False
+    limit: int = Field(50, ge=1, le=500)
+
+
+class SimulatedRank(BaseModel):
+    rank: int
+    previous_rank: int
+    application_id: int
+    candidate_full_name: str
+    score: float
+
+
+class WeightSimulationResponse(BaseModel):
+    offer_id: int
+    weights: Dict[str, float]
+    previous_weights: Dict[str, float]
+    total: int
+    moved: int
+    saved: bool
+    elapsed_ms: float
+    results: List[SimulatedRank]
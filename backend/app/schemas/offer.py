@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from pydantic import field_validator
 
@@ -44,8 +44,9 @@ class OfferRead(BaseModel):
     min_experience_years: int = 0
     required_education: List[str] = Field(default_factory=list)
     required_languages: List[str] = Field(default_factory=list)
+    scoring_weights: Optional[Dict[str, float]] = None
 
-        @field_validator('required_skills', 'nice_to_have_skills', 'required_education', 'required_languages', mode='before')
+    @field_validator('required_skills', 'nice_to_have_skills', 'required_education', 'required_languages', mode='before')
     @classmethod
     def convert_json_to_list(cls, v):
         """Convert JSON values to lists."""
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class QueueBacklogRead(BaseModel):
+    name: str
+    lane: str
+    depth: int
+    oldest_age_seconds: Optional[float] = None
+    overloaded: bool
+
+
+class ProcessingBacklogResponse(BaseModel):
+    admission_policy: str
+    max_depth: int
+    max_age_seconds: float
+    deferred_uploads: int
+    queues: List[QueueBacklogRead]
+
+
+class StagePercentiles(BaseModel):
+    count: int
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+
+class TraceStatsGroup(BaseModel):
+    mime_type: Optional[str] = None
+    runs: int
+    stages: Dict[str, StagePercentiles]  # queue_wait, extract, parse, score, total
+
+
+class TraceStatsResponse(BaseModel):
+    since: datetime
+    until: datetime
+    groups: List[TraceStatsGroup]
+
+
+class PipelineTraceRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    run_id: str
+    cv_file_id: Optional[int] = None
+    application_id: Optional[int] = None
+    mime_type: Optional[str] = None
+    lane: Optional[str] = None
+    status: str
+    queue_wait_ms: float
+    extract_ms: Optional[float] = None
+    parse_ms: Optional[float] = None
+    score_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    page_count: Optional[int] = None
+    ocr_pages: Optional[int] = None
+    cache_hits: List[str] = []
+    retries: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -5,3 +7,8 @@ class ApplicationScore(BaseModel):
     application_id: int
     candidate_full_name: str
     score: int
+    combined_score: Optional[float] = None
+    tfidf: Optional[float] = None
+    semantic: Optional[float] = None
+    scorer_version: Optional[str] = None
+    computed_at: Optional[datetime] = None
@@ -0,0 +1,336 @@
+"""
+Index de plus proches voisins approché (IVF) sur les embeddings de CV.
+
+- Listes inversées autour de centroïdes k-means (sphériques, vecteurs normalisés)
+- Quantification int8 optionnelle, échelle par dimension (÷4 mémoire vs float32)
+- Mise à jour incrémentale (add / remove) à partir de text_embeddings
+- Persisté en .npz, rechargé à chaud par l'API quand le fichier change
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+INDEX_PATH = Path(settings.MODEL_ARTIFACTS_DIR) / "ann" / "cv_index.npz"
+# En dessous, un seul "cluster" : recherche exacte, pas d'entraînement
+MIN_TRAIN_SIZE = 1024
+# Recouvrement de la fenêtre de synchro : now() Postgres = début de transaction,
+# une tâche longue peut commiter des lignes "dans le passé". add() est idempotent.
+SYNC_OVERLAP = timedelta(minutes=15)
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, n_iter: int = 15, seed: int = 0) -> np.ndarray:
+    """k-means sphérique (similarité cosinus) sur des vecteurs normalisés."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = vectors[assign == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+            else:
+                # cluster vide : on le réinitialise sur un point au hasard
+                centroid = vectors[rng.integers(len(vectors))]
+            norm = np.linalg.norm(centroid)
+            centroids[c] = centroid / norm if norm > 0 else centroid
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Index IVF-Flat (float32) ou IVF-SQ8 (int8)."""
+
+    def __init__(
+        self,
+        dim: int,
+        centroids: Optional[np.ndarray] = None,
+        quantize: bool = False,
+        scales: Optional[np.ndarray] = None,
+    ):
+        self.dim = dim
+        self.quantize = quantize
+        # int8 : code = round(v / scale * 127), scale = max |v| par dimension
+        self.scales = scales if scales is not None else np.ones(dim, dtype=np.float32)
+        self.centroids = (
+            centroids if centroids is not None else np.zeros((1, dim), dtype=np.float32)
+        )
+        n_lists = len(self.centroids)
+        self.list_ids: List[np.ndarray] = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.list_codes: List[np.ndarray] = [
+            np.empty((0, dim), dtype=self._code_dtype) for _ in range(n_lists)
+        ]
+        self.synced_at: Optional[str] = None  # filigrane de synchronisation (ISO)
+        self.trained_size = 0
+
+    @property
+    def _code_dtype(self):
+        return np.int8 if self.quantize else np.float32
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return int(sum(len(ids) for ids in self.list_ids))
+
+    # ------------------------------------------------------------------
+    # Construction / mise à jour
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(
+        cls,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        n_lists: int = 0,
+        quantize: bool = False,
+    ) -> "IVFIndex":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        if n_lists <= 0:
+            n_lists = int(np.sqrt(len(vectors))) if len(vectors) >= MIN_TRAIN_SIZE else 1
+        n_lists = max(1, min(n_lists, len(vectors)))
+
+        centroids = _kmeans(vectors, n_lists) if n_lists > 1 else None
+        scales = None
+        if quantize:
+            scales = np.abs(vectors).max(axis=0).astype(np.float32)
+            scales[scales == 0] = 1.0
+        index = cls(dim, centroids, quantize=quantize, scales=scales)
+        index.trained_size = len(vectors)
+        index.add(ids, vectors)
+        return index
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.quantize:
+            return np.clip(np.rint(vectors / self.scales * 127), -127, 127).astype(np.int8)
+        return vectors.astype(np.float32)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if not len(ids):
+            return
+        for c in range(self.n_lists):
+            keep = ~np.isin(self.list_ids[c], ids)
+            if not keep.all():
+                self.list_ids[c] = self.list_ids[c][keep]
+                self.list_codes[c] = self.list_codes[c][keep]
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Ajoute (ou remplace) des vecteurs ; l'affectation utilise les centroïdes existants."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.remove(ids)
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        codes = self._encode(vectors)
+        for c in np.unique(assign):
+            mask = assign == c
+            self.list_ids[c] = np.concatenate([self.list_ids[c], ids[mask]])
+            self.list_codes[c] = np.concatenate([self.list_codes[c], codes[mask]])
+
+    def needs_retrain(self) -> bool:
+        """Le nombre de vecteurs a beaucoup augmenté depuis l'entraînement des centroïdes."""
+        size = len(self)
+        if self.n_lists == 1:
+            return size >= MIN_TRAIN_SIZE
+        return size > 4 * max(self.trained_size, 1)
+
+    def all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.concatenate(self.list_ids)
+        codes = np.concatenate(self.list_codes)
+        vectors = codes.astype(np.float32) * (self.scales / 127) if self.quantize else codes
+        return ids, vectors
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        n_probe: int = 8,
+        allowed_ids: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Top-k (id, similarité cosinus) en ne parcourant que les n_probe listes les plus proches."""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        n_probe = max(1, min(n_probe, self.n_lists))
+        if n_probe < self.n_lists:
+            probe = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        else:
+            probe = np.arange(self.n_lists)
+
+        ids = np.concatenate([self.list_ids[c] for c in probe])
+        if not len(ids):
+            return []
+        codes = np.concatenate([self.list_codes[c] for c in probe])
+        if self.quantize:
+            scores = codes @ (query * (self.scales / 127))
+        else:
+            scores = codes @ query
+
+        if allowed_ids is not None:
+            mask = np.isin(ids, allowed_ids)
+            ids, scores = ids[mask], scores[mask]
+            if not len(ids):
+                return []
+
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                sizes=sizes,
+                ids=np.concatenate(self.list_ids),
+                codes=np.concatenate(self.list_codes),
+                quantize=np.array(self.quantize),
+                scales=self.scales,
+                trained_size=np.array(self.trained_size),
+                synced_at=np.array(self.synced_at or ""),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "IVFIndex":
+        with np.load(path) as data:
+            centroids = data["centroids"]
+            index = cls(
+                centroids.shape[1], centroids,
+                quantize=bool(data["quantize"]), scales=data["scales"],
+            )
+            offsets = np.concatenate([[0], np.cumsum(data["sizes"])])
+            ids, codes = data["ids"], data["codes"]
+            index.list_ids = [ids[offsets[c]:offsets[c + 1]] for c in range(index.n_lists)]
+            index.list_codes = [codes[offsets[c]:offsets[c + 1]] for c in range(index.n_lists)]
+            index.trained_size = int(data["trained_size"])
+            index.synced_at = str(data["synced_at"]) or None
+        return index
+
+
+# ---------------------------------------------------------------------------
+# Synchronisation avec text_embeddings (worker) et index courant (API)
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _writer_lock(path: Path):
+    """Un seul processus modifie le fichier d'index à la fois."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f".{path.name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def sync_cv_index(db, path: Path = INDEX_PATH, rebuild: bool = False) -> IVFIndex:
+    """
+    Ajoute à l'index les embeddings de CV créés/modifiés depuis le dernier passage.
+    Reconstruit (ré-entraîne les centroïdes) si demandé ou si l'index a trop grossi.
+    """
+    from sqlalchemy import func
+
+    from app.models.embedding import EmbeddingOwner, TextEmbedding
+    from app.services import embedding_store, embeddings
+
+    version = embeddings.embedding_version()
+    changed_at = func.coalesce(TextEmbedding.updated_at, TextEmbedding.created_at)
+
+    with _writer_lock(path):
+        index = None
+        if path.is_file() and not rebuild:
+            index = IVFIndex.load(path)
+
+        started_at = datetime.now(timezone.utc)
+        query = db.query(TextEmbedding.owner_id, TextEmbedding.vector).filter(
+            TextEmbedding.owner_type == EmbeddingOwner.CV,
+            TextEmbedding.model_version == version,
+        )
+        if index is not None and index.synced_at:
+            since = datetime.fromisoformat(index.synced_at) - SYNC_OVERLAP
+            query = query.filter(changed_at >= since)
+        rows = query.all()
+
+        ids = np.array([owner_id for owner_id, _ in rows], dtype=np.int64)
+        vectors = (
+            np.stack([embedding_store.from_bytes(v) for _, v in rows])
+            if rows else None
+        )
+
+        if index is None:
+            if vectors is None:
+                return IVFIndex(0)
+            index = IVFIndex.build(
+                ids, vectors, n_lists=settings.ANN_N_LISTS, quantize=settings.ANN_QUANTIZE_INT8
+            )
+        else:
+            if vectors is not None:
+                index.add(ids, vectors)
+            if index.needs_retrain():
+                all_ids, all_vectors = index.all_vectors()
+                index = IVFIndex.build(
+                    all_ids, all_vectors,
+                    n_lists=settings.ANN_N_LISTS, quantize=settings.ANN_QUANTIZE_INT8,
+                )
+
+        index.synced_at = started_at.isoformat()
+        index.save(path)
+        logger.info("ann_index_synced", added=len(rows), size=len(index), n_lists=index.n_lists)
+        return index
+
+
+_current: Optional[IVFIndex] = None
+_current_mtime = 0.0
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_index(path: Path = INDEX_PATH) -> Optional[IVFIndex]:
+    """Index courant du processus, rechargé quand le fichier sur disque change."""
+    global _current, _current_mtime, _last_check
+
+    now = time.monotonic()
+    if _current is not None and now - _last_check < settings.ANN_RELOAD_CHECK_SECONDS:
+        return _current
+
+    with _lock:
+        _last_check = now
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return _current
+        if _current is None or mtime != _current_mtime:
+            started = time.perf_counter()
+            _current = IVFIndex.load(path)
+            _current_mtime = mtime
+            logger.info(
+                "ann_index_loaded",
+                size=len(_current),
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+    return _current
@@ -0,0 +1,225 @@
+"""
+Scores persistés des candidatures.
+
+Calculés par le worker après extraction (ou paresseusement à la première
+lecture), puis servis par simple lecture indexée sur application_id. Un score
+reste valable tant que les hash du texte du CV et de la description de l'offre
+ainsi que la version du scorer n'ont pas changé. Un score calculé sans SBERT
+(semantic NULL : modèle non chargé ou encodeur en erreur) est recalculé par le
+premier processus où le modèle est chargé ; une lecture de l'API ne charge
+jamais SBERT pour le vérifier.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import structlog
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.application_score import ApplicationScoreResult
+from app.models.cv_text import CVText
+from app.models.embedding import EmbeddingOwner
+from app.services import embedding_store, embeddings
+from app.services.scoring import (
+    combine_score_arrays,
+    keyword_overlap_score,
+    keyword_overlap_scores,
+    tfidf_cosine_scores,
+)
+
+logger = structlog.get_logger(__name__)
+
+# À incrémenter quand la formule (pondérations, normalisation) change
+SCORER_VERSION = "score-v1"
+
+
+def scorer_version() -> str:
+    return f"{SCORER_VERSION}+{embeddings.embedding_version()}"
+
+
+def is_fresh(row: Optional[ApplicationScoreResult], cv_hash: Optional[str], offer_hash: str) -> bool:
+    if (
+        row is None
+        or cv_hash is None
+        or row.cv_hash != cv_hash
+        or row.offer_hash != offer_hash
+        or row.scorer_version != scorer_version()
+    ):
+        return False
+    # Score dégradé (sans similarité sémantique) : périmé si le modèle est déjà chargé
+    return row.semantic is not None or not embeddings.registry.loaded
+
+
+def compute_score(
+    db: Session,
+    application_id: int,
+    offer_id: int,
+    job_text: str,
+    cv_text: str,
+    quality_score: Optional[float] = None,
+    row: Optional[ApplicationScoreResult] = None,
+) -> ApplicationScoreResult:
+    """Calcule et upserte le score d'une candidature. Ne commit pas."""
+    overlap = keyword_overlap_score(job_text, cv_text)
+    tfidf_scores = tfidf_cosine_scores(job_text, [cv_text])
+    tfidf = float(tfidf_scores[0]) if tfidf_scores else 0.0
+
+    semantic = None
+    try:
+        job_vector = embedding_store.ensure_embedding(db, EmbeddingOwner.OFFER, offer_id, job_text)
+        cv_vector = embedding_store.ensure_embedding(db, EmbeddingOwner.CV, application_id, cv_text)
+    except Exception as e:
+        # Encodeur en erreur (sidecar arrêté, ...) : score dégradé, recalculé plus tard
+        logger.warning("application_score_semantic_failed", application_id=application_id, error=repr(e))
+    else:
+        if job_vector is not None and cv_vector is not None:
+            semantic = embeddings.vector_similarity(job_vector, cv_vector)
+
+    quality = None if quality_score is None else np.array([quality_score], dtype=float)
+    combined = combine_score_arrays(
+        np.array([tfidf]), np.array([overlap / 100.0]), np.array([semantic or 0.0]), quality
+    )
+
+    if row is None:
+        row = db.query(ApplicationScoreResult).filter(
+            ApplicationScoreResult.application_id == application_id
+        ).one_or_none()
+    if row is None:
+        row = ApplicationScoreResult(application_id=application_id)
+        db.add(row)
+    row.cv_hash = embedding_store.content_hash(cv_text)
+    row.offer_hash = embedding_store.content_hash(job_text)
+    row.scorer_version = scorer_version()
+    row.keyword_overlap = int(overlap)
+    row.tfidf = round(tfidf, 6)
+    row.semantic = None if semantic is None else round(semantic, 6)
+    row.combined_score = round(float(combined[0]), 2)
+    return row
+
+
+def ensure_score(
+    db: Session,
+    application_id: int,
+    offer_id: int,
+    job_text: str,
+    cv_hash: Optional[str],
+    quality_score: Optional[float] = None,
+    cv_text: Optional[str] = None,
+) -> ApplicationScoreResult:
+    """
+    Score à jour d'une candidature : lecture du score stocké s'il est frais,
+    sinon recalcul (le texte du CV n'est chargé que dans ce cas). Ne commit pas.
+    """
+    row = db.query(ApplicationScoreResult).filter(
+        ApplicationScoreResult.application_id == application_id
+    ).one_or_none()
+    if is_fresh(row, cv_hash, embedding_store.content_hash(job_text)):
+        return row
+
+    if cv_text is None:
+        cv_row = db.query(CVText).filter(CVText.application_id == application_id).one()
+        cv_text = cv_row.extracted_text or ""
+        if cv_row.content_hash is None:
+            # Lignes antérieures au hash : renseigné au premier recalcul
+            cv_row.content_hash = embedding_store.content_hash(cv_text)
+
+    row = compute_score(db, application_id, offer_id, job_text, cv_text, quality_score, row=row)
+    logger.info(
+        "application_score_computed",
+        application_id=application_id,
+        combined_score=row.combined_score,
+        scorer_version=row.scorer_version,
+    )
+    return row
+
+
+@dataclass
+class ScoreInput:
+    application_id: int
+    cv_text: str
+    quality_score: Optional[float] = None
+    token_counts: Optional[Dict[str, int]] = None
+
+
+def upsert_scores(
+    db: Session,
+    offer_id: int,
+    job_text: str,
+    items: Sequence[ScoreInput],
+    job_counts: Optional[Dict[str, int]] = None,
+) -> int:
+    """
+    Variante batch de ensure_score pour des candidatures d'une même offre :
+    une lecture des scores stockés, un encodage SBERT batché des CV, un calcul
+    vectorisé puis un UPDATE / INSERT groupé. job_counts : offers.token_counts
+    (None : description re-tokenisée). Retourne le nombre de scores
+    recalculés. Ne commit pas.
+    """
+    offer_hash = embedding_store.content_hash(job_text)
+    existing = {
+        row.application_id: row
+        for row in db.query(
+            ApplicationScoreResult.id,
+            ApplicationScoreResult.application_id,
+            ApplicationScoreResult.cv_hash,
+            ApplicationScoreResult.offer_hash,
+            ApplicationScoreResult.scorer_version,
+            ApplicationScoreResult.semantic,
+        ).filter(ApplicationScoreResult.application_id.in_([i.application_id for i in items]))
+    }
+    cv_hashes = {i.application_id: embedding_store.content_hash(i.cv_text) for i in items}
+    stale: List[ScoreInput] = [
+        i for i in items if not is_fresh(existing.get(i.application_id), cv_hashes[i.application_id], offer_hash)
+    ]
+    if not stale:
+        return 0
+
+    texts = [i.cv_text for i in stale]
+    tfidf = np.asarray(tfidf_cosine_scores(job_text, texts), dtype=float)
+    overlap = keyword_overlap_scores(
+        job_text, texts, cv_counts=[i.token_counts for i in stale], job_counts=job_counts,
+    )
+
+    job_vector = embedding_store.ensure_embedding(db, EmbeddingOwner.OFFER, offer_id, job_text)
+    cv_vectors = embedding_store.ensure_embeddings(
+        db, EmbeddingOwner.CV, [(i.application_id, i.cv_text) for i in stale]
+    )
+    semantic: List[Optional[float]] = [
+        embeddings.vector_similarity(job_vector, cv_vectors[i.application_id])
+        if job_vector is not None and i.application_id in cv_vectors else None
+        for i in stale
+    ]
+
+    quality = np.array(
+        [np.nan if i.quality_score is None else i.quality_score for i in stale], dtype=float
+    )
+    combined = combine_score_arrays(
+        tfidf, overlap / 100.0, np.array([s or 0.0 for s in semantic]), quality
+    )
+
+    version = scorer_version()
+    updates, inserts = [], []
+    for n, item in enumerate(stale):
+        values = {
+            "application_id": item.application_id,
+            "cv_hash": cv_hashes[item.application_id],
+            "offer_hash": offer_hash,
+            "scorer_version": version,
+            "keyword_overlap": int(overlap[n]),
+            "tfidf": round(float(tfidf[n]), 6),
+            "semantic": None if semantic[n] is None else round(semantic[n], 6),
+            "combined_score": round(float(combined[n]), 2),
+        }
+        row = existing.get(item.application_id)
+        if row is None:
+            inserts.append(values)
+        else:
+            updates.append({"id": row.id, **values})
+    if updates:
+        db.execute(update(ApplicationScoreResult), updates)
+    if inserts:
+        db.execute(insert(ApplicationScoreResult), inserts)
+
+    logger.info("application_scores_upserted", offer_id=offer_id, computed=len(stale), reused=len(items) - len(stale))
+    return len(stale)
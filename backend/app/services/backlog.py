@@ -0,0 +1,158 @@
+"""
+Backlog des files Celery et contrôle d'admission des uploads de CV.
+
+Avec le transport Redis de kombu, une file est une liste (LPUSH à l'envoi,
+BRPOP à la consommation) : le plus ancien message est en fin de liste
+(LINDEX -1). Les priorités non nulles sont des listes sœurs
+"<file>\\x06\\x16<priorité>". L'âge vient de l'en-tête enqueued_at posé à
+l'envoi (signal before_task_publish de celery_app).
+
+Quand la file d'entrée (cv_extract) dépasse BACKLOG_MAX_DEPTH messages ou
+BACKLOG_MAX_AGE_SECONDS d'attente, l'upload suit ADMISSION_POLICY :
+- accept : comportement historique, la tâche est mise en file ;
+- defer  : le fichier est stocké (statut DEFERRED), la tâche périodique
+           release_deferred_uploads le met en file quand la charge redescend ;
+- reject : 429 + Retry-After, rien n'est écrit ;
+- bulk   : la chaîne part sur la file basse priorité cv_bulk.
+Redis indisponible : pas de contrôle (accept).
+"""
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.workers.celery_app import QUEUE_BULK, QUEUE_EXTRACT, QUEUES, queue_lane
+
+logger = structlog.get_logger(__name__)
+
+ACCEPT = "accept"
+DEFER = "defer"
+REJECT = "reject"
+BULK = "bulk"
+POLICIES = (ACCEPT, DEFER, REJECT, BULK)
+
+# Séparateur et niveaux de priorité du transport Redis de kombu (priority_steps par défaut)
+_PRIORITY_SEP = "\x06\x16"
+_PRIORITY_STEPS = (0, 3, 6, 9)
+
+_client = None
+_cache_lock = threading.Lock()
+_cache: Dict[str, object] = {"at": 0.0, "backlog": None}
+
+
+def _redis():
+    global _client
+    if _client is None:
+        from redis import Redis
+        _client = Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=1.0)
+    return _client
+
+
+@dataclass
+class QueueBacklog:
+    name: str
+    depth: int
+    oldest_age_seconds: Optional[float]  # None : file vide ou message sans enqueued_at
+
+    @property
+    def overloaded(self) -> bool:
+        if self.depth > settings.BACKLOG_MAX_DEPTH:
+            return True
+        return (self.oldest_age_seconds or 0.0) > settings.BACKLOG_MAX_AGE_SECONDS
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "lane": queue_lane(self.name), "overloaded": self.overloaded}
+
+
+@dataclass
+class Admission:
+    action: str
+    queue: Optional[str] = None  # file forcée pour la chaîne (policy bulk)
+    retry_after: Optional[int] = None
+    backlog: Optional[QueueBacklog] = None
+
+
+def _sub_queues(name: str) -> List[str]:
+    return [name if step == 0 else f"{name}{_PRIORITY_SEP}{step}" for step in _PRIORITY_STEPS]
+
+
+def _enqueued_at(raw: Optional[bytes]) -> Optional[float]:
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)["headers"].get("enqueued_at")
+        return float(value) if value is not None else None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _read_backlog() -> Dict[str, QueueBacklog]:
+    """Profondeur et âge du plus ancien message de chaque file (un seul aller-retour)."""
+    pipe = _redis().pipeline(transaction=False)
+    for name in QUEUES:
+        for key in _sub_queues(name):
+            pipe.llen(key)
+            pipe.lindex(key, -1)
+    replies = iter(pipe.execute())
+
+    now = time.time()
+    backlog = {}
+    for name in QUEUES:
+        depth = 0
+        oldest: Optional[float] = None
+        for _ in _PRIORITY_STEPS:
+            depth += int(next(replies) or 0)
+            enqueued_at = _enqueued_at(next(replies))
+            if enqueued_at is not None and (oldest is None or enqueued_at < oldest):
+                oldest = enqueued_at
+        age = round(max(0.0, now - oldest), 1) if oldest is not None else None
+        backlog[name] = QueueBacklog(name=name, depth=depth, oldest_age_seconds=age)
+    return backlog
+
+
+def queue_backlog(max_age: Optional[float] = None) -> Dict[str, QueueBacklog]:
+    """
+    Backlog par file, mis en cache BACKLOG_CACHE_SECONDS : sous une rafale
+    d'uploads, Redis n'est interrogé qu'une fois par intervalle et par processus.
+    """
+    ttl = settings.BACKLOG_CACHE_SECONDS if max_age is None else max_age
+    with _cache_lock:
+        if _cache["backlog"] is not None and time.monotonic() - _cache["at"] < ttl:
+            return _cache["backlog"]
+        backlog = _read_backlog()
+        _cache["at"] = time.monotonic()
+        _cache["backlog"] = backlog
+        return backlog
+
+
+def admit_upload() -> Admission:
+    """Décision d'admission d'un upload selon le backlog de la file d'entrée."""
+    policy = settings.ADMISSION_POLICY
+    if policy == ACCEPT:
+        return Admission(ACCEPT)
+    if policy not in POLICIES:
+        logger.warning("admission_policy_unknown", policy=policy)
+        return Admission(ACCEPT)
+    try:
+        entry = queue_backlog()[QUEUE_EXTRACT]
+    except Exception as e:
+        logger.warning("backlog_unavailable", error=repr(e))
+        return Admission(ACCEPT)
+
+    if not entry.overloaded:
+        return Admission(ACCEPT, backlog=entry)
+
+    logger.info(
+        "upload_admission",
+        action=policy,
+        queue=entry.name,
+        depth=entry.depth,
+        oldest_age_seconds=entry.oldest_age_seconds,
+    )
+    if policy == BULK:
+        return Admission(BULK, queue=QUEUE_BULK, backlog=entry)
+    return Admission(policy, retry_after=settings.BACKLOG_RETRY_AFTER_SECONDS, backlog=entry)
@@ -0,0 +1,485 @@
+"""
+Ingestion en masse de CV (import d'un export de job board).
+
+Variante batch de la chaîne extract_cv_file -> parse_cv -> score_cv pour une
+liste de cv_files : les lignes liées sont chargées en quelques requêtes,
+l'extraction tourne dans un pool de threads, le parsing passe par
+CVParser.parse_many (nlp.pipe) et les écritures CVFile / CVText / ParsedCV /
+application_scores sont groupées (un UPDATE / INSERT par table et par chunk).
+
+Mêmes règles d'idempotence que les tâches unitaires : texte déjà extrait,
+parsing dont le source_hash correspond, score dont score_inputs_hash
+correspond ne sont pas recalculés, s'ils sont de la version courante
+(EXTRACTOR_VERSION, CVParser.VERSION, CVScorer.VERSION). C'est aussi le
+moteur du retraitement des sorties obsolètes (app.tools.backfill).
+"""
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import structlog
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.application import Application
+from app.models.cv_file import CVFile, CVFileStatus
+from app.models.cv_text import CVText
+from app.models.offer import Offer
+from app.models.parsed_cv import ParsedCV
+from app.services import (
+    application_scores, embedding_store, extraction_pool, job_claims, pipeline_events, pipeline_traces,
+    token_counts,
+)
+from app.services.cv_extraction import EXTRACTOR_VERSION, ExtractionError
+from app.services.cv_parser import CVParser
+from app.services.cv_scorer import CVScorer
+
+logger = structlog.get_logger(__name__)
+
+@dataclass
+class IngestionStats:
+    files: int = 0
+    extracted: int = 0
+    reused: int = 0  # texte déjà extrait
+    in_progress: int = 0  # EXTRACTING côté tâche unitaire
+    failed: int = 0
+    parsed: int = 0
+    scored: int = 0
+    combined_scored: int = 0
+    retry_ids: List[int] = field(default_factory=list)  # erreurs transitoires
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def merge(self, other: "IngestionStats") -> None:
+        for name in ("files", "extracted", "reused", "in_progress", "failed", "parsed", "scored", "combined_scored"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.retry_ids.extend(other.retry_ids)
+        for stage, ms in other.timings_ms.items():
+            self.timings_ms[stage] = round(self.timings_ms.get(stage, 0.0) + ms, 1)
+
+
+@dataclass
+class _Extraction:
+    cv_file_id: int
+    text: Optional[str] = None
+    quality_score: Optional[float] = None
+    error: Optional[str] = None
+    retryable: bool = False
+    duration_ms: float = 0.0
+    page_count: Optional[int] = None
+    ocr_pages: Optional[int] = None
+
+
+def chunks(ids: Sequence[int], size: Optional[int] = None) -> Iterator[List[int]]:
+    size = max(1, size or settings.BULK_INGEST_CHUNK_SIZE)
+    for start in range(0, len(ids), size):
+        yield list(ids[start:start + size])
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _extract(cv_file_id: int, storage_path: str, mime_type: str) -> _Extraction:
+    started = time.perf_counter()
+    try:
+        result = extraction_pool.extract(storage_path, mime_type)
+    except ExtractionError as e:
+        return _Extraction(cv_file_id, error=str(e), duration_ms=_elapsed_ms(started))
+    except Exception as e:
+        return _Extraction(cv_file_id, error=repr(e), retryable=True, duration_ms=_elapsed_ms(started))
+    if isinstance(result, tuple):
+        meta = (result[2] if len(result) > 2 else None) or {}
+        return _Extraction(
+            cv_file_id,
+            text=result[0],
+            quality_score=result[1] if len(result) > 1 else None,
+            duration_ms=_elapsed_ms(started),
+            page_count=meta.get("page_count"),
+            ocr_pages=meta.get("ocr_pages"),
+        )
+    return _Extraction(cv_file_id, text=result, duration_ms=_elapsed_ms(started))
+
+
+def _wait_renewing_leases(db: Session, futures, cv_file_ids: List[int], owner: Optional[str]) -> None:
+    """
+    Attend les extractions du chunk en prolongeant les leases toutes les
+    CLAIM_LEASE_SECONDS / 3 : un chunk de fichiers lents (OCR, délai
+    EXTRACTION_TIMEOUT_SECONDS chacun) n'est pas repris par le reaper ni par
+    un autre worker pendant son traitement. Les fichiers extraits restent
+    EXTRACTING jusqu'au commit du chunk : tous les leases sont prolongés.
+    """
+    interval = max(1.0, settings.CLAIM_LEASE_SECONDS / 3)
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=interval)
+        if pending:
+            renewed = job_claims.renew(db, cv_file_ids, owner)
+            logger.info("bulk_ingestion_leases_renewed", files=renewed, pending=len(pending))
+    if futures:
+        # Parsing et scoring du chunk restent à faire avant son commit
+        job_claims.renew(db, cv_file_ids, owner)
+
+
+def _trace_rows(
+    files, extractions: Dict[int, _Extraction], failures: Dict[int, str], texts: Dict[int, tuple],
+    to_parse: List[int], stats: "IngestionStats", scored: set, lane: str, started: float,
+) -> List[Dict]:
+    """
+    Une trace par fichier traité jusqu'au bout (scoré ou en échec). Parsing et
+    score étant batchés, leur durée est celle du batch répartie par fichier.
+    """
+    parse_ms = round(stats.timings_ms.get("parse", 0.0) / len(to_parse), 1) if to_parse else None
+    score_ms = round(stats.timings_ms.get("score", 0.0) / len(scored), 1) if scored else None
+    total_ms = _elapsed_ms(started)
+    parsed = set(to_parse)
+    finished_at = datetime.now(timezone.utc)
+    rows = []
+    for f in files:
+        if f.application_id not in failures and f.application_id not in texts:
+            continue  # en cours ailleurs ou renvoyé vers la chaîne unitaire
+        extraction = extractions.get(f.id)
+        cache_hits = [] if extraction is not None else ["extract"]
+        row = {
+            "run_id": f"{lane}:{uuid.uuid4().hex}",
+            "cv_file_id": f.id,
+            "application_id": f.application_id,
+            "mime_type": f.mime_type,
+            "lane": lane,
+            "queue_wait_ms": 0.0,
+            "extract_ms": extraction.duration_ms if extraction is not None else None,
+            "page_count": extraction.page_count if extraction is not None else None,
+            "ocr_pages": extraction.ocr_pages if extraction is not None else None,
+            "retries": 0,
+            "total_ms": total_ms,
+            "finished_at": finished_at,
+        }
+        if f.application_id in failures:
+            cache_hits = []
+            row.update(status=pipeline_traces.FAILED, error=failures[f.application_id][:2000])
+        else:
+            if f.application_id not in parsed:
+                cache_hits.append("parse")
+            if f.application_id not in scored:
+                cache_hits.append("score")
+            row.update(
+                status=pipeline_traces.SCORED,
+                parse_ms=parse_ms if f.application_id in parsed else None,
+                score_ms=score_ms if f.application_id in scored else None,
+            )
+        row["cache_hits"] = cache_hits
+        rows.append(row)
+    return rows
+
+
+def ingest_cv_files(
+    db: Session,
+    cv_file_ids: Sequence[int],
+    extract_workers: Optional[int] = None,
+    parse_batch_size: Optional[int] = None,
+    resume: bool = False,
+    lane: str = "bulk",
+    owner: Optional[str] = None,
+) -> IngestionStats:
+    """
+    Traite un chunk de cv_files. Deux commits : le marquage EXTRACTING (comme
+    la tâche unitaire, pour qu'une autre tâche ne reprenne pas ces fichiers)
+    puis toutes les écritures du chunk.
+
+    resume : reprise après échec, les fichiers EXTRACTING sont retraités.
+    Les erreurs d'extraction inattendues (transitoires) remettent le fichier
+    à UPLOADED et sont listées dans retry_ids, à relancer par la tâche unitaire.
+    lane : voie enregistrée dans les traces (services.pipeline_traces).
+    owner : détenteur des leases du chunk (claim worker) ; ils sont prolongés
+    pendant l'extraction, quelle que soit sa durée.
+    """
+    stats = IngestionStats(files=len(cv_file_ids))
+    started = time.perf_counter()
+    chunk_started = started
+
+    # 1) Chargement groupé des lignes liées
+    files = db.query(
+        CVFile.id, CVFile.application_id, CVFile.storage_path, CVFile.mime_type, CVFile.status
+    ).filter(CVFile.id.in_(list(cv_file_ids))).all()
+    application_ids = [f.application_id for f in files]
+    cv_texts = {
+        row.application_id: row
+        for row in db.query(
+            CVText.id, CVText.application_id, CVText.status, CVText.extracted_text,
+            CVText.content_hash, CVText.quality_score, CVText.token_counts, CVText.extractor_version,
+        ).filter(CVText.application_id.in_(application_ids))
+    }
+    offers: Dict[int, Offer] = dict(
+        db.query(Application.id, Offer)
+        .join(Offer, Offer.id == Application.offer_id)
+        .filter(Application.id.in_(application_ids))
+        .all()
+    )
+    parsed_rows = {
+        row.application_id: row
+        for row in db.query(
+            ParsedCV.id, ParsedCV.application_id, ParsedCV.source_hash, ParsedCV.score_inputs_hash,
+            ParsedCV.parser_version, ParsedCV.scorer_version,
+            *(getattr(ParsedCV, name) for name in CVParser.FIELDS),
+        ).filter(ParsedCV.application_id.in_(application_ids))
+    }
+    stats.timings_ms["load"] = _elapsed_ms(started)
+
+    file_updates: List[Dict] = []
+    text_updates: List[Dict] = []
+    # application_id -> (texte, hash, qualité, comptes) des CV extraits
+    texts: Dict[int, tuple] = {}
+    to_extract = []
+    failures: Dict[int, str] = {}  # application_id -> erreur (événements "failed")
+    for f in files:
+        cv_text = cv_texts.get(f.application_id)
+        if cv_text is None:
+            file_updates.append({
+                "id": f.id,
+                "status": CVFileStatus.FAILED.value,
+                "error_message": "No CVText row for this application",
+            })
+            failures[f.application_id] = "No CVText row for this application"
+            stats.failed += 1
+        elif (
+            f.status == CVFileStatus.EXTRACTED.value
+            and cv_text.status == "SUCCESS"
+            and cv_text.extractor_version == EXTRACTOR_VERSION
+        ):
+            text = cv_text.extracted_text or ""
+            texts[f.application_id] = (
+                text,
+                cv_text.content_hash or embedding_store.content_hash(text),
+                cv_text.quality_score,
+                cv_text.token_counts,
+            )
+            stats.reused += 1
+        elif f.status == CVFileStatus.EXTRACTING.value and not resume:
+            stats.in_progress += 1
+        else:
+            to_extract.append(f)
+
+    if to_extract:
+        # Lease (services.job_claims) : le reaper ne reprend ces lignes que si le chunk n'aboutit pas
+        deadline = job_claims.lease_deadline()
+        db.execute(
+            update(CVFile),
+            [
+                {"id": f.id, "status": CVFileStatus.EXTRACTING.value, "lease_expires_at": deadline}
+                for f in to_extract
+            ],
+        )
+        db.commit()
+
+    # 2) Extraction en parallèle : chaque thread attend un sous-processus
+    #    d'extraction_pool (EXTRACTION_POOL_SIZE à la fois), ou extrait dans le
+    #    processus si EXTRACTION_POOL_ENABLED=false
+    started = time.perf_counter()
+    workers = max(1, extract_workers or settings.BULK_EXTRACT_WORKERS)
+    by_id = {f.id: f for f in to_extract}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract, f.id, f.storage_path, f.mime_type) for f in to_extract]
+        _wait_renewing_leases(db, futures, list(by_id), owner)
+        extractions = [future.result() for future in futures]
+    stats.timings_ms["extract"] = _elapsed_ms(started)
+
+    for result in extractions:
+        f = by_id[result.cv_file_id]
+        cv_text = cv_texts[f.application_id]
+        if result.retryable:
+            file_updates.append({
+                "id": f.id,
+                "status": CVFileStatus.UPLOADED.value,
+                "lease_expires_at": None,
+                "error_message": f"Bulk ingestion retry: {result.error}",
+            })
+            stats.retry_ids.append(f.id)
+        elif result.error is not None and cv_text.status == "SUCCESS" and cv_text.extracted_text is not None:
+            # Ré-extraction d'un texte d'une version antérieure : il est conservé
+            text = cv_text.extracted_text
+            file_updates.append({
+                "id": f.id, "status": CVFileStatus.EXTRACTED.value,
+                "error_message": f"Re-extraction failed: {result.error}", "lease_expires_at": None,
+            })
+            texts[f.application_id] = (
+                text,
+                cv_text.content_hash or embedding_store.content_hash(text),
+                cv_text.quality_score,
+                cv_text.token_counts,
+            )
+            stats.failed += 1
+        elif result.error is not None:
+            file_updates.append({
+                "id": f.id, "status": CVFileStatus.FAILED.value, "error_message": result.error, "lease_expires_at": None,
+            })
+            text_updates.append({"id": cv_text.id, "status": "FAILED", "error_message": result.error})
+            failures[f.application_id] = result.error
+            stats.failed += 1
+        else:
+            digest = embedding_store.content_hash(result.text)
+            counts = token_counts.count_tokens(result.text)
+            file_updates.append({
+                "id": f.id, "status": CVFileStatus.EXTRACTED.value, "error_message": None, "lease_expires_at": None,
+            })
+            text_updates.append({
+                "id": cv_text.id,
+                "status": "SUCCESS",
+                "extracted_text": result.text,
+                "quality_score": result.quality_score,
+                "content_hash": digest,
+                "token_counts": counts,
+                "extractor_version": EXTRACTOR_VERSION,
+                "error_message": None,
+            })
+            texts[f.application_id] = (result.text, digest, result.quality_score, counts)
+            stats.extracted += 1
+
+    # 3) Parsing par batch des textes dont le parsing stocké n'est plus à jour
+    started = time.perf_counter()
+    parsed_values: Dict[int, Dict] = {
+        app_id: {name: getattr(row, name) for name in CVParser.FIELDS}
+        for app_id, row in parsed_rows.items()
+    }
+    source_hashes = {app_id: row.source_hash for app_id, row in parsed_rows.items()}
+    inputs_hashes = {app_id: row.score_inputs_hash for app_id, row in parsed_rows.items()}
+    parser_versions = {app_id: row.parser_version for app_id, row in parsed_rows.items()}
+    scorer_versions = {app_id: row.scorer_version for app_id, row in parsed_rows.items()}
+    dirty = set()
+    scored = set()
+
+    to_parse = [
+        app_id for app_id, (_, digest, _, _) in texts.items()
+        if app_id not in parsed_rows
+        or parsed_rows[app_id].source_hash != digest
+        or parsed_rows[app_id].parser_version != CVParser.VERSION
+    ]
+    if to_parse:
+        results = CVParser().parse_many(
+            [texts[app_id][0] for app_id in to_parse],
+            batch_size=parse_batch_size or settings.BULK_PARSE_BATCH_SIZE,
+        )
+        for app_id, parsed in zip(to_parse, results):
+            parsed_values[app_id] = parsed
+            source_hashes[app_id] = texts[app_id][1]
+            parser_versions[app_id] = CVParser.VERSION
+            inputs_hashes[app_id] = None
+            dirty.add(app_id)
+        stats.parsed = len(to_parse)
+    stats.timings_ms["parse"] = _elapsed_ms(started)
+
+    # 4) Score structuré (un CVScorer par offre)
+    started = time.perf_counter()
+    scorers: Dict[int, tuple] = {}
+    for app_id in texts:
+        offer = offers.get(app_id)
+        if offer is None or app_id not in parsed_values:
+            continue
+        if offer.id not in scorers:
+            scorers[offer.id] = (CVScorer(weights=offer.scoring_weights), CVScorer.offer_criteria(offer))
+        scorer, criteria = scorers[offer.id]
+        inputs_hash = scorer.inputs_hash(source_hashes[app_id], criteria)
+        if inputs_hashes.get(app_id) == inputs_hash and scorer_versions.get(app_id) == CVScorer.VERSION:
+            continue
+        values = parsed_values[app_id]
+        scoring_result = scorer.calculate_score(
+            {
+                "skills": values.get("skills") or [],
+                "experience_years": values.get("experience_years"),
+                "education": values.get("education") or [],
+                "languages": values.get("languages") or [],
+            },
+            criteria,
+        )
+        values.update(scoring_result)
+        inputs_hashes[app_id] = inputs_hash
+        scorer_versions[app_id] = CVScorer.VERSION
+        dirty.add(app_id)
+        scored.add(app_id)
+        stats.scored += 1
+    stats.timings_ms["score"] = _elapsed_ms(started)
+
+    # 5) Écritures groupées
+    started = time.perf_counter()
+    parsed_updates, parsed_inserts = [], []
+    for app_id in dirty:
+        values = {
+            **parsed_values[app_id],
+            "application_id": app_id,
+            "source_hash": source_hashes[app_id],
+            "score_inputs_hash": inputs_hashes[app_id],
+            "parser_version": parser_versions.get(app_id),
+            "scorer_version": scorer_versions.get(app_id),
+        }
+        if app_id in parsed_rows:
+            parsed_updates.append({"id": parsed_rows[app_id].id, **values})
+        else:
+            parsed_inserts.append(values)
+    if file_updates:
+        db.execute(update(CVFile), file_updates)
+    if text_updates:
+        db.execute(update(CVText), text_updates)
+    if parsed_updates:
+        db.execute(update(ParsedCV), parsed_updates)
+    if parsed_inserts:
+        db.execute(insert(ParsedCV), parsed_inserts)
+    stats.timings_ms["write"] = _elapsed_ms(started)
+
+    # 6) Scores combinés (embedding SBERT batché), par offre
+    started = time.perf_counter()
+    by_offer: Dict[int, List[application_scores.ScoreInput]] = defaultdict(list)
+    offers_by_id: Dict[int, Offer] = {}
+    for app_id, (text, _, quality_score, counts) in texts.items():
+        offer = offers.get(app_id)
+        if offer is not None:
+            offers_by_id[offer.id] = offer
+            by_offer[offer.id].append(application_scores.ScoreInput(app_id, text, quality_score, counts))
+    for offer_id, items in by_offer.items():
+        try:
+            with db.begin_nested():
+                offer = offers_by_id[offer_id]
+                stats.combined_scored += application_scores.upsert_scores(
+                    db, offer_id, offer.description or "", items, job_counts=offer.token_counts,
+                )
+        except Exception as e:
+            logger.warning("bulk_application_scores_failed", offer_id=offer_id, error=repr(e))
+    stats.timings_ms["combined_score"] = _elapsed_ms(started)
+
+    pipeline_traces.add_batch(db, _trace_rows(
+        files, {result.cv_file_id: result for result in extractions}, failures, texts,
+        to_parse, stats, scored, lane, chunk_started,
+    ))
+    db.commit()
+
+    # Événements SSE de fin de traitement (un seul aller-retour Redis)
+    events = [
+        {"offer_id": offers[app_id].id, "application_id": app_id, "stage": pipeline_events.FAILED, "error": error}
+        for app_id, error in failures.items() if app_id in offers
+    ]
+    events += [
+        {
+            "offer_id": offers[app_id].id,
+            "application_id": app_id,
+            "stage": pipeline_events.SCORED,
+            "matching_score": parsed_values.get(app_id, {}).get("matching_score"),
+        }
+        for app_id in texts if app_id in offers
+    ]
+    if events:
+        pipeline_events.publish_many(events)
+
+    logger.info(
+        "cv_batch_ingested",
+        files=stats.files,
+        extracted=stats.extracted,
+        reused=stats.reused,
+        failed=stats.failed,
+        parsed=stats.parsed,
+        scored=stats.scored,
+        retry=len(stats.retry_ids),
+        **{f"{stage}_ms": ms for stage, ms in stats.timings_ms.items()},
+    )
+    return stats
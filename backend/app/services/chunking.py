@@ -0,0 +1,91 @@
+"""
+Découpage des textes longs (CV, offres) en fenêtres adaptées au modèle SBERT.
+
+paraphrase-multilingual-MiniLM-L12-v2 tronque à 128 tokens : on découpe le texte
+par sections puis par phrases, et on regroupe les phrases en fenêtres qui
+tiennent dans max_seq_length.
+"""
+import re
+from typing import Callable, List, Optional
+
+# Titres de sections usuels (cf. CVParser) : une ligne courte qui en contient un
+SECTION_HEADINGS = (
+    "expérience", "experience", "formation", "éducation", "education",
+    "compétences", "competences", "skills", "langues", "languages",
+    "profil", "projets", "certifications", "centres d'intérêt", "loisirs",
+)
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_BULLET = r"(?:[-•*▪–]\s+)?"
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+" + _BULLET + r"|\n+\s*" + _BULLET)
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip().lower().rstrip(":")
+    return 0 < len(stripped) <= 40 and any(h in stripped for h in SECTION_HEADINGS)
+
+
+def split_sections(text: str) -> List[str]:
+    """Découpe en sections : lignes vides et titres de section."""
+    sections: List[str] = []
+    for block in _BLANK_LINES_RE.split(text or ""):
+        current: List[str] = []
+        for line in block.split("\n"):
+            if _is_heading(line) and current:
+                sections.append("\n".join(current))
+                current = []
+            current.append(line)
+        if current:
+            sections.append("\n".join(current))
+    return [s.strip() for s in sections if s.strip()]
+
+
+def split_sentences(section: str) -> List[str]:
+    """Phrases et puces d'une section."""
+    return [s.strip() for s in _SENTENCE_RE.split(section) if s and s.strip()]
+
+
+def _approx_token_count(texts: List[str]) -> List[int]:
+    # ~1.3 token / mot pour un tokenizer sous-mot multilingue
+    return [int(len(t.split()) * 1.3) + 1 for t in texts]
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int,
+    count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+) -> List[str]:
+    """
+    Regroupe les phrases de chaque section en fenêtres de max_tokens au plus.
+    Une fenêtre ne chevauche jamais deux sections ; une phrase trop longue
+    est elle-même coupée sur les mots.
+    """
+    count_tokens = count_tokens or _approx_token_count
+    chunks: List[str] = []
+
+    for section in split_sections(text):
+        sentences = split_sentences(section)
+        if not sentences:
+            continue
+        lengths = count_tokens(sentences)
+
+        window: List[str] = []
+        window_len = 0
+        for sentence, length in zip(sentences, lengths):
+            if length > max_tokens:
+                if window:
+                    chunks.append(" ".join(window))
+                    window, window_len = [], 0
+                words = sentence.split()
+                step = max(1, int(len(words) * max_tokens / length))
+                chunks.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+                continue
+            if window and window_len + length > max_tokens:
+                chunks.append(" ".join(window))
+                window, window_len = [], 0
+            window.append(sentence)
+            window_len += length
+        if window:
+            chunks.append(" ".join(window))
+
+    return chunks
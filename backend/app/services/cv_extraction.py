@@ -10,7 +10,7 @@ Améliorations :
 """
 
 from pathlib import Path
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
 from pdfminer.high_level import extract_text as pdfminer_extract_text
 from docx import Document
@@ -22,12 +22,24 @@ import pytesseract
 import cv2
 import numpy as np
 
+from app.core.timing import timed
+
+# Version du texte produit (CVText.extractor_version) : à incrémenter à chaque
+# changement qui modifie le texte extrait ; les textes d'une version
+# antérieure sont retraités par python -m app.tools.backfill --stage extract
+EXTRACTOR_VERSION = 1
+
 
 class ExtractionError(Exception):
     """Exception spécifique à l'extraction de CV."""
     pass
 
 
+class OCRRequired(ExtractionError):
+    """Le document demande un OCR alors que l'appelant l'a exclu (allow_ocr=False)."""
+    pass
+
+
 # ---------------------------------------------------------------------------
 # Fonctions d'extraction PDF texte / DOCX
 # ---------------------------------------------------------------------------
@@ -111,12 +123,13 @@ def _ocr_image(img: Image.Image) -> str:
 # PDF scannés et images disque
 # ---------------------------------------------------------------------------
 
-def _extract_pdf_text_ocr(path: Path) -> str:
+def _extract_pdf_text_ocr(path: Path) -> Tuple[str, int]:
     """
     Extraction OCR pour les PDF scannés :
     - Conversion de chaque page en image (pdf2image, dpi=300).
     - Pré-traitement + OCR avec Tesseract sur chaque page.
     - Concaténation des textes.
+    Renvoie (texte, nombre de pages OCRisées).
     """
     try:
         pages = convert_from_path(str(path), dpi=300)
@@ -126,7 +139,7 @@ def _extract_pdf_text_ocr(path: Path) -> str:
     texts: list[str] = []
     for page in pages:
         texts.append(_ocr_image(page))
-    return "\n".join(texts)
+    return "\n".join(texts), len(pages)
 
 
 def _extract_image_file(path: Path) -> str:
@@ -174,9 +187,11 @@ def _compute_quality_score(text: str, file_size: int) -> float:
 # Pipeline principal
 # ---------------------------------------------------------------------------
 
+@timed("extract_cv_text")
 def extract_cv_text(
     storage_path: str,
     mime_type: str,
+    allow_ocr: bool = True,
 ) -> Tuple[str, float, Dict[str, Any]]:
     """
     Pipeline principal d'extraction de texte pour un CV.
@@ -187,6 +202,8 @@ def extract_cv_text(
       * DOCX
       * Images (PNG/JPG/TIFF via Tesseract + pré-traitement)
       * Fallback en texte brut
+    - allow_ocr=False : lève OCRRequired au lieu de lancer l'OCR (PDF sans
+      couche texte, images), pour les appelants au budget de temps court
     - Renvoie (text, quality_score, meta)
     """
     path = Path(storage_path)
@@ -195,12 +212,18 @@ def extract_cv_text(
 
     suffix = path.suffix.lower()
     text: str = ""
+    page_count: Optional[int] = None
+    ocr_pages = 0
 
     # 1) PDF (texte ou scanné)
     if mime_type == "application/pdf" or suffix == ".pdf":
         text = _extract_pdf_text_native(path)
+        page_count = text.count("\f")  # pdfminer termine chaque page par un saut de page
         if len(text.strip()) < 200:
-            text = _extract_pdf_text_ocr(path)
+            if not allow_ocr:
+                raise OCRRequired("PDF has no usable text layer")
+            text, ocr_pages = _extract_pdf_text_ocr(path)
+            page_count = ocr_pages
 
     # 2) DOCX
     elif mime_type in {
@@ -215,7 +238,10 @@ def extract_cv_text(
         "image/jpg",
         "image/tiff",
     } or suffix in {".png", ".jpg", ".jpeg", ".tif", ".tiff"}:
+        if not allow_ocr:
+            raise OCRRequired("Image files require OCR")
         text = _extract_image_file(path)
+        page_count = ocr_pages = 1
 
     # 4) Fallback : tentative de lecture en texte brut
     else:
@@ -232,5 +258,7 @@ def extract_cv_text(
         "mime_type": mime_type,
         "n_chars": len(text),
         "quality_score": quality,
+        "page_count": page_count,
+        "ocr_pages": ocr_pages,
     }
     return text, quality, meta
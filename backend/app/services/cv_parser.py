@@ -1,9 +1,11 @@
 """Service de parsing de CV utilisant spaCy pour extraction d'informations"""
 import re
 import spacy
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import structlog
 
+from app.core.timing import timed
+
 logger = structlog.get_logger(__name__)
 
 # Charger le modèle français de spaCy
@@ -38,9 +40,17 @@ class CVParser:
         "data science", "pandas", "numpy", "matplotlib"
     ]
 
+    # Version du parsing (ParsedCV.parser_version) : à incrémenter quand le
+    # résultat de parse() change ; cf. app.tools.backfill --stage parse
+    VERSION = 1
+
+    # Clés du résultat de parse() (colonnes de ParsedCV)
+    FIELDS = ("full_name", "email", "phone", "skills", "experience_years", "education", "languages")
+
     def __init__(self):
         self.nlp = nlp
 
+    @timed("cv_parser.parse")
     def parse(self, text: str) -> Dict:
         """
         Parse le texte du CV et extrait les informations structurées
@@ -52,43 +62,87 @@ class CVParser:
             Dict avec les informations extraites
         """
         try:
-            doc = self.nlp(text.lower())
-            
-            return {
-                "full_name": self.extract_name(text),
-                "email": self.extract_email(text),
-                "phone": self.extract_phone(text),
-                "skills": self.extract_skills(text),
-                "experience_years": self.extract_experience_years(text),
-                "education": self.extract_education(text),
-                "languages": self.extract_languages(text)
-            }
+            return self._build_result(text, self.extract_name(text))
         except Exception as e:
             logger.error(f"Erreur lors du parsing du CV: {str(e)}")
             return self._empty_result()
 
+    @timed("cv_parser.parse_many")
+    def parse_many(self, texts: List[str], batch_size: int = 32) -> List[Dict]:
+        """
+        Parse plusieurs CV (ingestion en masse).
+
+        Les fragments passés à spaCy (lignes candidates pour le nom, section
+        compétences) sont traités par nlp.pipe en batches au lieu d'un appel
+        nlp() par fragment ; le résultat est identique à parse().
+        """
+        try:
+            name_lines = [self._name_candidates(text) for text in texts]
+            sections = [self._extract_section(text, self.SKILLS_KEYWORDS) for text in texts]
+            fragments = [line for lines in name_lines for line in lines]
+            fragments += [section.lower() for section in sections if section]
+            docs = iter(list(self.nlp.pipe(fragments, batch_size=batch_size)))
+            name_docs = [[next(docs) for _ in lines] for lines in name_lines]
+            section_docs = [next(docs) if section else None for section in sections]
+        except Exception as e:
+            logger.error(f"Erreur lors du parsing par batch, repli CV par CV: {str(e)}")
+            return [self.parse(text) for text in texts]
+
+        results = []
+        for text, lines, line_docs, section_doc in zip(texts, name_lines, name_docs, section_docs):
+            try:
+                full_name = self._name_from_docs(lines, line_docs)
+                results.append(self._build_result(text, full_name, section_doc=section_doc))
+            except Exception as e:
+                logger.error(f"Erreur lors du parsing du CV: {str(e)}")
+                results.append(self._empty_result())
+        return results
+
+    def _build_result(self, text: str, full_name: Optional[str], section_doc=None) -> Dict:
+        return {
+            "full_name": full_name,
+            "email": self.extract_email(text),
+            "phone": self.extract_phone(text),
+            "skills": self.extract_skills(text, section_doc=section_doc),
+            "experience_years": self.extract_experience_years(text),
+            "education": self.extract_education(text),
+            "languages": self.extract_languages(text)
+        }
+
     def extract_name(self, text: str) -> Optional[str]:
         """Extrait le nom complet (généralement dans les premières lignes)"""
         try:
-            lines = text.strip().split('\n')
-            # Le nom est souvent dans les 3 premières lignes
-            for line in lines[:3]:
-                line = line.strip()
-                # Ignorer les lignes trop courtes ou avec des symboles
-                if 5 <= len(line) <= 50 and not re.search(r'[0-9@]', line):
-                    doc = self.nlp(line)
-                    # Chercher des entités PERSON
-                    for ent in doc.ents:
-                        if ent.label_ == "PER":
-                            return ent.text.title()
-                    # Si pas d'entité, prendre la première ligne valide
-                    if len(line.split()) >= 2:
-                        return line.title()
-            return None
+            lines = self._name_candidates(text)
+            return self._name_from_docs(lines, (self.nlp(line) for line in lines))
         except Exception as e:
             logger.warning(f"Erreur extraction nom: {str(e)}")
             return None
 
+    def _name_candidates(self, text: str) -> List[str]:
+        """Lignes à passer à spaCy pour le nom, jusqu'à la première qui suffit"""
+        candidates = []
+        # Le nom est souvent dans les 3 premières lignes
+        for line in text.strip().split('\n')[:3]:
+            line = line.strip()
+            # Ignorer les lignes trop courtes ou avec des symboles
+            if 5 <= len(line) <= 50 and not re.search(r'[0-9@]', line):
+                candidates.append(line)
+                if len(line.split()) >= 2:
+                    break
+        return candidates
+
+    @staticmethod
+    def _name_from_docs(lines: List[str], docs: Iterable) -> Optional[str]:
+        for line, doc in zip(lines, docs):
+            # Chercher des entités PERSON
+            for ent in doc.ents:
+                if ent.label_ == "PER":
+                    return ent.text.title()
+            # Si pas d'entité, prendre la première ligne valide
+            if len(line.split()) >= 2:
+                return line.title()
+        return None
+
     def extract_email(self, text: str) -> Optional[str]:
         """Extrait l'adresse email"""
         match = re.search(self.EMAIL_PATTERN, text)
@@ -106,8 +160,8 @@ class CVParser:
                     return match
         return None
 
-    def extract_skills(self, text: str) -> List[str]:
-        """Extrait les compétences techniques"""
+    def extract_skills(self, text: str, section_doc=None) -> List[str]:
+        """Extrait les compétences techniques (section_doc : section déjà passée à spaCy)"""
         skills = []
         text_lower = text.lower()
         
@@ -117,11 +171,13 @@ class CVParser:
                 skills.append(skill.title())
         
         # Chercher dans une section dédiée
-        skills_section = self._extract_section(text, self.SKILLS_KEYWORDS)
-        if skills_section:
+        if section_doc is None:
+            skills_section = self._extract_section(text, self.SKILLS_KEYWORDS)
+            if skills_section:
+                section_doc = self.nlp(skills_section.lower())
+        if section_doc is not None:
             # Extraire les mots pertinents
-            doc = self.nlp(skills_section.lower())
-            for token in doc:
+            for token in section_doc:
                 if token.pos_ in ["NOUN", "PROPN"] and len(token.text) > 2:
                     skill_text = token.text.title()
                     if skill_text not in skills and not token.is_stop:
@@ -1,8 +1,12 @@
 """Service de scoring pour calculer la compatibilité entre CV et offres"""
+import hashlib
+import json
 from typing import Dict, List, Optional
 from fuzzywuzzy import fuzz
 import structlog
 
+from app.core.timing import timed
+
 logger = structlog.get_logger(__name__)
 
 
@@ -20,6 +24,75 @@ class CVScorer:
     # Seuil de similarité pour fuzzy matching
     SIMILARITY_THRESHOLD = 70
 
+    # Version du calcul (ParsedCV.scorer_version) : à incrémenter quand
+    # calculate_score change ; cf. app.tools.backfill --stage score
+    VERSION = 1
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            weights: pondérations propres à l'offre (Offer.scoring_weights),
+                     complétées par WEIGHTS (cf. resolve_weights)
+        """
+        self.weights = self.resolve_weights(weights)
+
+    @classmethod
+    def resolve_weights(cls, overrides: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Complète des pondérations partielles avec WEIGHTS.
+
+        Les catégories fournies gardent leur valeur ; le reste (1 - leur somme)
+        est réparti entre les autres au prorata de WEIGHTS. Ex: {"skills": 0.6}
+        -> experience 0.2, education 0.133333, languages 0.066667.
+
+        Raises:
+            ValueError: catégorie inconnue, poids négatif ou somme nulle
+        """
+        overrides = dict(overrides or {})
+        for key, value in overrides.items():
+            if key not in cls.WEIGHTS:
+                raise ValueError(f"Catégorie de pondération inconnue: {key}")
+            if value is None or value < 0:
+                raise ValueError(f"Pondération invalide pour {key}: {value}")
+
+        fixed = sum(overrides.values())
+        others = {k: v for k, v in cls.WEIGHTS.items() if k not in overrides}
+        remaining = max(0.0, 1.0 - fixed)
+        others_total = sum(others.values())
+        weights = {
+            key: float(overrides[key]) if key in overrides
+            else (remaining * value / others_total if others_total else 0.0)
+            for key, value in cls.WEIGHTS.items()
+        }
+
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("La somme des pondérations doit être positive")
+        return {key: round(value / total, 6) for key, value in weights.items()}
+
+    @staticmethod
+    def offer_criteria(offer) -> Dict:
+        """Critères d'une offre (modèle Offer) au format attendu par calculate_score"""
+        return {
+            "required_skills": offer.required_skills or [],
+            "min_experience_years": offer.min_experience_years or 0,
+            "required_education": offer.required_education or [],
+            "required_languages": offer.required_languages or [],
+        }
+
+    def inputs_hash(self, source_hash: Optional[str], offer_criteria: Dict) -> str:
+        """
+        Hash des entrées du scoring (texte parsé, critères, pondérations) :
+        un score stocké avec le même hash n'a pas à être recalculé.
+        """
+        payload = json.dumps(
+            {"source": source_hash, "offer": offer_criteria, "weights": self.weights},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @timed("cv_scorer.calculate_score")
     def calculate_score(self, parsed_cv: Dict, offer: Dict) -> Dict:
         """
         Calcule le score de compatibilité global
@@ -55,10 +128,10 @@ class CVScorer:
             
             # Calculer le score global pondéré
             matching_score = (
-                skills_score * self.WEIGHTS["skills"] +
-                experience_score * self.WEIGHTS["experience"] +
-                education_score * self.WEIGHTS["education"] +
-                languages_score * self.WEIGHTS["languages"]
+                skills_score * self.weights["skills"] +
+                experience_score * self.weights["experience"] +
+                education_score * self.weights["education"] +
+                languages_score * self.weights["languages"]
             )
             
             return {
@@ -68,7 +141,7 @@ class CVScorer:
                 "education_score": round(education_score, 2),
                 "language_score": round(languages_score, 2),
                 "scoring_details": {
-                    "weights": self.WEIGHTS,
+                    "weights": self.weights,
                     "cv_skills": parsed_cv.get("skills", []),
                     "required_skills": offer.get("required_skills", []),
                     "cv_experience": parsed_cv.get("experience_years"),
@@ -222,5 +295,5 @@ def score_cv_for_offer(parsed_cv: Dict, offer: Dict) -> Dict:
     Returns:
         Dict avec les scores
     """
-    scorer = CVScorer()
+    scorer = CVScorer(weights=offer.get("scoring_weights"))
     return scorer.calculate_score(parsed_cv, offer)
@@ -0,0 +1,314 @@
+"""
+Serveur local d'inférence d'embeddings (sidecar) sur socket Unix.
+
+Un seul processus détient le modèle ; les workers Celery et uvicorn s'y
+connectent via EmbeddingServerClient (utilisé automatiquement par le registre
+quand EMBEDDING_SERVER_SOCKET est défini). Les requêtes concurrentes sont
+regroupées en micro-batches dynamiques (taille max / attente max).
+
+Protocole (trames) : 4 octets big-endian = taille de l'en-tête JSON, l'en-tête,
+puis éventuellement un bloc binaire float32 de n * dim valeurs (réponse encode).
+
+Lancement :
+    python -m app.services.embedding_server --socket /run/ats/embeddings.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+
+# ---------------------------------------------------------------------------
+# Client (synchrone, une connexion persistante par thread)
+# ---------------------------------------------------------------------------
+
+class EmbeddingServerError(RuntimeError):
+    """Erreur renvoyée par le serveur pour une requête."""
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+class _TokenCounter:
+    """tokenizer(texts, add_special_tokens=False)["input_ids"] via le serveur."""
+
+    def __init__(self, client: "EmbeddingServerClient"):
+        self._client = client
+
+    def __call__(self, texts: List[str], add_special_tokens: bool = False) -> Dict[str, List[List[int]]]:
+        counts = self._client.request({"op": "count", "texts": list(texts)})[0]["counts"]
+        # Seule la longueur est utilisée par le découpage
+        return {"input_ids": [[0] * n for n in counts]}
+
+
+class EmbeddingServerClient:
+    """Remplaçant de SentenceTransformer qui délègue l'encodage au sidecar."""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+        self.tokenizer = _TokenCounter(self)
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            finally:
+                self._local.sock = None
+
+    def request(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in (1, 2):
+            try:
+                sock = self._socket()
+                sock.sendall(_HEADER.pack(len(body)) + body)
+                header = json.loads(_recv_exact(sock, _HEADER.unpack(_recv_exact(sock, 4))[0]))
+                data = _recv_exact(sock, header.get("nbytes", 0)) if header.get("nbytes") else b""
+                break
+            except (OSError, ConnectionError):
+                # Connexion cassée (redémarrage du serveur) : une seule nouvelle tentative
+                self._reset()
+                if attempt == 2:
+                    raise
+        if header.get("error"):
+            raise EmbeddingServerError(f"Embedding server error: {header['error']}")
+        return header, data
+
+    def info(self) -> Dict[str, Any]:
+        return self.request({"op": "info"})[0]
+
+    @property
+    def max_seq_length(self) -> int:
+        if self._info is None:
+            self._info = self.info()
+        return int(self._info.get("max_seq_length") or 128)
+
+    @property
+    def model_version(self) -> str:
+        """Version des vecteurs du serveur (son backend, pas celui du client)."""
+        if self._info is None:
+            self._info = self.info()
+        return self._info["model_version"]
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        header, data = self.request({
+            "op": "encode",
+            "texts": texts,
+            "normalize": bool(normalize_embeddings),
+        })
+        vectors = np.frombuffer(data, dtype="<f4").reshape(header["n"], header["dim"])
+        return vectors[0] if single else vectors
+
+
+# ---------------------------------------------------------------------------
+# Serveur (asyncio) avec micro-batching dynamique
+# ---------------------------------------------------------------------------
+
+class _Pending:
+    __slots__ = ("texts", "normalize", "future")
+
+    def __init__(self, texts: List[str], normalize: bool, future: asyncio.Future):
+        self.texts = texts
+        self.normalize = normalize
+        self.future = future
+
+
+class EmbeddingServer:
+    def __init__(self, model, model_version: str, max_batch: int, max_wait_ms: float):
+        self.model = model
+        self.model_version = model_version
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        # Un seul thread d'inférence : le modèle parallélise déjà en interne
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode")
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "busy_seconds": 0.0}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = np.asarray(
+            self.model.encode(
+                texts,
+                batch_size=self.max_batch,
+                convert_to_numpy=True,
+                normalize_embeddings=False,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        )
+        self.stats["busy_seconds"] += time.perf_counter() - started
+        return vectors
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            n_texts = len(batch[0].texts)
+            deadline = loop.time() + self.max_wait
+            while n_texts < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_texts += len(item.texts)
+
+            texts = [t for item in batch for t in item.texts]
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode, texts)
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            offset = 0
+            for item in batch:
+                part = vectors[offset:offset + len(item.texts)]
+                offset += len(item.texts)
+                if item.normalize:
+                    part = part / np.clip(np.linalg.norm(part, axis=1, keepdims=True), 1e-12, None)
+                if not item.future.done():
+                    item.future.set_result(part)
+
+    def _info(self) -> Dict[str, Any]:
+        batches = self.stats["batches"] or 1
+        return {
+            "model_version": self.model_version,
+            "max_seq_length": getattr(self.model, "max_seq_length", None),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            **self.stats,
+            "mean_batch_texts": round(self.stats["texts"] / batches, 2),
+        }
+
+    async def _handle(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        op = payload.get("op")
+        if op == "info":
+            return self._info(), b""
+        if op == "count":
+            tokenizer = self.model.tokenizer
+            ids = tokenizer(payload["texts"], add_special_tokens=False)["input_ids"]
+            return {"counts": [len(i) for i in ids]}, b""
+        if op == "encode":
+            texts = payload["texts"]
+            if not texts:
+                return {"n": 0, "dim": 0, "nbytes": 0}, b""
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put(_Pending(texts, payload.get("normalize", False), future))
+            vectors = await future
+            data = vectors.astype("<f4").tobytes()
+            return {"n": vectors.shape[0], "dim": vectors.shape[1], "nbytes": len(data)}, data
+        return {"error": f"unknown op {op!r}"}, b""
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    size = _HEADER.unpack(await reader.readexactly(4))[0]
+                except asyncio.IncompleteReadError:
+                    break
+                payload = json.loads(await reader.readexactly(size))
+                try:
+                    header, data = await self._handle(payload)
+                except Exception as e:
+                    header, data = {"error": repr(e)}, b""
+                body = json.dumps(header).encode("utf-8")
+                writer.write(_HEADER.pack(len(body)) + body + data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str) -> None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+        server = await asyncio.start_unix_server(self._serve_client, path=socket_path)
+        os.chmod(socket_path, 0o666)
+        batcher = asyncio.create_task(self._batcher())
+        logger.info("embedding_server_listening", socket=socket_path, **self._info())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+def main() -> None:
+    from app.services.embeddings import EmbeddingModelRegistry
+
+    parser = argparse.ArgumentParser(description="Sidecar d'inférence d'embeddings (socket Unix)")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "/run/ats/embeddings.sock")
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    # Le serveur charge toujours le modèle localement (jamais en client de lui-même)
+    registry = EmbeddingModelRegistry(
+        settings.SBERT_MODEL_NAME,
+        device=settings.SBERT_DEVICE,
+        torch_threads=settings.SBERT_TORCH_THREADS,
+        backend=settings.SBERT_BACKEND,
+        onnx_dir=settings.SBERT_ONNX_DIR,
+        onnx_threads=settings.SBERT_ONNX_THREADS,
+    )
+    model = registry.get()
+    if model is None:
+        raise SystemExit(f"Impossible de charger le modèle: {registry.stats()}")
+
+    server = EmbeddingServer(model, registry.model_version, args.max_batch, args.max_wait_ms)
+    asyncio.run(server.serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
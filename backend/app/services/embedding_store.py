@@ -0,0 +1,143 @@
+"""
+Stockage des embeddings SBERT des CV et des offres.
+
+Les vecteurs sont calculés une seule fois (CV : par le worker après extraction,
+offres : à la création / mise à jour) et persistés en float32 dans
+text_embeddings, clé (propriétaire, version du modèle). On ne ré-encode que si
+le hash du texte ou la version du modèle change.
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import structlog
+from sqlalchemy.orm import Session
+
+from app.models.embedding import TextEmbedding
+from app.services import embeddings
+
+logger = structlog.get_logger(__name__)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8", errors="ignore")).hexdigest()
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f4")
+
+
+def _model_version() -> str:
+    return embeddings.embedding_version()
+
+
+def load_vectors(
+    db: Session,
+    owner_type: str,
+    owner_ids: Sequence[int],
+) -> Dict[int, np.ndarray]:
+    """Charge les vecteurs stockés (version courante du modèle) sans appeler le modèle."""
+    if not owner_ids:
+        return {}
+    rows = (
+        db.query(TextEmbedding.owner_id, TextEmbedding.vector)
+        .filter(
+            TextEmbedding.owner_type == owner_type,
+            TextEmbedding.owner_id.in_(list(owner_ids)),
+            TextEmbedding.model_version == _model_version(),
+        )
+        .all()
+    )
+    return {owner_id: from_bytes(vector) for owner_id, vector in rows}
+
+
+def load_vector(db: Session, owner_type: str, owner_id: int) -> Optional[np.ndarray]:
+    return load_vectors(db, owner_type, [owner_id]).get(owner_id)
+
+
+def fresh_vectors(
+    db: Session,
+    owner_type: str,
+    items: Sequence[Tuple[int, str]],
+) -> Dict[int, np.ndarray]:
+    """Vecteurs stockés à jour (même hash, même modèle) ; lecture seule, sans appel au modèle."""
+    hashes = {owner_id: content_hash(text) for owner_id, text in items if text and text.strip()}
+    if not hashes:
+        return {}
+    rows = (
+        db.query(TextEmbedding.owner_id, TextEmbedding.content_hash, TextEmbedding.vector)
+        .filter(
+            TextEmbedding.owner_type == owner_type,
+            TextEmbedding.owner_id.in_(list(hashes)),
+            TextEmbedding.model_version == _model_version(),
+        )
+        .all()
+    )
+    return {owner_id: from_bytes(vector) for owner_id, digest, vector in rows if hashes[owner_id] == digest}
+
+
+def ensure_embeddings(
+    db: Session,
+    owner_type: str,
+    items: Sequence[Tuple[int, str]],
+    force: bool = False,
+) -> Dict[int, np.ndarray]:
+    """
+    Garantit un vecteur à jour pour chaque (owner_id, texte).
+
+    Les textes inchangés (même hash, même modèle) sont servis depuis la base ;
+    les autres sont encodés en un seul appel batch puis upsertés.
+    Ne commit pas : laissé à l'appelant.
+    """
+    items = [(owner_id, text) for owner_id, text in items if text and text.strip()]
+    if not items:
+        return {}
+
+    version = _model_version()
+    existing = {
+        row.owner_id: row
+        for row in db.query(TextEmbedding).filter(
+            TextEmbedding.owner_type == owner_type,
+            TextEmbedding.owner_id.in_([owner_id for owner_id, _ in items]),
+            TextEmbedding.model_version == version,
+        )
+    }
+
+    result: Dict[int, np.ndarray] = {}
+    to_encode: List[Tuple[int, str, str]] = []
+    for owner_id, text in items:
+        digest = content_hash(text)
+        row = existing.get(owner_id)
+        if row is not None and row.content_hash == digest and not force:
+            result[owner_id] = from_bytes(row.vector)
+        else:
+            to_encode.append((owner_id, text, digest))
+
+    if not to_encode:
+        return result
+
+    vectors = embeddings.encode_documents([text for _, text, _ in to_encode])
+    if vectors is None:
+        logger.warning("embedding_model_unavailable", owner_type=owner_type, count=len(to_encode))
+        return result
+
+    for (owner_id, _, digest), vector in zip(to_encode, vectors):
+        row = existing.get(owner_id)
+        if row is None:
+            row = TextEmbedding(owner_type=owner_type, owner_id=owner_id, model_version=version)
+            db.add(row)
+        row.content_hash = digest
+        row.dim = int(vector.shape[0])
+        row.vector = to_bytes(vector)
+        result[owner_id] = vector
+
+    logger.info("embeddings_stored", owner_type=owner_type, encoded=len(to_encode), reused=len(items) - len(to_encode))
+    return result
+
+
+def ensure_embedding(db: Session, owner_type: str, owner_id: int, text: str) -> Optional[np.ndarray]:
+    return ensure_embeddings(db, owner_type, [(owner_id, text)]).get(owner_id)
@@ -1,46 +1,312 @@
-from functools import lru_cache
-from sklearn.metrics.pairwise import cosine_similarity
+"""
+Registre unique du modèle d'embeddings (SBERT).
 
-MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+Un seul SentenceTransformer par processus, chargé à la première demande
+(thread-safe). scoring.py, l'API et le worker passent tous par ce registre.
+Si EMBEDDING_SERVER_SOCKET est défini, le registre délègue au sidecar
+(app.services.embedding_server) au lieu de charger le modèle.
+
+Les textes longs sont découpés en fenêtres (cf. chunking) encodées en un seul
+appel batch, puis poolées en un vecteur par document.
+
+Sidecar arrêté ou en erreur : encode_texts / encode_document_chunks
+retournent None, comme sans modèle (similarité SBERT désactivée).
+"""
+import logging
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.timing import timed
+from app.services.chunking import chunk_text
+from app.services.embedding_server import EmbeddingServerError
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = settings.SBERT_MODEL_NAME
+
+
+def current_rss_mb() -> float:
+    """RSS courant du processus en Mo (fallback: pic RSS via getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class EmbeddingModelRegistry:
+    """Chargement lazy et unique du modèle d'embeddings pour le processus."""
+
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        torch_threads: int = 0,
+        backend: str = "torch",
+        onnx_dir: str = "",
+        onnx_threads: int = 0,
+        server_socket: str = "",
+        server_timeout: float = 60.0,
+    ):
+        self.model_name = model_name
+        self.device = device
+        self.torch_threads = torch_threads
+        self.backend = backend
+        self.onnx_dir = onnx_dir or str(
+            Path(settings.MODEL_ARTIFACTS_DIR) / "onnx" / model_name.replace("/", "__")
+        )
+        self.onnx_threads = onnx_threads
+        self.server_socket = server_socket
+        self.server_timeout = server_timeout
+        self._model = None
+        self._load_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {}
+
+    @property
+    def model_version(self) -> str:
+        """Identifiant des vecteurs produits (clé des embeddings persistés)."""
+        if self.server_socket:
+            # Sidecar : les vecteurs viennent du backend du serveur
+            model = self.get()
+            try:
+                if model is None:
+                    raise RuntimeError(self._load_error)
+                return model.model_version
+            except Exception as e:
+                logger.warning("Version du sidecar indisponible: %r", e)
+                # Ne correspond à aucun vecteur stocké : rien n'est tenu pour frais
+                return f"{self.model_name}+sidecar-unavailable"
+        if self.backend == "onnx":
+            return f"{self.model_name}+onnx-int8"
+        return self.model_name
+
+    @property
+    def loaded(self) -> bool:
+        """Modèle déjà chargé dans ce processus (sans déclencher le chargement)."""
+        return self._model is not None
+
+    def get(self):
+        """Retourne le modèle (None si le chargement a échoué)."""
+        if self._model is not None or self._load_error is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None and self._load_error is None:
+                self._load()
+        return self._model
+
+    def _load(self) -> None:
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        try:
+            if self.server_socket:
+                from app.services.embedding_server import EmbeddingServerClient
+                self._model = EmbeddingServerClient(self.server_socket, timeout=self.server_timeout)
+            elif self.backend == "onnx":
+                from app.services.onnx_encoder import OnnxSentenceEncoder
+                self._model = OnnxSentenceEncoder(self.onnx_dir, intra_op_threads=self.onnx_threads)
+            else:
+                if self.torch_threads > 0:
+                    import torch
+                    torch.set_num_threads(self.torch_threads)
+
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+        except Exception as e:
+            # Ne pas retenter à chaque appel (réseau HuggingFace, etc.)
+            self._load_error = repr(e)
+            logger.warning(
+                "Impossible de charger %s (similarité SBERT désactivée): %r",
+                self.model_name, e,
+            )
+            return
+
+        self._stats = {
+            "load_seconds": round(time.perf_counter() - started, 3),
+            "rss_before_mb": round(rss_before, 1),
+            "rss_after_mb": round(current_rss_mb(), 1),
+        }
+        logger.info(
+            "Modèle %s (%s) chargé en %.2fs (RSS %.0f -> %.0f Mo)",
+            self.model_name,
+            self.backend,
+            self._stats["load_seconds"],
+            self._stats["rss_before_mb"],
+            self._stats["rss_after_mb"],
+        )
+
+    def reset(self) -> None:
+        """Oublie le modèle chargé (ou l'échec) pour forcer un rechargement."""
+        with self._lock:
+            self._model = None
+            self._load_error = None
+            self._stats = {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Etat du registre, pour /health et les logs de démarrage."""
+        return {
+            "model_name": self.model_name,
+            "backend": self.backend,
+            "server_socket": self.server_socket or None,
+            "loaded": self._model is not None,
+            "error": self._load_error,
+            "threads": (self.onnx_threads if self.backend == "onnx" else self.torch_threads) or None,
+            **self._stats,
+        }
+
+
+registry = EmbeddingModelRegistry(
+    MODEL_NAME,
+    device=settings.SBERT_DEVICE,
+    torch_threads=settings.SBERT_TORCH_THREADS,
+    backend=settings.SBERT_BACKEND,
+    onnx_dir=settings.SBERT_ONNX_DIR,
+    onnx_threads=settings.SBERT_ONNX_THREADS,
+    server_socket=settings.EMBEDDING_SERVER_SOCKET,
+    server_timeout=settings.EMBEDDING_SERVER_TIMEOUT_SECONDS,
+)
 
-# Chargement lazy du modèle - ne bloque pas le démarrage si HuggingFace est inaccessible
-_model_cache = None
 
 def get_sbert_model():
-    """Charge le modèle sentence-transformer (avec gestion d'erreur réseau)"""
-    global _model_cache
-    if _model_cache is not None:
-        return _model_cache
-    
+    """Charge le modèle sentence-transformer (None si indisponible)."""
+    return registry.get()
+
+
+@timed("embeddings.encode")
+def _encode(model, texts: List[str]) -> np.ndarray:
+    vectors = model.encode(
+        list(texts),
+        batch_size=settings.SBERT_ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def encode_texts(texts: List[str]) -> Optional[np.ndarray]:
+    """
+    Encode une liste de textes en un seul appel (vecteurs float32 L2-normalisés),
+    sans découpage : chaque texte est tronqué à max_seq_length.
+    Retourne None si le modèle n'est pas disponible.
+    """
+    model = get_sbert_model()
+    if model is None:
+        return None
     try:
-        from sentence_transformers import SentenceTransformer
-        _model_cache = SentenceTransformer(MODEL_NAME, device="cpu")
-        print(f"✓ Modèle {MODEL_NAME} chargé avec succès")
-        return _model_cache
-    except Exception as e:
-        print(f"⚠ Impossible de charger sentence-transformers: {e}")
-        print("  Le scoring IA utilisera fuzzywuzzy uniquement")
+        return _encode(model, texts)
+    except (OSError, EmbeddingServerError) as e:
+        logger.warning("Sidecar d'embeddings indisponible (similarité SBERT désactivée): %r", e)
+        return None
+
+
+def _token_counter(model) -> Optional[Callable[[List[str]], List[int]]]:
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
         return None
 
+    def count(texts: List[str]) -> List[int]:
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+    return count
+
+
+def _window_tokens(model) -> int:
+    # [CLS] + [SEP] comptent dans max_seq_length
+    return max(16, int(getattr(model, "max_seq_length", None) or 128) - 2)
+
+
+def encode_document_chunks(texts: List[str]) -> Optional[List[np.ndarray]]:
+    """
+    Découpe chaque document en fenêtres du modèle et encode toutes les fenêtres
+    de tous les documents en un seul appel batch.
+    Retourne une matrice (n_fenêtres, dim) par document.
+    """
+    model = get_sbert_model()
+    if model is None:
+        return None
+
+    try:
+        # Le comptage des tokens interroge aussi le sidecar
+        count, window = _token_counter(model), _window_tokens(model)
+        per_doc = [chunk_text(text, window, count) or [text or ""] for text in texts]
+        vectors = _encode(model, [chunk for chunks in per_doc for chunk in chunks])
+    except (OSError, EmbeddingServerError) as e:
+        logger.warning("Sidecar d'embeddings indisponible (similarité SBERT désactivée): %r", e)
+        return None
+
+    offsets = np.cumsum([len(chunks) for chunks in per_doc])[:-1]
+    return np.split(vectors, offsets)
+
+
+def pool_chunks(chunk_vectors: np.ndarray, pooling: str = "mean") -> np.ndarray:
+    pooled = chunk_vectors.max(axis=0) if pooling == "max" else chunk_vectors.mean(axis=0)
+    norm = np.linalg.norm(pooled)
+    return (pooled / norm if norm > 0 else pooled).astype(np.float32)
+
+
+def encode_documents(texts: List[str], pooling: Optional[str] = None) -> Optional[np.ndarray]:
+    """Un vecteur normalisé par document (fenêtres poolées si SBERT_CHUNKING)."""
+    if not settings.SBERT_CHUNKING:
+        return encode_texts(texts)
+    chunked = encode_document_chunks(texts)
+    if chunked is None:
+        return None
+    pooling = pooling or settings.SBERT_CHUNK_POOLING
+    return np.stack([pool_chunks(chunks, pooling) for chunks in chunked])
+
+
+def embedding_version() -> str:
+    """Version des vecteurs de documents : modèle + stratégie de découpage/pooling."""
+    if not settings.SBERT_CHUNKING:
+        return registry.model_version
+    return f"{registry.model_version}#chunk-{settings.SBERT_CHUNK_POOLING}"
+
+
+def max_sim(job_vector: np.ndarray, cv_chunk_vectors: np.ndarray) -> float:
+    """Similarité de l'offre avec la fenêtre du CV la plus proche (0..1)."""
+    if cv_chunk_vectors is None or not len(cv_chunk_vectors):
+        return 0.0
+    return float(max(0.0, min(float(np.max(cv_chunk_vectors @ job_vector)), 1.0)))
+
+
+def vector_similarity(job_vector: np.ndarray, cv_vector: np.ndarray) -> float:
+    """Similarité cosinus (0..1) entre deux vecteurs déjà normalisés."""
+    return float(max(0.0, min(float(np.dot(job_vector, cv_vector)), 1.0)))
+
 
 def sbert_similarity(job_text: str, cv_text: str) -> float:
     if not job_text or not cv_text:
         return 0.0
-    
+
     try:
-        model = get_sbert_model()
-        if model is None:
+        vectors = encode_documents([job_text, cv_text])
+        if vectors is None:
             # Fallback: pas de similarité sémantique disponible
             return 0.0
-            
-        vectors = model.encode(
-            [job_text, cv_text],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        )
-        sim = cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
-        return float(max(0.0, min(sim, 1.0)))
+        return vector_similarity(vectors[0], vectors[1])
+    except Exception as e:
+        logger.warning("SBERT error (fallback to 0.0): %r", e)
+        return 0.0
+
+
+def sbert_maxsim_similarity(job_text: str, cv_text: str) -> float:
+    """Variante max-sim : offre (poolée) vs meilleure fenêtre du CV."""
+    if not job_text or not cv_text:
+        return 0.0
+    try:
+        chunked = encode_document_chunks([job_text, cv_text])
+        if chunked is None:
+            return 0.0
+        job_vector = pool_chunks(chunked[0], settings.SBERT_CHUNK_POOLING)
+        return max_sim(job_vector, chunked[1])
     except Exception as e:
-        print("SBERT ERROR (fallback to 0.0):", repr(e))
+        logger.error("SBERT max-sim error (fallback to 0.0): %r", e)
         return 0.0
@@ -0,0 +1,375 @@
+"""
+Extraction de texte isolée dans un pool de sous-processus longue durée.
+
+Un PDF pathologique (images énormes, bombe de décompression) peut faire
+monter pdfminer / pdf2image à plusieurs Go. Exécutée dans le worker, cette
+mémoire reste fragmentée jusqu'au recyclage --max-tasks-per-child. Ici,
+chaque extraction part dans un processus enfant (python -m
+app.services.extraction_pool --child) :
+
+- limite mémoire par enfant : RLIMIT_AS = EXTRACTION_MEMORY_LIMIT_MB. C'est
+  l'espace d'adressage, la seule limite appliquée par Linux (RLIMIT_RSS est
+  ignorée). Elle est héritée par pdftoppm / tesseract ;
+- délai maximal par extraction (EXTRACTION_TIMEOUT_SECONDS) : au-delà,
+  l'enfant est tué (SIGKILL) ;
+- recyclage de l'enfant quand son RSS dépasse EXTRACTION_RECYCLE_RSS_MB
+  après un job, ou après EXTRACTION_MAX_JOBS_PER_CHILD jobs.
+
+Timeout, mort de l'enfant et dépassement mémoire lèvent ExtractionError
+(échec définitif, pas de retry) ; une erreur inattendue dans l'enfant lève
+ExtractionRetryable (retry de la tâche, cf. tasks._STAGE_RETRY). Les arrêts
+et recyclages sont comptés dans Redis (ats:extraction_pool:events) et
+exposés sur /metrics.
+
+try_extract sert l'extraction inline à l'upload (services.inline_extraction) :
+délai court, sans OCR, et sans attente : si aucun enfant démarré n'est libre,
+ExtractionPoolBusy (l'appelant passe par la file).
+
+Protocole (pipes stdin / stdout de l'enfant) : 4 octets big-endian = taille,
+puis un document JSON.
+"""
+import json
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.core import timing
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # hors Unix : extraction dans le processus
+    resource = None
+
+logger = structlog.get_logger(__name__)
+
+EVENTS_KEY = "ats:extraction_pool:events"
+
+_HEADER = struct.Struct(">I")
+_BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        from redis import Redis
+        _client = Redis.from_url(settings.CELERY_BROKER_URL)
+    return _client
+
+
+def record_event(event: str) -> None:
+    try:
+        _redis().hincrby(EVENTS_KEY, event, 1)
+    except Exception as e:
+        logger.warning("extraction_pool_counter_failed", pool_event=event, error=repr(e))
+
+
+def event_counts(redis_url: str) -> Dict[str, int]:
+    from redis import Redis
+
+    raw = Redis.from_url(redis_url).hgetall(EVENTS_KEY)
+    return {event.decode(): int(count) for event, count in raw.items()}
+
+
+def render_prometheus(counts: Dict[str, int]) -> str:
+    lines = [
+        "# HELP ats_extraction_pool_events_total Sous-processus d'extraction lancés, tués ou recyclés",
+        "# TYPE ats_extraction_pool_events_total counter",
+    ]
+    lines += [
+        f'ats_extraction_pool_events_total{{event="{event}"}} {count}'
+        for event, count in sorted(counts.items())
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss (pic, en Ko sous Linux) à défaut
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Enfant
+# ---------------------------------------------------------------------------
+
+def _read_exact(stream, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _child_main() -> None:
+    # Trames sur une copie de stdout ; les print des bibliothèques vont sur stderr
+    out = os.fdopen(os.dup(1), "wb", buffering=0)
+    os.dup2(2, 1)
+    inp = os.fdopen(os.dup(0), "rb", buffering=0)
+
+    limit = settings.EXTRACTION_MEMORY_LIMIT_MB * 1024 * 1024
+    if limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    from app.services.cv_extraction import ExtractionError, OCRRequired, extract_cv_text
+
+    while True:
+        header = _read_exact(inp, _HEADER.size)
+        if header is None:
+            return  # parent parti
+        request = json.loads(_read_exact(inp, _HEADER.unpack(header)[0]))
+        try:
+            text, quality, meta = extract_cv_text(
+                request["path"], request["mime_type"], allow_ocr=request.get("allow_ocr", True)
+            )
+            reply: Dict[str, Any] = {"ok": True, "text": text, "quality": quality, "meta": meta}
+        except OCRRequired as e:
+            reply = {"ok": False, "kind": "ocr_required", "error": str(e)}
+        except ExtractionError as e:
+            # cv_extraction enveloppe les erreurs de pdfminer / DOCX, MemoryError comprise
+            kind = "memory" if isinstance(e.__cause__, MemoryError) else "extraction"
+            reply = {"ok": False, "kind": kind, "error": str(e)}
+        except MemoryError:
+            reply = {"ok": False, "kind": "memory", "error": "Extraction exceeded memory limit"}
+        except Exception as e:
+            reply = {"ok": False, "kind": "unexpected", "error": repr(e)}
+        reply["rss_mb"] = round(_rss_mb(), 1)
+        body = json.dumps(reply, default=str).encode("utf-8")
+        out.write(_HEADER.pack(len(body)) + body)
+        if reply.get("kind") == "memory":
+            return  # tas fragmenté : l'enfant est remplacé
+
+
+# ---------------------------------------------------------------------------
+# Parent (worker)
+# ---------------------------------------------------------------------------
+
+class _ChildDied(Exception):
+    pass
+
+
+class ExtractionPoolBusy(Exception):
+    """Aucun enfant démarré n'est libre (try_extract)."""
+
+
+class ExtractionRetryable(RuntimeError):
+    """Erreur inattendue dans l'enfant, sans rapport avec le document : transitoire."""
+
+
+class _Child:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "app.services.extraction_pool", "--child"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=str(_BACKEND_ROOT),
+            close_fds=True,
+        )
+        self.jobs = 0
+        record_event("spawn")
+
+    def request(self, payload: Dict, timeout: float) -> Dict:
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.proc.stdin.write(_HEADER.pack(len(body)) + body)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise _ChildDied(repr(e))
+        deadline = time.monotonic() + timeout
+        size = _HEADER.unpack(self._recv(_HEADER.size, deadline))[0]
+        return json.loads(self._recv(size, deadline))
+
+    def _recv(self, n: int, deadline: float) -> bytes:
+        fd = self.proc.stdout.fileno()
+        buf = bytearray()
+        while len(buf) < n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError
+            chunk = os.read(fd, n - len(buf))
+            if not chunk:
+                raise _ChildDied(f"exit code {self.proc.poll()}")
+            buf.extend(chunk)
+        return bytes(buf)
+
+    def stop(self, kill: bool = False) -> None:
+        try:
+            if kill:
+                self.proc.kill()
+            else:
+                self.proc.stdin.close()  # EOF : l'enfant sort de sa boucle
+            self.proc.wait(timeout=5)
+        except Exception:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class ExtractionPool:
+    """Pool de EXTRACTION_POOL_SIZE enfants, utilisable depuis plusieurs threads."""
+
+    def __init__(self, size: int):
+        self.pid = os.getpid()
+        self._idle: "LifoQueue[_Child]" = LifoQueue()
+        self._size = max(1, size)
+        self._slots = threading.BoundedSemaphore(self._size)
+        self._closed = False
+
+    def extract(self, storage_path: str, mime_type: str) -> Tuple[str, float, Dict[str, Any]]:
+        self._slots.acquire()
+        try:
+            try:
+                child = self._idle.get_nowait()
+            except Empty:
+                child = _Child()
+            return self._run(child, storage_path, mime_type, settings.EXTRACTION_TIMEOUT_SECONDS)
+        finally:
+            self._slots.release()
+
+    def try_extract(
+        self, storage_path: str, mime_type: str, timeout: float, allow_ocr: bool = False
+    ) -> Tuple[str, float, Dict[str, Any]]:
+        """
+        Extraction sans attente : un enfant déjà démarré (imports faits) doit
+        être libre, sinon ExtractionPoolBusy. Un enfant est alors lancé pour
+        les appels suivants (démarrage à froid hors du budget de l'appelant).
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExtractionPoolBusy("all extraction processes are busy")
+        try:
+            try:
+                child = self._idle.get_nowait()
+            except Empty:
+                if not self._closed:
+                    self._idle.put(_Child())
+                raise ExtractionPoolBusy("no warm extraction process")
+            return self._run(child, storage_path, mime_type, timeout, allow_ocr=allow_ocr)
+        finally:
+            self._slots.release()
+
+    def warm(self) -> None:
+        """Démarre les enfants manquants (imports faits avant le premier appel)."""
+        while not self._closed and self._idle.qsize() < self._size:
+            self._idle.put(_Child())
+
+    def _run(
+        self, child: _Child, storage_path: str, mime_type: str, timeout: float, allow_ocr: bool = True
+    ) -> Tuple[str, float, Dict[str, Any]]:
+        """Un job sur `child` ; l'enfant est rendu au pool ou remplacé. Slot tenu par l'appelant."""
+        from app.services.cv_extraction import ExtractionError, OCRRequired
+
+        try:
+            child.jobs += 1
+            payload = {"path": storage_path, "mime_type": mime_type, "allow_ocr": allow_ocr}
+            try:
+                with timing.stage_timer("extraction_pool.extract"):
+                    reply = child.request(payload, timeout)
+            except TimeoutError:
+                self._discard(child, "kill_timeout", kill=True, path=storage_path)
+                child = None
+                raise ExtractionError(f"Extraction timed out after {timeout:g}s")
+            except _ChildDied as e:
+                self._discard(child, "kill_crash", kill=True, path=storage_path, error=str(e))
+                child = None
+                raise ExtractionError("Extraction process died (memory limit or crash)")
+
+            if reply.get("kind") == "memory":
+                self._discard(child, "kill_memory", path=storage_path, rss_mb=reply.get("rss_mb"))
+                child = None
+            elif reply.get("rss_mb", 0) > settings.EXTRACTION_RECYCLE_RSS_MB:
+                self._discard(child, "recycle_high_water", rss_mb=reply.get("rss_mb"))
+                child = None
+            elif child.jobs >= settings.EXTRACTION_MAX_JOBS_PER_CHILD:
+                self._discard(child, "recycle_max_jobs")
+                child = None
+
+            if reply["ok"]:
+                return reply["text"], reply["quality"], reply["meta"]
+            if reply["kind"] == "unexpected":
+                raise ExtractionRetryable(reply["error"])
+            if reply["kind"] == "ocr_required":
+                raise OCRRequired(reply["error"])
+            raise ExtractionError(reply["error"])
+        finally:
+            if child is not None:
+                if self._closed:
+                    child.stop()
+                else:
+                    self._idle.put(child)
+
+    def _discard(self, child: _Child, event: str, kill: bool = False, **fields) -> None:
+        child.stop(kill=kill)
+        record_event(event)
+        logger.warning("extraction_child_replaced", reason=event, pid=child.proc.pid, jobs=child.jobs, **fields)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except Empty:
+                return
+
+
+_pool: Optional[ExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ExtractionPool:
+    global _pool
+    with _pool_lock:
+        # Un pool créé avant un fork (parent prefork) n'est pas réutilisable : pipes partagés
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ExtractionPool(settings.EXTRACTION_POOL_SIZE)
+        return _pool
+
+
+def extract(storage_path: str, mime_type: str) -> Tuple[str, float, Dict[str, Any]]:
+    """extract_cv_text, isolé dans le pool si EXTRACTION_POOL_ENABLED."""
+    if not settings.EXTRACTION_POOL_ENABLED or resource is None:
+        from app.services.cv_extraction import extract_cv_text
+        return extract_cv_text(storage_path, mime_type)
+    return get_pool().extract(storage_path, mime_type)
+
+
+def try_extract(storage_path: str, mime_type: str, timeout: float) -> Tuple[str, float, Dict[str, Any]]:
+    """
+    Extraction sans OCR sous un délai court (upload). Sans pool, extraction
+    dans le processus : le délai n'est alors pas appliqué.
+    """
+    if not settings.EXTRACTION_POOL_ENABLED or resource is None:
+        from app.services.cv_extraction import extract_cv_text
+        return extract_cv_text(storage_path, mime_type, allow_ocr=False)
+    return get_pool().try_extract(storage_path, mime_type, timeout)
+
+
+def warm() -> None:
+    if settings.EXTRACTION_POOL_ENABLED and resource is not None:
+        get_pool().warm()
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
+if __name__ == "__main__" and "--child" in sys.argv:
+    _child_main()
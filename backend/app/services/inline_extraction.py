@@ -0,0 +1,85 @@
+"""
+Extraction inline à l'upload pour les formats peu coûteux.
+
+Un DOCX ou un PDF avec couche texte s'extrait en quelques millisecondes :
+plutôt que d'attendre derrière les OCR de la file cv_extract, l'upload tente
+l'extraction dans la requête, dans le pool de sous-processus
+(extraction_pool.try_extract) :
+- DOCX et PDF seulement, au plus INLINE_EXTRACTION_MAX_BYTES ;
+- pas d'OCR (PDF sans couche texte : OCRRequired) ;
+- délai INLINE_EXTRACTION_TIMEOUT_SECONDS, au-delà l'enfant est tué ;
+- pas d'attente d'un enfant libre (ExtractionPoolBusy).
+En cas de succès, la candidature est créée EXTRACTED et seules les étapes
+parsing / score sont mises en file. Dans tous les autres cas, l'upload suit
+la chaîne complète (qui refait l'extraction avec OCR si besoin).
+
+Mode claim (CV_PROCESSING_MODE=claim) : désactivée, les claim workers ne
+prennent que les lignes UPLOADED.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.core import timing
+from app.core.config import settings
+from app.models.cv_text import CVText
+from app.services import embedding_store, extraction_pool, token_counts
+from app.services.cv_extraction import EXTRACTOR_VERSION, ExtractionError, OCRRequired
+
+logger = structlog.get_logger(__name__)
+
+MIME_TYPES = frozenset({
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+})
+
+
+def eligible(mime_type: str, size_bytes: int) -> bool:
+    return (
+        settings.INLINE_EXTRACTION_ENABLED
+        and settings.CV_PROCESSING_MODE == "celery"
+        and mime_type in MIME_TYPES
+        and size_bytes <= settings.INLINE_EXTRACTION_MAX_BYTES
+    )
+
+
+def try_extract(storage_path: str, mime_type: str, size_bytes: int) -> Optional[Tuple[str, Any, Dict[str, Any]]]:
+    """(texte, qualité, meta), ou None : l'extraction passe par la file."""
+    if not eligible(mime_type, size_bytes):
+        return None
+    started = time.perf_counter()
+    outcome = "extracted"
+    try:
+        return extraction_pool.try_extract(storage_path, mime_type, settings.INLINE_EXTRACTION_TIMEOUT_SECONDS)
+    except extraction_pool.ExtractionPoolBusy:
+        outcome = "busy"
+    except OCRRequired:
+        outcome = "ocr_required"
+    except ExtractionError as e:
+        # Timeout compris : la tâche d'extraction a un délai plus long
+        outcome = "failed"
+        logger.info("inline_extraction_fallback", mime_type=mime_type, error=str(e))
+    except Exception as e:
+        outcome = "error"
+        logger.warning("inline_extraction_error", mime_type=mime_type, error=repr(e))
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        timing.observe(f"upload.inline_extract.{outcome}", duration_ms)
+        logger.info(
+            "inline_extraction", outcome=outcome, mime_type=mime_type, size_bytes=size_bytes,
+            duration_ms=round(duration_ms, 1),
+        )
+    return None
+
+
+def store(cv_text: CVText, result: Tuple[str, Any, Dict[str, Any]]) -> None:
+    """Écrit le texte extrait inline (mêmes champs que la tâche extract_cv_file)."""
+    text, quality_score, _ = result
+    cv_text.status = "SUCCESS"
+    cv_text.extracted_text = text
+    cv_text.quality_score = quality_score
+    cv_text.content_hash = embedding_store.content_hash(text)
+    cv_text.token_counts = token_counts.count_tokens(text)
+    cv_text.extractor_version = EXTRACTOR_VERSION
+    cv_text.error_message = None
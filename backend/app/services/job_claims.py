@@ -0,0 +1,240 @@
+"""
+Prise en charge des cv_files par lease en base (PostgreSQL).
+
+Une ligne est prise par un UPDATE conditionnel : statut EXTRACTING, détenteur
+(claimed_by), expiration (lease_expires_at), tentatives + 1. Deux workers ne
+peuvent pas prendre la même ligne, contrairement au test de statut lu puis
+écrit de la tâche unitaire.
+
+- claim_batch : mode "claim" (CV_PROCESSING_MODE=claim), sans broker. Les
+  lignes UPLOADED, ou EXTRACTING au lease expiré, sont prises par lots avec
+  SELECT ... FOR UPDATE SKIP LOCKED : des workers concurrents se répartissent
+  les lignes sans s'attendre.
+- claim_file : une ligne, pour la tâche Celery extract_cv_file (même lease,
+  reprise possible par la même tâche lors d'un retry).
+- renew : prolonge les leases d'un lot en cours de traitement (ingestion
+  groupée) ; un lot plus long que CLAIM_LEASE_SECONDS n'est pas repris.
+- reap_stalled : les lignes EXTRACTING dont le lease a expiré (worker tué
+  pendant l'extraction) repassent UPLOADED, ou FAILED après
+  CLAIM_MAX_ATTEMPTS tentatives.
+"""
+import os
+import socket
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import structlog
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.application import Application
+from app.models.cv_file import CVFile, CVFileStatus
+from app.models.cv_text import CVText
+from app.services import pipeline_events
+
+logger = structlog.get_logger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def lease_deadline(lease_seconds: Optional[float] = None) -> datetime:
+    return _now() + timedelta(seconds=lease_seconds or settings.CLAIM_LEASE_SECONDS)
+
+
+def _expired(now: datetime):
+    """EXTRACTING sans lease valide : expiré, ou ligne antérieure aux leases."""
+    return and_(
+        CVFile.status == CVFileStatus.EXTRACTING.value,
+        or_(CVFile.lease_expires_at.is_(None), CVFile.lease_expires_at < now),
+    )
+
+
+def claim_batch(db: Session, owner: str, limit: int, lease_seconds: Optional[float] = None) -> List[int]:
+    """
+    Prend jusqu'à `limit` cv_files à traiter et commit (le lease doit être
+    visible des autres workers avant le traitement). Retourne leurs ids.
+    """
+    now = _now()
+    candidates = (
+        select(CVFile.id)
+        .where(
+            or_(CVFile.status == CVFileStatus.UPLOADED.value, _expired(now)),
+            CVFile.attempts < settings.CLAIM_MAX_ATTEMPTS,
+        )
+        .order_by(CVFile.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = db.execute(
+        update(CVFile)
+        .where(CVFile.id.in_(candidates))
+        .values(
+            status=CVFileStatus.EXTRACTING.value,
+            claimed_by=owner,
+            lease_expires_at=lease_deadline(lease_seconds),
+            attempts=CVFile.attempts + 1,
+        )
+        .returning(CVFile.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return sorted(ids)
+
+
+def claim_file(db: Session, cv_file_id: int, owner: str, lease_seconds: Optional[float] = None) -> bool:
+    """
+    Prend une ligne si elle n'est pas en cours de traitement ailleurs (lease
+    valide d'un autre détenteur). Commit ; False si la ligne est déjà prise.
+    """
+    now = _now()
+    result = db.execute(
+        update(CVFile)
+        .where(
+            CVFile.id == cv_file_id,
+            or_(
+                CVFile.status != CVFileStatus.EXTRACTING.value,
+                CVFile.claimed_by == owner,
+                CVFile.lease_expires_at.is_(None),
+                CVFile.lease_expires_at < now,
+            ),
+        )
+        .values(
+            status=CVFileStatus.EXTRACTING.value,
+            claimed_by=owner,
+            lease_expires_at=lease_deadline(lease_seconds),
+            attempts=CVFile.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def renew(
+    db: Session,
+    cv_file_ids: Sequence[int],
+    owner: Optional[str],
+    lease_seconds: Optional[float] = None,
+) -> int:
+    """
+    Prolonge le lease des lignes encore EXTRACTING détenues par `owner`
+    (None : lignes marquées sans détenteur, ingestion groupée). Une ligne
+    reprise entre-temps par un autre détenteur n'est pas touchée. Commit ;
+    retourne le nombre de lignes prolongées.
+    """
+    if not cv_file_ids:
+        return 0
+    owned = CVFile.claimed_by == owner if owner else CVFile.claimed_by.is_(None)
+    result = db.execute(
+        update(CVFile)
+        .where(CVFile.id.in_(list(cv_file_ids)), CVFile.status == CVFileStatus.EXTRACTING.value, owned)
+        .values(lease_expires_at=lease_deadline(lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def lease_held_elsewhere(cv_file: CVFile, owner: str) -> bool:
+    """Ligne EXTRACTING sous un lease valide d'un autre détenteur."""
+    if cv_file.status != CVFileStatus.EXTRACTING.value or cv_file.claimed_by == owner:
+        return False
+    expires_at = cv_file.lease_expires_at
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at > _now()
+
+
+def clear_lease(cv_file: CVFile) -> None:
+    cv_file.claimed_by = None
+    cv_file.lease_expires_at = None
+
+
+def release(db: Session, cv_file_ids: Sequence[int], owner: str) -> None:
+    """Libère les leases encore détenus par `owner` (statut inchangé). Ne commit pas."""
+    if not cv_file_ids:
+        return
+    db.execute(
+        update(CVFile)
+        .where(CVFile.id.in_(list(cv_file_ids)), CVFile.claimed_by == owner)
+        .values(claimed_by=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@dataclass
+class ReapResult:
+    requeued: List[int] = field(default_factory=list)
+    failed: List[int] = field(default_factory=list)
+
+
+def reap_stalled(db: Session, max_attempts: Optional[int] = None) -> ReapResult:
+    """
+    Remet à UPLOADED les lignes EXTRACTING au lease expiré ; FAILED au-delà
+    de max_attempts (ainsi que les lignes UPLOADED ayant épuisé leurs
+    tentatives, que claim_batch ne prend plus). Commit ; les lignes requeued
+    sont à remettre en file par l'appelant en mode celery.
+    """
+    max_attempts = max_attempts or settings.CLAIM_MAX_ATTEMPTS
+    now = _now()
+    rows = (
+        db.query(CVFile.id, CVFile.application_id, CVFile.attempts, Application.offer_id)
+        .join(Application, Application.id == CVFile.application_id)
+        .filter(or_(
+            _expired(now),
+            and_(CVFile.status == CVFileStatus.UPLOADED.value, CVFile.attempts >= max_attempts),
+        ))
+        .order_by(CVFile.id)
+        .with_for_update(of=CVFile, skip_locked=True)
+        .all()
+    )
+    result = ReapResult()
+    if not rows:
+        db.rollback()
+        return result
+
+    file_updates = []
+    failed_app_ids = []
+    events = []
+    for row in rows:
+        if row.attempts >= max_attempts:
+            error = f"Processing lease expired after {row.attempts} attempts"
+            file_updates.append({
+                "id": row.id, "status": CVFileStatus.FAILED.value, "error_message": error,
+                "claimed_by": None, "lease_expires_at": None,
+            })
+            failed_app_ids.append(row.application_id)
+            result.failed.append(row.id)
+            events.append({
+                "offer_id": row.offer_id, "application_id": row.application_id,
+                "stage": pipeline_events.FAILED, "error": error,
+            })
+        else:
+            file_updates.append({
+                "id": row.id, "status": CVFileStatus.UPLOADED.value,
+                "claimed_by": None, "lease_expires_at": None,
+            })
+            result.requeued.append(row.id)
+
+    db.execute(update(CVFile), file_updates)
+    if failed_app_ids:
+        db.execute(
+            update(CVText)
+            .where(CVText.application_id.in_(failed_app_ids))
+            .values(status="FAILED", error_message="Processing lease expired")
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    pipeline_events.publish_many(events)
+    logger.warning("stalled_cv_files_reaped", requeued=len(result.requeued), failed=len(result.failed))
+    return result
@@ -0,0 +1,102 @@
+"""
+Backend ONNX Runtime (int8) pour le modèle SBERT, sans PyTorch.
+
+Le graphe est exporté et quantifié une fois par app.tools.export_onnx ; ce
+module n'a besoin que de onnxruntime, tokenizers et numpy. L'interface imite
+SentenceTransformer.encode() pour être interchangeable dans le registre.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "encoder_config.json"
+
+
+class _TokenizerAdapter:
+    """Expose tokenizer(texts, add_special_tokens=...)["input_ids"] comme HF."""
+
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def __call__(self, texts: List[str], add_special_tokens: bool = True) -> Dict[str, List[List[int]]]:
+        encodings = self._tokenizer.encode_batch(list(texts), add_special_tokens=add_special_tokens)
+        return {"input_ids": [e.ids for e in encodings]}
+
+
+class OnnxSentenceEncoder:
+    """Mean pooling + normalisation L2 sur un transformer exporté en ONNX."""
+
+    def __init__(self, model_dir: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        directory = Path(model_dir)
+        config = json.loads((directory / CONFIG_FILE).read_text())
+        self.max_seq_length = int(config.get("max_seq_length", 128))
+
+        tokenizer_path = str(directory / TOKENIZER_FILE)
+        # Deux instances : une sans troncature pour compter les tokens (découpage),
+        # une tronquée + paddée pour l'inférence
+        counting = Tokenizer.from_file(tokenizer_path)
+        counting.no_truncation()
+        counting.no_padding()
+        self.tokenizer = _TokenizerAdapter(counting)
+
+        self._raw_tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._raw_tokenizer.enable_truncation(self.max_seq_length)
+        self._raw_tokenizer.enable_padding(pad_id=int(config.get("pad_token_id", 1)))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(
+            str(directory / MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._raw_tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences,
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Trier par longueur limite le padding dans chaque batch
+        order = np.argsort([-len(t) for t in texts])
+        out = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            vectors = self._encode_batch([texts[i] for i in idx])
+            for i, vector in zip(idx, vectors):
+                out[i] = vector
+
+        vectors = np.stack(out).astype(np.float32)
+        if normalize_embeddings:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
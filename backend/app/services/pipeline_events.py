@@ -0,0 +1,157 @@
+"""
+Événements de progression du pipeline CV (Redis pub/sub -> SSE).
+
+Côté worker, chaque transition d'étape (extracting, extracted, parsed,
+scored, failed) est publiée sur le canal ats:events:offer:<offer_id>.
+
+Côté API, un seul abonnement Redis par processus (psubscribe sur tous les
+canaux d'offre) alimente des files asyncio par client : un client SSE
+inactif ne coûte qu'une file en mémoire, sans connexion Redis ni session
+base de données.
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+CHANNEL_PREFIX = "ats:events:offer:"
+
+# Étapes publiées
+EXTRACTING = "extracting"
+EXTRACTED = "extracted"
+PARSED = "parsed"
+SCORED = "scored"
+FAILED = "failed"
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        from redis import Redis
+        _client = Redis.from_url(settings.CELERY_BROKER_URL)
+    return _client
+
+
+def _payload(offer_id: int, application_id: int, stage: str, extra: Dict) -> str:
+    return json.dumps({
+        "offer_id": offer_id,
+        "application_id": application_id,
+        "stage": stage,
+        "ts": round(time.time(), 3),
+        **extra,
+    }, default=str)
+
+
+def publish(offer_id: Optional[int], application_id: int, stage: str, **extra) -> None:
+    """Publie une transition (best effort : une erreur Redis ne fait pas échouer la tâche)."""
+    if not settings.PIPELINE_EVENTS_ENABLED or offer_id is None:
+        return
+    try:
+        _redis().publish(f"{CHANNEL_PREFIX}{offer_id}", _payload(offer_id, application_id, stage, extra))
+    except Exception as e:
+        logger.warning("pipeline_event_publish_failed", stage=stage, error=repr(e))
+
+
+def publish_many(events: Iterable[Dict]) -> None:
+    """Variante groupée (un aller-retour Redis) : dicts offer_id, application_id, stage, ..."""
+    if not settings.PIPELINE_EVENTS_ENABLED:
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for event in events:
+            extra = {k: v for k, v in event.items() if k not in ("offer_id", "application_id", "stage")}
+            pipe.publish(
+                f"{CHANNEL_PREFIX}{event['offer_id']}",
+                _payload(event["offer_id"], event["application_id"], event["stage"], extra),
+            )
+        pipe.execute()
+    except Exception as e:
+        logger.warning("pipeline_event_publish_failed", error=repr(e))
+
+
+class EventHub:
+    """Distribution des événements Redis aux clients SSE du processus API."""
+
+    def __init__(self, redis_url: str):
+        self._redis_url = redis_url
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, offer_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SSE_CLIENT_QUEUE_SIZE)
+        self._subscribers[offer_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, offer_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(offer_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[offer_id]
+
+    def _dispatch(self, channel: bytes, data: bytes) -> None:
+        try:
+            offer_id = int(channel.decode()[len(CHANNEL_PREFIX):])
+        except ValueError:
+            return
+        queues = self._subscribers.get(offer_id)
+        if not queues:
+            return
+        message = data.decode()
+        try:
+            stage = json.loads(message).get("stage", "message")
+        except ValueError:
+            return
+        for queue in queues:
+            if queue.full():
+                # Client trop lent : on perd le plus ancien plutôt que de bloquer les autres
+                queue.get_nowait()
+            queue.put_nowait((stage, message))
+
+    async def _run(self) -> None:
+        from redis.asyncio import Redis
+
+        while True:
+            client = Redis.from_url(self._redis_url)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("pipeline_events_subscription_lost", error=repr(e))
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+hub = EventHub(settings.CELERY_BROKER_URL)
@@ -0,0 +1,235 @@
+"""
+Traces par exécution du pipeline CV (table cv_pipeline_traces).
+
+Une ligne par exécution : chaîne Celery (run_id = en-tête pipeline_run_id
+posé à l'envoi, cf. tasks._lane_options ; id de la tâche à défaut), avec
+l'extraction inline de l'upload s'il y a lieu, lot d'ingestion groupée ou
+lot du claim worker. Chaque étape y ajoute sa
+durée, l'attente en file de son message (en-tête enqueued_at), ses retries
+et, si elle a réutilisé une sortie existante (idempotence, single-flight),
+son nom dans cache_hits. L'extraction ajoute le type MIME et le nombre de
+pages (dont OCR).
+
+Les histogrammes de core.timing donnent des agrégats par processus depuis
+leur démarrage ; ces traces permettent les percentiles par étape, par type
+MIME et sur une fenêtre de temps quelconque (GET /processing/traces/stats),
+et l'historique d'un CV donné. L'écriture est best effort : une erreur est
+loggée, jamais propagée à la tâche.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import structlog
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.pipeline_trace import PipelineTrace
+from app.workers.celery_app import task_lane
+
+logger = structlog.get_logger(__name__)
+
+RUNNING = "RUNNING"
+SCORED = "SCORED"
+FAILED = "FAILED"
+
+STAGES = ("queue_wait", "extract", "parse", "score", "total")
+PERCENTILES = (0.5, 0.95, 0.99)
+
+_STAGE_COLUMNS = {
+    "queue_wait": PipelineTrace.queue_wait_ms,
+    "extract": PipelineTrace.extract_ms,
+    "parse": PipelineTrace.parse_ms,
+    "score": PipelineTrace.score_ms,
+    "total": PipelineTrace.total_ms,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def run_id(request) -> Optional[str]:
+    """
+    Identifiant d'exécution d'une tâche Celery : en-tête pipeline_run_id de
+    son pipeline, ou son propre id (tâche envoyée seule). Pas le root_id :
+    les pipelines envoyés depuis une même tâche le partagent.
+    """
+    return request.get("pipeline_run_id") or getattr(request, "id", None)
+
+
+def _queue_wait_ms(request) -> float:
+    enqueued_at = request.get("enqueued_at")
+    if enqueued_at is None:
+        return 0.0
+    return max(0.0, time.time() - float(enqueued_at)) * 1000
+
+
+def record_stage(
+    request,
+    stage: str,
+    duration_ms: float,
+    **fields: Any,
+) -> None:
+    """
+    Ajoute une étape (extract | parse | score) à la trace de l'exécution de
+    la tâche `request`, créée au premier appel. `status` (SCORED, FAILED)
+    clôt la trace et calcule total_ms depuis l'en-tête pipeline_started_at.
+    """
+    if not settings.PIPELINE_TRACES_ENABLED:
+        return
+    key = run_id(request)
+    if key is None:
+        return
+    _record(
+        key, task_lane(request), stage, duration_ms,
+        queue_wait_ms=_queue_wait_ms(request),
+        retries=request.retries or 0,
+        started_at=request.get("pipeline_started_at"),
+        **fields,
+    )
+
+
+def record_inline_stage(key: str, lane: str, stage: str, duration_ms: float, **fields: Any) -> None:
+    """
+    Étape exécutée hors Celery, dans la requête d'upload (extraction inline) :
+    `key` est le pipeline_run_id passé ensuite à la chaîne parse -> score.
+    """
+    if not settings.PIPELINE_TRACES_ENABLED:
+        return
+    _record(key, lane, stage, duration_ms, queue_wait_ms=0.0, retries=0, started_at=None, **fields)
+
+
+def _record(
+    key: str,
+    lane: str,
+    stage: str,
+    duration_ms: float,
+    *,
+    queue_wait_ms: float,
+    retries: int,
+    started_at: Optional[float],
+    cache_hit: bool = False,
+    cv_file_id: Optional[int] = None,
+    application_id: Optional[int] = None,
+    mime_type: Optional[str] = None,
+    page_count: Optional[int] = None,
+    ocr_pages: Optional[int] = None,
+    status: Optional[str] = None,
+    error: Optional[str] = None,
+) -> None:
+    try:
+        db = SessionLocal()
+        try:
+            trace = db.query(PipelineTrace).filter(PipelineTrace.run_id == key).one_or_none()
+            if trace is None:
+                trace = PipelineTrace(
+                    run_id=key, lane=lane, status=RUNNING,
+                    queue_wait_ms=0.0, retries=0, cache_hits=[],
+                )
+                db.add(trace)
+            for name, value in (
+                ("cv_file_id", cv_file_id),
+                ("application_id", application_id),
+                ("mime_type", mime_type),
+                ("page_count", page_count),
+                ("ocr_pages", ocr_pages),
+            ):
+                if value is not None:
+                    setattr(trace, name, value)
+            setattr(trace, f"{stage}_ms", round(duration_ms, 1))
+            trace.queue_wait_ms = round((trace.queue_wait_ms or 0.0) + queue_wait_ms, 1)
+            trace.retries = (trace.retries or 0) + retries
+            if cache_hit:
+                # Nouvelle liste : une mutation en place de la colonne JSON n'est pas détectée
+                trace.cache_hits = sorted(set(trace.cache_hits or []) | {stage})
+            if error is not None:
+                trace.error = error[:2000]
+            if status is not None:
+                trace.status = status
+                trace.finished_at = _now()
+                if started_at is not None:
+                    trace.total_ms = round(max(0.0, time.time() - float(started_at)) * 1000, 1)
+                else:
+                    trace.total_ms = round(sum(
+                        getattr(trace, f"{name}_ms") or 0.0 for name in ("queue_wait", "extract", "parse", "score")
+                    ), 1)
+            db.commit()
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning("pipeline_trace_failed", run_id=key, stage=stage, error=repr(e))
+
+
+def add_batch(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Traces d'un lot d'ingestion (une ligne par fichier), dans la transaction
+    de l'appelant ; un échec n'annule pas les écritures du lot.
+    """
+    if not settings.PIPELINE_TRACES_ENABLED or not rows:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(PipelineTrace), rows)
+    except Exception as e:
+        logger.warning("pipeline_trace_batch_failed", rows=len(rows), error=repr(e))
+
+
+def purge(db: Session, retention_days: Optional[int] = None) -> int:
+    """Supprime les traces plus anciennes que la rétention ; commit."""
+    days = retention_days or settings.PIPELINE_TRACE_RETENTION_DAYS
+    result = db.execute(
+        delete(PipelineTrace)
+        .where(PipelineTrace.created_at < _now() - timedelta(days=days))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def stage_percentiles(
+    db: Session,
+    since: datetime,
+    until: Optional[datetime] = None,
+    mime_type: Optional[str] = None,
+    lane: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    p50 / p95 / p99 par étape et par type MIME sur [since, until)
+    (percentile_cont, PostgreSQL). Les étapes servies par le cache comptent
+    avec leur durée réelle ; les étapes absentes (NULL) sont ignorées.
+    """
+    columns = []
+    for stage, column in _STAGE_COLUMNS.items():
+        columns.append(func.count(column).label(f"{stage}_count"))
+        for q in PERCENTILES:
+            columns.append(func.percentile_cont(q).within_group(column).label(f"{stage}_p{round(q * 100)}"))
+
+    query = db.query(PipelineTrace.mime_type, func.count(PipelineTrace.id).label("runs"), *columns)
+    query = query.filter(PipelineTrace.created_at >= since)
+    if until is not None:
+        query = query.filter(PipelineTrace.created_at < until)
+    if mime_type:
+        query = query.filter(PipelineTrace.mime_type == mime_type)
+    if lane:
+        query = query.filter(PipelineTrace.lane == lane)
+
+    groups = []
+    for row in query.group_by(PipelineTrace.mime_type).order_by(PipelineTrace.mime_type).all():
+        stages = {}
+        for stage in STAGES:
+            stages[stage] = {
+                "count": getattr(row, f"{stage}_count"),
+                **{
+                    f"p{round(q * 100)}_ms": _round(getattr(row, f"{stage}_p{round(q * 100)}"))
+                    for q in PERCENTILES
+                },
+            }
+        groups.append({"mime_type": row.mime_type, "runs": row.runs, "stages": stages})
+    return groups
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(float(value), 1) if value is not None else None
@@ -0,0 +1,274 @@
+"""
+Classement des candidats d'une offre en deux étapes.
+
+1. Préfiltre bon marché sur tous les CV : TF-IDF (une seule matrice), overlap
+   de mots et score structuré du CVScorer (ParsedCV.matching_score).
+2. SBERT uniquement sur les K meilleurs du préfiltre (vecteurs stockés si
+   disponibles, sinon un seul appel batch), dans la limite d'un budget de temps.
+
+Les CV de la shortlist reçoivent le score combiné complet (même formule que
+combined_score) ; les autres gardent leur score lexical et sont classés après.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import structlog
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services import embeddings
+from app.services.scoring import (
+    combine_score_arrays,
+    keyword_overlap_scores,
+    tfidf_cosine_scores,
+)
+
+logger = structlog.get_logger(__name__)
+
+STAGE_SHORTLIST = "shortlist"
+STAGE_PREFILTER = "prefilter"
+
+
+@dataclass
+class RankingCandidate:
+    application_id: int
+    cv_text: str
+    quality_score: Optional[float] = None  # 0..1
+    structured_score: Optional[float] = None  # 0..100 (CVScorer)
+    cv_vector: Optional[np.ndarray] = None
+    token_counts: Optional[dict] = None  # cv_texts.token_counts
+
+
+@dataclass
+class RankedCandidate:
+    application_id: int
+    score: float  # 0..100
+    lexical_score: float  # 0..100, sans SBERT
+    tfidf: float
+    overlap: float
+    semantic: Optional[float]
+    stage: str
+
+
+@dataclass
+class RankingResult:
+    ranked: List[RankedCandidate]
+    shortlist_size: int
+    semantic_scored: int
+    budget_exhausted: bool = False
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _semantic_scores(
+    job_text: str,
+    shortlist: List[RankingCandidate],
+    job_vector: Optional[np.ndarray],
+    budget_ms: float,
+) -> tuple[List[Optional[float]], bool]:
+    """
+    Similarité SBERT pour la shortlist (dans l'ordre du préfiltre).
+    Les vecteurs stockés ne coûtent qu'un produit scalaire ; les manquants sont
+    encodés par batches jusqu'à épuisement du budget (0 = illimité).
+    """
+    started = time.perf_counter()
+    if job_vector is None:
+        encoded = embeddings.encode_documents([job_text])
+        if encoded is None:
+            return [None] * len(shortlist), False
+        job_vector = encoded[0]
+
+    vectors: List[Optional[np.ndarray]] = [c.cv_vector for c in shortlist]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    exhausted = False
+
+    if missing:
+        if budget_ms > 0:
+            step = max(1, settings.SBERT_ENCODE_BATCH_SIZE)
+            batches = [missing[i:i + step] for i in range(0, len(missing), step)]
+        else:
+            batches = [missing]
+        for batch in batches:
+            if budget_ms > 0 and (time.perf_counter() - started) * 1000 >= budget_ms:
+                exhausted = True
+                break
+            encoded = embeddings.encode_documents([shortlist[i].cv_text for i in batch])
+            if encoded is None:
+                break
+            for i, vector in zip(batch, encoded):
+                vectors[i] = vector
+
+    scores = [
+        embeddings.vector_similarity(job_vector, v) if v is not None else None
+        for v in vectors
+    ]
+    return scores, exhausted
+
+
+def rank_candidates(
+    job_text: str,
+    candidates: Sequence[RankingCandidate],
+    shortlist_k: Optional[int] = None,
+    semantic_budget_ms: Optional[float] = None,
+    job_vector: Optional[np.ndarray] = None,
+    structured_weight: Optional[float] = None,
+    alpha: float = 0.5,
+    sbert_weight: float = 0.6,
+    job_counts: Optional[dict] = None,
+) -> RankingResult:
+    """
+    Classe les candidats d'une offre. shortlist_k <= 0 (ou >= nombre de CV)
+    revient au pipeline complet : SBERT sur tout le monde. job_counts :
+    offers.token_counts (None : description re-tokenisée).
+    """
+    shortlist_k = settings.RANKING_SHORTLIST_K if shortlist_k is None else shortlist_k
+    budget_ms = settings.RANKING_SEMANTIC_BUDGET_MS if semantic_budget_ms is None else semantic_budget_ms
+    structured_weight = (
+        settings.RANKING_STRUCTURED_WEIGHT if structured_weight is None else structured_weight
+    )
+    candidates = list(candidates)
+    n = len(candidates)
+    timings: Dict[str, float] = {}
+    if n == 0:
+        return RankingResult(ranked=[], shortlist_size=0, semantic_scored=0, timings_ms=timings)
+
+    # 1) Préfiltre : signaux lexicaux et structurés sur tous les CV
+    started = time.perf_counter()
+    texts = [c.cv_text or "" for c in candidates]
+    tfidf = np.asarray(tfidf_cosine_scores(job_text, texts), dtype=float)
+    overlap = keyword_overlap_scores(
+        job_text, texts, cv_counts=[c.token_counts for c in candidates], job_counts=job_counts,
+    ).astype(float) / 100.0
+    quality = np.array(
+        [np.nan if c.quality_score is None else c.quality_score for c in candidates], dtype=float
+    )
+    lexical = combine_score_arrays(
+        tfidf, overlap, np.zeros(n), quality, alpha=alpha, sbert_weight=0.0
+    )
+    structured = np.array(
+        [np.nan if c.structured_score is None else c.structured_score for c in candidates],
+        dtype=float,
+    )
+    structured = np.where(np.isnan(structured), lexical, structured)
+    prefilter = (1.0 - structured_weight) * lexical + structured_weight * structured
+
+    k = n if shortlist_k <= 0 else min(shortlist_k, n)
+    if k < n:
+        top = np.argpartition(-prefilter, k - 1)[:k]
+    else:
+        top = np.arange(n)
+    top = top[np.argsort(-prefilter[top], kind="stable")]
+    timings["prefilter"] = _elapsed_ms(started)
+
+    # 2) SBERT sur la shortlist uniquement
+    started = time.perf_counter()
+    semantic, exhausted = _semantic_scores(
+        job_text, [candidates[i] for i in top], job_vector, budget_ms
+    )
+    timings["semantic"] = _elapsed_ms(started)
+
+    # 3) Fusion : score complet pour la shortlist notée, lexical pour les autres
+    semantic_all = np.full(n, np.nan)
+    for i, value in zip(top, semantic):
+        if value is not None:
+            semantic_all[i] = value
+    scored = ~np.isnan(semantic_all)
+    final = lexical.copy()
+    final[scored] = combine_score_arrays(
+        tfidf[scored], overlap[scored], semantic_all[scored], quality[scored],
+        alpha=alpha, sbert_weight=sbert_weight,
+    )
+
+    # Shortlist notée d'abord (score final), puis le reste (score du préfiltre)
+    order = np.lexsort((-np.where(scored, final, prefilter), ~scored))
+    ranked = [
+        RankedCandidate(
+            application_id=candidates[i].application_id,
+            score=round(float(final[i]), 2),
+            lexical_score=round(float(lexical[i]), 2),
+            tfidf=float(tfidf[i]),
+            overlap=float(overlap[i]),
+            semantic=None if not scored[i] else float(semantic_all[i]),
+            stage=STAGE_SHORTLIST if scored[i] else STAGE_PREFILTER,
+        )
+        for i in order
+    ]
+
+    result = RankingResult(
+        ranked=ranked,
+        shortlist_size=int(k),
+        semantic_scored=int(scored.sum()),
+        budget_exhausted=exhausted,
+        timings_ms=timings,
+    )
+    logger.info(
+        "candidates_ranked",
+        candidates=n,
+        shortlist=result.shortlist_size,
+        semantic_scored=result.semantic_scored,
+        budget_exhausted=exhausted,
+        **{f"{stage}_ms": ms for stage, ms in timings.items()},
+    )
+    return result
+
+
+def ranking_agreement(reference: Sequence[int], candidate: Sequence[int], k: int) -> Dict[str, float]:
+    """
+    Accord entre deux classements (ids dans l'ordre) : recouvrement du top-k
+    et tau de Kendall sur les positions de tous les ids communs.
+    """
+    from scipy.stats import kendalltau
+
+    k = max(1, min(k, len(reference)))
+    overlap = len(set(reference[:k]) & set(candidate[:k])) / k
+
+    position = {app_id: rank for rank, app_id in enumerate(candidate)}
+    common = [app_id for app_id in reference if app_id in position]
+    tau = 1.0
+    if len(common) > 1:
+        tau = float(kendalltau(range(len(common)), [position[a] for a in common])[0])
+    return {"overlap_at_k": round(overlap, 4), "kendall_tau": round(tau, 4)}
+
+
+def load_candidates(db: Session, offer_id: int) -> List[RankingCandidate]:
+    """Candidatures d'une offre avec texte extrait, score structuré et vecteur stocké."""
+    from app.models.application import Application
+    from app.models.cv_text import CVText
+    from app.models.embedding import EmbeddingOwner
+    from app.models.parsed_cv import ParsedCV
+    from app.services import embedding_store
+
+    rows = (
+        db.query(
+            Application.id,
+            CVText.extracted_text,
+            CVText.quality_score,
+            ParsedCV.matching_score,
+            CVText.token_counts,
+        )
+        .join(CVText, CVText.application_id == Application.id)
+        .outerjoin(ParsedCV, ParsedCV.application_id == Application.id)
+        .filter(
+            Application.offer_id == offer_id,
+            CVText.status == "SUCCESS",
+            CVText.extracted_text.isnot(None),
+        )
+        .all()
+    )
+    vectors = embedding_store.load_vectors(db, EmbeddingOwner.CV, [r[0] for r in rows])
+    return [
+        RankingCandidate(
+            application_id=app_id,
+            cv_text=text,
+            quality_score=quality,
+            structured_score=structured,
+            cv_vector=vectors.get(app_id),
+            token_counts=counts,
+        )
+        for app_id, text, quality, structured, counts in rows
+    ]
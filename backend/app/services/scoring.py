@@ -1,113 +1,76 @@
 """
 Module de scoring entre une offre d'emploi (job_text) et un CV (cv_text).
 
-- TF-IDF + cosinus
+- TF-IDF + cosinus (modèle entraîné sur le corpus, cf. tfidf_model)
 - Overlap de mots (historique)
 - SBERT (embeddings)
 - Pondération par quality_score
 """
 
-import math
-import re
-from collections import Counter
-from typing import List
+from typing import List, Optional
 
+import numpy as np
+import structlog
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-# SBERT : on garde l'import, mais la fonction elle-même doit être "safe"
+from app.core.timing import stage_timer, timed
+from app.services import embeddings, tfidf_model, token_counts
 
-
-
-WORD_RE = re.compile(r"\w+", re.UNICODE)
-
-# Sprint 5: SBERT Similarity Function
-from sentence_transformers import SentenceTransformer, util
-import logging
-
-# Charger le modèle SBERT une seule fois au démarrage du module
-try:
-    _sbert_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-    _model_loaded = True
-    logging.info("SBERT model loaded successfully")
-except Exception as e:
-    logging.error(f"Failed to load SBERT model: {e}")
-    _sbert_model = None
-    _model_loaded = False
+logger = structlog.get_logger(__name__)
 
 
 def sbert_similarity(text1: str, text2: str) -> float:
     """
     Calcule la similarité sémantique entre deux textes en utilisant SBERT.
-    
+
+    Le modèle est partagé via le registre de app.services.embeddings
+    (chargé une seule fois par processus, à la première utilisation).
+
     Args:
         text1: Premier texte (description de poste)
         text2: Deuxième texte (texte du CV)
-    
+
     Returns:
         float: Score de similarité entre 0.0 et 1.0
                Retourne 0.0 en cas d'erreur ou si le modèle n'est pas chargé
     """
-    if not _model_loaded or not _sbert_model:
-        logging.warning("SBERT model not loaded, returning 0.0")
-        return 0.0
-    
-    if not text1 or not text2:
-        logging.warning("Empty text provided to sbert_similarity")
-        return 0.0
-    
-    try:
-        # Encoder les deux textes en embeddings
-        embedding1 = _sbert_model.encode(text1, convert_to_tensor=True)
-        embedding2 = _sbert_model.encode(text2, convert_to_tensor=True)
-        
-        # Calculer la similarité cosinus entre les embeddings
-        similarity = util.cos_sim(embedding1, embedding2)
-        
-        # Convertir en float et s'assurer que le score est entre 0 et 1
-        score = float(similarity[0][0])
-        score = max(0.0, min(score, 1.0))
-        
-        logging.debug(f"SBERT similarity calculated: {score:.4f}")
-        return score
-        
-    except Exception as e:
-        logging.error(f"Error in sbert_similarity: {e}")
-        return 0.0
-
-
-
-def _normalize(text: str) -> list[str]:
-    text = text.lower()
-    return WORD_RE.findall(text)
+    return embeddings.sbert_similarity(text1, text2)
 
 
 def keyword_overlap_score(job_text: str, cv_text: str) -> int:
     if not job_text or not cv_text:
         return 0
 
-    job_tokens = _normalize(job_text)
-    cv_tokens = _normalize(cv_text)
-
-    if not job_tokens or not cv_tokens:
-        return 0
-
-    job_counts = Counter(job_tokens)
-    cv_counts = Counter(cv_tokens)
-
-    common = 0
-    total_job = 0
-    for word, j_count in job_counts.items():
-        total_job += j_count
-        c_count = cv_counts.get(word, 0)
-        common += min(j_count, c_count)
+    # Comptes de tokens mis en cache (cf. token_counts) : somme des minimums
+    return token_counts.overlap_from_counts(
+        token_counts.cached_counts(job_text),
+        token_counts.cached_counts(cv_text),
+    )
 
-    if total_job == 0:
-        return 0
 
-    ratio = common / total_job
-    score = math.floor(ratio * 100)
-    return max(0, min(score, 100))
+def keyword_overlap_scores(
+    job_text: str,
+    cv_texts: Optional[List[str]] = None,
+    cv_counts: Optional[List[Optional[dict]]] = None,
+    job_counts: Optional[dict] = None,
+) -> np.ndarray:
+    """
+    keyword_overlap_score d'une offre contre N CV en un appel vectorisé.
+    cv_counts / job_counts (comptes persistés, cf. token_counts) évitent de
+    re-tokeniser ; les entrées manquantes sont calculées depuis les textes.
+    """
+    if cv_counts is None:
+        cv_counts = [None] * len(cv_texts or [])
+    if not job_text:
+        return np.zeros(len(cv_counts), dtype=np.int64)
+    counts = [
+        c if c is not None else token_counts.cached_counts(cv_texts[i] if cv_texts else None)
+        for i, c in enumerate(cv_counts)
+    ]
+    if job_counts is None:
+        job_counts = token_counts.cached_counts(job_text)
+    return token_counts.overlap_batch(job_counts, counts)
 
 
 def _build_tfidf_vectorizer() -> TfidfVectorizer:
@@ -123,6 +86,12 @@ def tfidf_cosine_scores(job_text: str, cv_texts: List[str]) -> List[float]:
     if not job_text or not cv_texts:
         return [0.0 for _ in cv_texts]
 
+    # Modèle corpus disponible : transform + produit scalaire uniquement
+    model = tfidf_model.get_model()
+    if model is not None:
+        return model.cosine_scores(job_text, list(cv_texts))
+
+    # Fallback (aucun modèle entraîné) : fit sur les seuls documents fournis
     documents = [job_text] + list(cv_texts)
 
     vectorizer = _build_tfidf_vectorizer()
@@ -135,41 +104,75 @@ def tfidf_cosine_scores(job_text: str, cv_texts: List[str]) -> List[float]:
     return sims.tolist()
 
 
+@timed("combined_score")
 def combined_score(
     job_text: str,
     cv_text: str,
     quality_score: float | None = None,
     alpha: float = 0.5,
     sbert_weight: float = 0.6,
+    job_vector=None,
+    cv_vector=None,
 ) -> float:
+    """
+    Score combiné 0..100. Si les embeddings stockés (embedding_store) sont
+    fournis, la similarité SBERT est un simple produit scalaire, sans modèle.
+    """
     # 1) TF-IDF (0..1)
-    tfidf_scores = tfidf_cosine_scores(job_text, [cv_text])
+    with stage_timer("combined_score.tfidf"):
+        tfidf_scores = tfidf_cosine_scores(job_text, [cv_text])
     tfidf = tfidf_scores[0] if tfidf_scores else 0.0
 
     # 2) Overlap (0..1)
-    overlap_raw = keyword_overlap_score(job_text, cv_text)
+    with stage_timer("combined_score.overlap"):
+        overlap_raw = keyword_overlap_score(job_text, cv_text)
     overlap = overlap_raw / 100.0
 
     # 3) SBERT (0..1) - IMPORTANT: sbert_similarity doit renvoyer 0.0 si erreur
-    semantic_sim = sbert_similarity(job_text, cv_text)
+    with stage_timer("combined_score.sbert"):
+        if job_vector is not None and cv_vector is not None:
+            semantic_sim = embeddings.vector_similarity(job_vector, cv_vector)
+        else:
+            semantic_sim = sbert_similarity(job_text, cv_text)
+
+    logger.debug(
+        "combined_score_components",
+        tfidf=tfidf,
+        overlap_raw=overlap_raw,
+        sbert=semantic_sim,
+        quality=quality_score,
+    )
+
+    # 4-6) Combinaison, pondération qualité, 0..100
+    quality = None if quality_score is None else np.array([quality_score], dtype=float)
+    final = combine_score_arrays(
+        np.array([tfidf]), np.array([overlap]), np.array([semantic_sim]),
+        quality, alpha=alpha, sbert_weight=sbert_weight,
+    )
+    return float(final[0])
 
-    # Logs
-    print("DEBUG SCORING")
-    print("TFIDF:", tfidf)
-    print("OVERLAP_RAW:", overlap_raw)
-    print("SBERT:", semantic_sim)
-    print("QUALITY:", quality_score)
 
+def combine_score_arrays(
+    tfidf: np.ndarray,
+    overlap: np.ndarray,
+    semantic: np.ndarray,
+    quality: Optional[np.ndarray] = None,
+    alpha: float = 0.5,
+    sbert_weight: float = 0.6,
+) -> np.ndarray:
+    """
+    Pondération de combined_score sur des tableaux (un élément par CV).
+    Entrées 0..1 ; quality peut contenir NaN (pas de pondération qualité).
+    """
     # 4) Combinaison
     base_no_sbert = alpha * tfidf + (1.0 - alpha) * overlap
-    base = sbert_weight * semantic_sim + (1.0 - sbert_weight) * base_no_sbert
+    base = sbert_weight * semantic + (1.0 - sbert_weight) * base_no_sbert
 
     # 5) Pondération qualité
-    if quality_score is not None:
-        qs = max(0.0, min(quality_score, 1.0))
-        factor = 0.9 + 0.1 * qs
+    if quality is not None:
+        qs = np.clip(np.asarray(quality, dtype=float), 0.0, 1.0)
+        factor = np.where(np.isnan(qs), 1.0, 0.9 + 0.1 * qs)
         base = base * factor
 
     # 6) 0..100
-    final = max(0.0, min(base * 100.0, 100.0))
-    return final
+    return np.clip(base * 100.0, 0.0, 100.0)
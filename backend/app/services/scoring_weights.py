@@ -0,0 +1,114 @@
+"""
+Simulation de pondérations CVScorer sur toute une offre.
+
+Les sous-scores (compétences, expérience, formation, langues) sont déjà
+stockés dans parsed_cvs : on les charge en une matrice NumPy, on re-pondère et
+on re-classe en mémoire, sans re-parser ni re-scorer les CV.
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import structlog
+from sqlalchemy import Numeric, cast, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.application import Application
+from app.models.offer import Offer
+from app.models.parsed_cv import ParsedCV
+
+logger = structlog.get_logger(__name__)
+
+# Ordre des colonnes de la matrice <-> clés de CVScorer.WEIGHTS
+CATEGORIES = ("skills", "experience", "education", "languages")
+_COLUMNS = {
+    "skills": ParsedCV.skills_score,
+    "experience": ParsedCV.experience_score,
+    "education": ParsedCV.education_score,
+    "languages": ParsedCV.language_score,
+}
+
+
+@dataclass
+class OfferSubScores:
+    application_ids: np.ndarray  # (n,)
+    sub_scores: np.ndarray  # (n, 4), ordre CATEGORIES, 0..100
+    current_scores: np.ndarray  # (n,) matching_score stocké
+
+
+@dataclass
+class SimulationResult:
+    application_ids: np.ndarray
+    scores: np.ndarray  # (n,) nouveaux scores
+    order: np.ndarray  # indices triés par nouveau score décroissant
+    previous_rank: np.ndarray  # (n,) rang actuel (1 = premier)
+
+
+def load_sub_scores(db: Session, offer_id: int) -> OfferSubScores:
+    rows = (
+        db.query(ParsedCV.application_id, *(_COLUMNS[c] for c in CATEGORIES), ParsedCV.matching_score)
+        .join(Application, Application.id == ParsedCV.application_id)
+        .filter(Application.offer_id == offer_id)
+        .all()
+    )
+    data = np.array(rows, dtype=float).reshape(len(rows), len(CATEGORIES) + 2)
+    data = np.nan_to_num(data)
+    return OfferSubScores(
+        application_ids=data[:, 0].astype(np.int64),
+        sub_scores=data[:, 1:-1],
+        current_scores=data[:, -1],
+    )
+
+
+def weight_vector(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([weights[c] for c in CATEGORIES], dtype=float)
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+def simulate(data: OfferSubScores, weights: Dict[str, float]) -> SimulationResult:
+    """Re-pondère (weights normalisés par CVScorer.resolve_weights) et re-classe."""
+    scores = np.round(data.sub_scores @ weight_vector(weights), 2)
+    return SimulationResult(
+        application_ids=data.application_ids,
+        scores=scores,
+        order=np.argsort(-scores, kind="stable"),
+        previous_rank=_ranks(data.current_scores),
+    )
+
+
+def save_weights(db: Session, offer: Offer, weights: Dict[str, float]) -> int:
+    """
+    Enregistre les pondérations sur l'offre et recalcule matching_score de
+    toutes ses candidatures en un seul UPDATE. Ne commit pas.
+    """
+    offer.scoring_weights = weights
+    expression = sum(_COLUMNS[c] * weights[c] for c in CATEGORIES)
+    result = db.execute(
+        update(ParsedCV)
+        .where(ParsedCV.application_id.in_(
+            select(Application.id).where(Application.offer_id == offer.id)
+        ))
+        .values(matching_score=func.round(cast(expression, Numeric), 2))
+        .execution_options(synchronize_session=False)
+    )
+    logger.info("offer_scoring_weights_saved", offer_id=offer.id, weights=weights, updated=result.rowcount)
+    return result.rowcount
+
+
+def top_changes(result: SimulationResult, limit: int) -> List[Dict]:
+    """Les `limit` premiers du nouveau classement avec leur rang précédent."""
+    return [
+        {
+            "rank": rank,
+            "previous_rank": int(result.previous_rank[i]),
+            "application_id": int(result.application_ids[i]),
+            "score": float(result.scores[i]),
+        }
+        for rank, i in enumerate(result.order[:limit], start=1)
+    ]
@@ -0,0 +1,102 @@
+"""
+Coordination "single-flight" des étapes coûteuses du pipeline CV.
+
+Le même fichier envoyé sur plusieurs offres en même temps (même
+CVFile.sha256) ne doit être extrait et parsé qu'une fois : la première tâche
+prend un lease Redis (verrou à jeton avec expiration), les suivantes attendent
+sa libération puis réutilisent le texte / les champs parsés qu'elle a stockés.
+Seul le scoring, propre à chaque offre, est refait.
+
+Le travail évité est compté dans Redis (ats:dedup:saved, un champ par étape)
+et exposé sur /metrics. Redis indisponible : pas de coordination, chaque
+tâche fait son travail comme avant.
+"""
+from typing import Dict, Optional
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+REDIS_KEY_PREFIX = "ats:singleflight:"
+SAVED_COUNTER_KEY = "ats:dedup:saved"
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        from redis import Redis
+        _client = Redis.from_url(settings.CELERY_BROKER_URL)
+    return _client
+
+
+class Lease:
+    """Résultat de acquire() ; release() est sans effet si le lease n'est pas détenu."""
+
+    def __init__(self, lock=None, acquired: bool = False, waited: bool = False):
+        self._lock = lock
+        self.acquired = acquired
+        self.waited = waited  # une autre tâche détenait le lease
+
+    def release(self) -> None:
+        if self._lock is None or not self.acquired:
+            return
+        self.acquired = False
+        try:
+            self._lock.release()
+        except Exception as e:
+            # Lease expiré entre-temps (repris par une autre tâche) : rien à libérer
+            logger.warning("single_flight_release_failed", error=repr(e))
+
+
+def acquire(stage: str, key: Optional[str]) -> Lease:
+    """
+    Prend le lease `stage:key`. Si une autre tâche le détient, attend sa
+    libération (au plus SINGLE_FLIGHT_WAIT_SECONDS) : l'appelant doit alors
+    relire la sortie stockée avant de refaire le travail. L'attente bloque :
+    l'appelant n'a pas de transaction ouverte (connexion rendue au pool).
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED or not key:
+        return Lease()
+    try:
+        lock = _redis().lock(
+            f"{REDIS_KEY_PREFIX}{stage}:{key}",
+            timeout=settings.SINGLE_FLIGHT_LEASE_SECONDS,
+        )
+        if lock.acquire(blocking=False):
+            return Lease(lock, acquired=True)
+        acquired = lock.acquire(blocking=True, blocking_timeout=settings.SINGLE_FLIGHT_WAIT_SECONDS)
+        if not acquired:
+            logger.warning("single_flight_wait_timeout", stage=stage, key=key)
+        return Lease(lock, acquired=acquired, waited=True)
+    except Exception as e:
+        logger.warning("single_flight_unavailable", stage=stage, error=repr(e))
+        return Lease()
+
+
+def record_saved(stage: str) -> None:
+    """Compte une exécution évitée grâce à une sortie déjà produite."""
+    logger.info("single_flight_reused", stage=stage)
+    try:
+        _redis().hincrby(SAVED_COUNTER_KEY, stage, 1)
+    except Exception as e:
+        logger.warning("single_flight_counter_failed", stage=stage, error=repr(e))
+
+
+def saved_counts(redis_url: str) -> Dict[str, int]:
+    from redis import Redis
+
+    raw = Redis.from_url(redis_url).hgetall(SAVED_COUNTER_KEY)
+    return {stage.decode(): int(count) for stage, count in raw.items()}
+
+
+def render_prometheus(counts: Dict[str, int]) -> str:
+    lines = [
+        "# HELP ats_dedup_saved_total Étapes du pipeline évitées (sortie réutilisée, même sha256)",
+        "# TYPE ats_dedup_saved_total counter",
+    ]
+    lines += [f'ats_dedup_saved_total{{stage="{stage}"}} {count}' for stage, count in sorted(counts.items())]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,247 @@
+"""
+Modèle TF-IDF entraîné sur tout le corpus (textes de CV + descriptions d'offres).
+
+- fit() sur le corpus, périodiquement (tâche Celery refit_tfidf_model)
+- vocabulaire + IDF persistés sur disque, IDF chargé en mémoire mappée et
+  appliqué sans copie (pages partagées entre les processus d'une machine)
+- au scoring : transform() uniquement, vecteurs L2-normalisés mis en cache,
+  un score = un produit scalaire creux
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import structlog
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+NGRAM_RANGE = (1, 2)
+MODEL_DIR = Path(settings.MODEL_ARTIFACTS_DIR) / "tfidf"
+CURRENT_FILE = "current.json"
+KEEP_VERSIONS = 2
+
+
+class _VectorCache:
+    """Petit cache LRU thread-safe: (version, hash du texte) -> vecteur creux."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[tuple, sparse.csr_matrix]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is not None:
+                self._data.move_to_end(key)
+            return vec
+
+    def put(self, key, vec) -> None:
+        with self._lock:
+            self._data[key] = vec
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class TfidfCorpusModel:
+    """Vocabulaire + IDF figés ; transform() sans réentraînement."""
+
+    def __init__(self, terms: List[str], idf: np.ndarray, n_docs: int, version: str):
+        self.version = version
+        self.n_docs = n_docs
+        self.idf = idf  # float32 ; np.memmap après load()
+        self._counter = CountVectorizer(
+            vocabulary={term: i for i, term in enumerate(terms)},
+            ngram_range=NGRAM_RANGE,
+            dtype=np.float32,
+        )
+        self._cache = _VectorCache(settings.TFIDF_VECTOR_CACHE_SIZE)
+
+    @property
+    def n_features(self) -> int:
+        return self.idf.shape[0]
+
+    # ------------------------------------------------------------------
+    # Entraînement / persistance
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def fit(
+        cls,
+        texts: Iterable[str],
+        max_features: int = settings.TFIDF_MAX_FEATURES,
+        min_df: int = settings.TFIDF_MIN_DF,
+    ) -> "TfidfCorpusModel":
+        docs = [t for t in texts if t and t.strip()]
+        if not docs:
+            raise ValueError("Empty corpus, cannot fit TF-IDF model")
+
+        vectorizer = TfidfVectorizer(
+            max_features=max_features,
+            ngram_range=NGRAM_RANGE,
+            # min_df > nombre de documents lèverait une erreur sur un petit corpus
+            min_df=min(min_df, len(docs)),
+            dtype=np.float32,
+        )
+        vectorizer.fit(docs)
+
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, idx in vectorizer.vocabulary_.items():
+            terms[idx] = term
+
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        return cls(terms, vectorizer.idf_.astype(np.float32), len(docs), version)
+
+    def save(self, base_dir: Path = MODEL_DIR) -> Path:
+        """Écrit une nouvelle version puis bascule current.json de façon atomique."""
+        base_dir.mkdir(parents=True, exist_ok=True)
+        target = base_dir / self.version
+        tmp = base_dir / f".{self.version}.tmp"
+        tmp.mkdir(parents=True, exist_ok=True)
+
+        terms = sorted(self._counter.vocabulary, key=self._counter.vocabulary.get)
+        (tmp / "vocabulary.txt").write_text("\n".join(terms), encoding="utf-8")
+        np.save(tmp / "idf.npy", np.asarray(self.idf, dtype=np.float32))
+        (tmp / "meta.json").write_text(json.dumps({
+            "version": self.version,
+            "n_docs": self.n_docs,
+            "n_features": self.n_features,
+            "ngram_range": list(NGRAM_RANGE),
+        }))
+        os.replace(tmp, target)
+
+        pointer_tmp = base_dir / f".{CURRENT_FILE}.tmp"
+        pointer_tmp.write_text(json.dumps({"version": self.version}))
+        os.replace(pointer_tmp, base_dir / CURRENT_FILE)
+
+        # Garder les dernières versions (un lecteur peut encore mapper l'ancienne)
+        versions = sorted(p for p in base_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+        for old in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(old, ignore_errors=True)
+        return target
+
+    @classmethod
+    def load(cls, base_dir: Path = MODEL_DIR) -> Optional["TfidfCorpusModel"]:
+        pointer = base_dir / CURRENT_FILE
+        if not pointer.is_file():
+            return None
+        version = json.loads(pointer.read_text())["version"]
+        directory = base_dir / version
+
+        meta = json.loads((directory / "meta.json").read_text())
+        terms = (directory / "vocabulary.txt").read_text(encoding="utf-8").split("\n")
+        idf = np.load(directory / "idf.npy", mmap_mode="r")
+        return cls(terms, idf, meta["n_docs"], version)
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """Vecteurs TF-IDF L2-normalisés (une ligne par texte), avec cache."""
+        rows: List[Optional[sparse.csr_matrix]] = []
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            vec = self._cache.get((self.version, _text_key(text or "")))
+            rows.append(vec)
+            if vec is None:
+                missing.append(i)
+
+        if missing:
+            counts = self._counter.transform([texts[i] or "" for i in missing])
+            # IDF lu aux seuls indices présents : ni matrice diagonale ni copie du mmap
+            counts.data *= self.idf[counts.indices]
+            computed = normalize(counts, norm="l2", copy=False).tocsr()
+            for j, i in enumerate(missing):
+                vec = computed[j]
+                self._cache.put((self.version, _text_key(texts[i] or "")), vec)
+                rows[i] = vec
+
+        if not rows:
+            return sparse.csr_matrix((0, self.n_features), dtype=np.float32)
+        return sparse.vstack(rows, format="csr")
+
+    def cosine_scores(self, job_text: str, cv_texts: List[str]) -> List[float]:
+        job_vec = self.transform([job_text])
+        cv_vecs = self.transform(list(cv_texts))
+        sims = (cv_vecs @ job_vec.T).toarray().ravel()
+        return np.clip(sims, 0.0, 1.0).tolist()
+
+
+# ---------------------------------------------------------------------------
+# Modèle courant du processus (rechargé quand une nouvelle version est publiée)
+# ---------------------------------------------------------------------------
+
+_current: Optional[TfidfCorpusModel] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def _published_version(base_dir: Path) -> Optional[str]:
+    try:
+        return json.loads((base_dir / CURRENT_FILE).read_text())["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def get_model(base_dir: Path = MODEL_DIR) -> Optional[TfidfCorpusModel]:
+    """Modèle corpus courant, ou None si aucun n'a encore été entraîné."""
+    global _current, _last_check
+
+    now = time.monotonic()
+    if now - _last_check < settings.TFIDF_RELOAD_CHECK_SECONDS:
+        return _current
+
+    with _lock:
+        if now - _last_check < settings.TFIDF_RELOAD_CHECK_SECONDS:
+            return _current
+        _last_check = now
+        version = _published_version(base_dir)
+        if version is None or (_current is not None and _current.version == version):
+            return _current
+        try:
+            _current = TfidfCorpusModel.load(base_dir)
+            logger.info("tfidf_model_loaded", version=version, n_features=_current.n_features)
+        except Exception as e:
+            logger.error("tfidf_model_load_failed", version=version, error=repr(e))
+    return _current
+
+
+def refit_and_publish(texts: Iterable[str], base_dir: Path = MODEL_DIR) -> TfidfCorpusModel:
+    """Entraîne un nouveau modèle sur le corpus et le publie pour tous les processus."""
+    global _last_check
+
+    started = time.perf_counter()
+    model = TfidfCorpusModel.fit(texts)
+    model.save(base_dir)
+    _last_check = 0.0  # forcer le rechargement dans ce processus
+    logger.info(
+        "tfidf_model_published",
+        version=model.version,
+        n_docs=model.n_docs,
+        n_features=model.n_features,
+        duration_s=round(time.perf_counter() - started, 2),
+    )
+    return model
@@ -0,0 +1,130 @@
+"""
+Comptes de tokens (forme Counter) des offres et des CV pour keyword_overlap_score.
+
+Le comptage (minuscules + \\w+) est fait une seule fois par texte : persisté
+à côté du texte (cv_texts.token_counts, offers.token_counts) et gardé dans un
+LRU en mémoire. L'overlap devient une somme de minimums sur des comptes
+creux ; la variante batch score une offre contre des milliers de CV avec une
+seule matrice CSR.
+"""
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import settings
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+TokenCounts = Dict[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+
+def count_tokens(text: Optional[str]) -> TokenCounts:
+    """Comptes à persister (dict JSON-sérialisable)."""
+    return dict(Counter(tokenize(text))) if text else {}
+
+
+class _CountsCache:
+    """LRU thread-safe : hash du texte -> comptes."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, TokenCounts]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[TokenCounts]:
+        with self._lock:
+            counts = self._data.get(key)
+            if counts is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return counts
+
+    def put(self, key: str, counts: TokenCounts) -> None:
+        with self._lock:
+            self._data[key] = counts
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_cache = _CountsCache(settings.TOKEN_COUNTS_CACHE_SIZE)
+
+
+def cached_counts(text: Optional[str]) -> TokenCounts:
+    """Comptes d'un texte via le LRU (sha1 du texte, bien plus rapide que la regex)."""
+    if not text:
+        return {}
+    key = hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+    counts = _cache.get(key)
+    if counts is None:
+        counts = count_tokens(text)
+        _cache.put(key, counts)
+    return counts
+
+
+def cache_stats() -> Dict[str, int]:
+    return {"size": len(_cache._data), "hits": _cache.hits, "misses": _cache.misses}
+
+
+def overlap_from_counts(job_counts: TokenCounts, cv_counts: TokenCounts) -> int:
+    """Part (0..100) des tokens de l'offre présents dans le CV, multiplicités comprises."""
+    total_job = sum(job_counts.values())
+    if total_job == 0 or not cv_counts:
+        return 0
+    common = sum(min(j_count, cv_counts.get(word, 0)) for word, j_count in job_counts.items())
+    return max(0, min(math.floor(common / total_job * 100), 100))
+
+
+def overlap_batch(job_counts: TokenCounts, cv_counts_list: Sequence[Optional[TokenCounts]]) -> np.ndarray:
+    """
+    overlap_from_counts pour une offre contre N CV, en un calcul vectorisé :
+    matrice CSR (N x vocabulaire de l'offre) puis min élément par élément.
+    """
+    n = len(cv_counts_list)
+    total_job = sum(job_counts.values())
+    if n == 0 or total_job == 0:
+        return np.zeros(n, dtype=np.int64)
+
+    vocab = {word: i for i, word in enumerate(job_counts)}
+    job_vector = np.fromiter(job_counts.values(), dtype=np.int64, count=len(vocab))
+
+    indptr = [0]
+    indices: List[int] = []
+    data: List[int] = []
+    for counts in cv_counts_list:
+        if counts:
+            # Parcourir le plus petit des deux dictionnaires
+            if len(counts) < len(vocab):
+                pairs = [(vocab[w], c) for w, c in counts.items() if w in vocab]
+            else:
+                pairs = [(i, counts[w]) for w, i in vocab.items() if w in counts]
+            indices.extend(i for i, _ in pairs)
+            data.extend(c for _, c in pairs)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.int64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+        shape=(n, len(vocab)),
+    )
+    matrix.data = np.minimum(matrix.data, job_vector[matrix.indices])
+    common = np.asarray(matrix.sum(axis=1)).ravel()
+    # Même arrondi que overlap_from_counts (floor du pourcentage)
+    return np.clip(np.floor(common / total_job * 100), 0, 100).astype(np.int64)
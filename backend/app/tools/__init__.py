@@ -0,0 +1 @@
+"""Outils en ligne de commande (python -m app.tools.<outil>)."""
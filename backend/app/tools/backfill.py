@@ -0,0 +1,295 @@
+"""
+Retraitement des sorties du pipeline CV produites par une version antérieure
+de l'extracteur, du parser ou du scorer (EXTRACTOR_VERSION, CVParser.VERSION,
+CVScorer.VERSION).
+
+Les lignes obsolètes (version < courante ou NULL) sont lues par les index
+ix_cv_texts_extractor_version / ix_parsed_cvs_*_version, par pages
+(application_id > dernier traité), puis retraitées par chunks en parallèle
+avec l'ingestion groupée (services.bulk_ingestion) : seules les étapes
+obsolètes sont refaites, et leurs conséquences (texte ré-extrait -> parsing
+et score, parsing -> score). Un texte dont la ré-extraction échoue est
+conservé.
+
+Point de reprise : un fichier JSON (BACKFILL_CHECKPOINT_DIR/<étape>.json)
+garde le dernier application_id dont tous les chunks précédents sont
+terminés ; --resume repart de là.
+
+Bridage : priorité CPU abaissée (BACKFILL_NICE), pause entre chunks
+(BACKFILL_PAUSE_SECONDS), et aucun nouveau chunk tant que les files de la
+voie interactive (ou les cv_files UPLOADED en mode claim) dépassent les
+seuils de backlog (cf. services.backlog).
+
+Usage:
+    python -m app.tools.backfill --stage parse --since 2026-01-01
+    python -m app.tools.backfill --stage extract --workers 4 --chunk-size 50
+    python -m app.tools.backfill --stage score --resume
+    python -m app.tools.backfill --stage parse --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import structlog
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.cv_file import CVFile, CVFileStatus
+from app.models.cv_text import CVText
+from app.models.parsed_cv import ParsedCV
+from app.services import backlog, bulk_ingestion
+from app.services.cv_extraction import EXTRACTOR_VERSION
+from app.services.cv_parser import CVParser
+from app.services.cv_scorer import CVScorer
+from app.workers.celery_app import LANE_INTERACTIVE, QUEUE_BULK, queue_lane
+from app.workers.tasks import enqueue_cv_pipeline
+
+logger = structlog.get_logger(__name__)
+
+# étape -> (table, colonne de version, version courante)
+STAGES = {
+    "extract": (CVText, CVText.extractor_version, EXTRACTOR_VERSION),
+    "parse": (ParsedCV, ParsedCV.parser_version, CVParser.VERSION),
+    "score": (ParsedCV, ParsedCV.scorer_version, CVScorer.VERSION),
+}
+
+
+@dataclass
+class Checkpoint:
+    stage: str
+    version: int
+    since: Optional[str]
+    watermark: int = 0  # application_id : toutes les lignes <= sont traitées
+    chunks: int = 0
+    applications: int = 0
+    extracted: int = 0
+    parsed: int = 0
+    scored: int = 0
+    failed: int = 0
+    retried: int = 0
+    skipped: int = 0  # sans cv_file, ou en cours de traitement ailleurs
+
+    def add(self, applications: int, files: int, stats: bulk_ingestion.IngestionStats) -> None:
+        self.chunks += 1
+        self.applications += applications
+        self.extracted += stats.extracted
+        self.parsed += stats.parsed
+        self.scored += stats.scored
+        self.failed += stats.failed
+        self.retried += len(stats.retry_ids)
+        self.skipped += (applications - files) + stats.in_progress
+
+    def save(self, path: Path) -> None:
+        """Écriture atomique (fichier temporaire puis rename)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Checkpoint":
+        return cls(**json.loads(path.read_text()))
+
+
+def _since(value: str) -> datetime:
+    since = datetime.fromisoformat(value)
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+
+def _stale_query(db: Session, stage: str, since: Optional[datetime], after_id: int):
+    model, column, version = STAGES[stage]
+    query = db.query(model.application_id).filter(
+        or_(column.is_(None), column < version),
+        model.application_id > after_id,
+    )
+    if stage == "extract":
+        query = query.filter(CVText.status == "SUCCESS")
+    if since is not None:
+        query = query.filter(model.created_at >= since)
+    return query.order_by(model.application_id)
+
+
+def _cv_file_ids(db: Session, application_ids: List[int]) -> List[int]:
+    """Dernier fichier de chaque candidature (entrée de l'ingestion groupée)."""
+    return sorted(
+        cv_file_id for (cv_file_id,) in db.query(func.max(CVFile.id))
+        .filter(CVFile.application_id.in_(application_ids))
+        .group_by(CVFile.application_id)
+    )
+
+
+def _live_traffic_backlogged(db: Session) -> bool:
+    if settings.CV_PROCESSING_MODE == "claim":
+        uploaded = (
+            db.query(func.count(CVFile.id))
+            .filter(CVFile.status == CVFileStatus.UPLOADED.value)
+            .scalar()
+        )
+        return (uploaded or 0) > settings.BACKLOG_MAX_DEPTH
+    try:
+        queues = backlog.queue_backlog(max_age=0)
+    except Exception as e:
+        logger.warning("backfill_backlog_unavailable", error=repr(e))
+        return False
+    return any(q.overloaded for q in queues.values() if queue_lane(q.name) == LANE_INTERACTIVE)
+
+
+def _wait_for_live_traffic(db: Session, throttle_seconds: float) -> None:
+    while _live_traffic_backlogged(db):
+        logger.info("backfill_throttled", wait_s=throttle_seconds)
+        time.sleep(throttle_seconds)
+
+
+def _process_chunk(application_ids: List[int], pause: float) -> tuple:
+    db = SessionLocal()
+    try:
+        cv_file_ids = _cv_file_ids(db, application_ids)
+        if cv_file_ids:
+            stats = bulk_ingestion.ingest_cv_files(db, cv_file_ids, lane="backfill")
+        else:
+            stats = bulk_ingestion.IngestionStats()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    # Erreurs transitoires : chaîne unitaire sur la voie bulk (claim : reprises en base)
+    for cv_file_id in stats.retry_ids:
+        enqueue_cv_pipeline(cv_file_id, queue=QUEUE_BULK)
+    time.sleep(pause)
+    return len(cv_file_ids), stats
+
+
+def run(
+    checkpoint: Checkpoint,
+    checkpoint_path: Path,
+    since: Optional[datetime],
+    chunk_size: int,
+    workers: int,
+    pause: float,
+    throttle_seconds: float,
+) -> bool:
+    """Retraite les lignes obsolètes ; False si un chunk a échoué (reprise possible)."""
+    in_flight: deque = deque()  # (dernier application_id du chunk, taille, future), dans l'ordre
+    failed = False
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            after_id = checkpoint.watermark
+            exhausted = False
+            while not exhausted or in_flight:
+                while not exhausted and not failed and len(in_flight) < workers:
+                    _wait_for_live_traffic(db, throttle_seconds)
+                    application_ids = [
+                        application_id for (application_id,) in
+                        _stale_query(db, checkpoint.stage, since, after_id).limit(chunk_size)
+                    ]
+                    db.rollback()  # pas de transaction ouverte entre deux pages
+                    if not application_ids:
+                        exhausted = True
+                        break
+                    after_id = application_ids[-1]
+                    in_flight.append((after_id, len(application_ids), pool.submit(_process_chunk, application_ids, pause)))
+                if not in_flight:
+                    break
+                if failed:
+                    exhausted = True  # plus de nouveaux chunks, on attend ceux en cours
+
+                wait([future for _, _, future in in_flight], return_when=FIRST_COMPLETED)
+                # Le point de reprise n'avance que sur les chunks terminés dans l'ordre
+                while in_flight and in_flight[0][2].done():
+                    last_id, size, future = in_flight.popleft()
+                    try:
+                        files, stats = future.result()
+                    except Exception as e:
+                        logger.error("backfill_chunk_error", after_id=last_id, error=repr(e), error_type=type(e).__name__)
+                        failed = True
+                        continue
+                    if failed:
+                        continue
+                    checkpoint.add(size, files, stats)
+                    checkpoint.watermark = last_id
+                    checkpoint.save(checkpoint_path)
+                    logger.info(
+                        "backfill_chunk_done",
+                        stage=checkpoint.stage,
+                        watermark=last_id,
+                        applications=checkpoint.applications,
+                        failed=checkpoint.failed,
+                    )
+    finally:
+        db.close()
+    return not failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retraitement des sorties obsolètes du pipeline CV")
+    parser.add_argument("--stage", choices=sorted(STAGES), required=True)
+    parser.add_argument("--since", type=_since, default=None, help="lignes créées depuis (ISO 8601)")
+    parser.add_argument("--chunk-size", type=int, default=settings.BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.BACKFILL_WORKERS)
+    parser.add_argument("--pause", type=float, default=settings.BACKFILL_PAUSE_SECONDS)
+    parser.add_argument("--throttle", type=float, default=settings.BACKFILL_THROTTLE_SECONDS)
+    parser.add_argument("--checkpoint", type=Path, default=None, help="fichier de reprise")
+    parser.add_argument("--resume", action="store_true", help="reprendre au point de reprise")
+    parser.add_argument("--dry-run", action="store_true", help="compter les lignes obsolètes seulement")
+    args = parser.parse_args()
+
+    _, _, version = STAGES[args.stage]
+    since = args.since.isoformat() if args.since else None
+
+    if args.dry_run:
+        db = SessionLocal()
+        try:
+            stale = _stale_query(db, args.stage, args.since, 0).order_by(None).count()
+        finally:
+            db.close()
+        print(f"{args.stage}: {stale} lignes obsolètes (version courante {version})")
+        return
+
+    checkpoint_path = args.checkpoint or Path(settings.BACKFILL_CHECKPOINT_DIR) / f"{args.stage}.json"
+    checkpoint = Checkpoint(stage=args.stage, version=version, since=since)
+    if args.resume and checkpoint_path.exists():
+        saved = Checkpoint.load(checkpoint_path)
+        if (saved.stage, saved.version, saved.since) != (args.stage, version, since):
+            parser.error(
+                f"Point de reprise {checkpoint_path} pour {saved.stage} v{saved.version} "
+                f"(since={saved.since}) : incompatible"
+            )
+        checkpoint = saved
+        logger.info("backfill_resume", stage=args.stage, watermark=checkpoint.watermark)
+
+    if settings.BACKFILL_NICE and hasattr(os, "nice"):
+        os.nice(settings.BACKFILL_NICE)
+
+    started = time.perf_counter()
+    ok = run(
+        checkpoint,
+        checkpoint_path,
+        args.since,
+        max(1, args.chunk_size),
+        max(1, args.workers),
+        args.pause,
+        args.throttle,
+    )
+    logger.info(
+        "backfill_finished" if ok else "backfill_interrupted",
+        duration_s=round(time.perf_counter() - started, 1),
+        **asdict(checkpoint),
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark de l'index ANN (IVF) contre la recherche exacte : rappel@k et latence.
+
+Usage:
+    python -m app.tools.bench_ann --source random --n 50000 --dim 384
+    python -m app.tools.bench_ann --source db
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.ann_index import IVFIndex
+
+
+def _random_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Mélange de gaussiennes : plus proche d'un vrai corpus qu'un bruit uniforme
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 500), dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def _db_vectors():
+    from app.db.session import SessionLocal
+    from app.models.embedding import EmbeddingOwner, TextEmbedding
+    from app.services import embedding_store, embeddings
+
+    db = SessionLocal()
+    try:
+        rows = db.query(TextEmbedding.owner_id, TextEmbedding.vector).filter(
+            TextEmbedding.owner_type == EmbeddingOwner.CV,
+            TextEmbedding.model_version == embeddings.embedding_version(),
+        ).all()
+    finally:
+        db.close()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    return ids, np.stack([embedding_store.from_bytes(r[1]) for r in rows])
+
+
+def _exact(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rappel / latence IVF vs recherche exacte")
+    parser.add_argument("--source", choices=["random", "db"], default="random")
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    if args.source == "db":
+        ids, vectors = _db_vectors()
+    else:
+        vectors = _random_vectors(args.n, args.dim)
+        ids = np.arange(len(vectors), dtype=np.int64)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    started = time.perf_counter()
+    truth = [set(ids[_exact(vectors, q, args.k)].tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"N={len(vectors)} dim={vectors.shape[1]} k={args.k}")
+    print(f"exact            : {exact_ms:7.3f} ms/query  mem={vectors.nbytes / 2**20:7.1f} MiB")
+
+    for quantize in (False, True):
+        started = time.perf_counter()
+        index = IVFIndex.build(ids, vectors, quantize=quantize)
+        build_s = time.perf_counter() - started
+        mem = sum(c.nbytes for c in index.list_codes) / 2**20
+        label = "ivf-sq8" if quantize else "ivf-flat"
+        print(f"{label} (n_lists={index.n_lists}, build {build_s:.1f}s, mem={mem:.1f} MiB)")
+        for n_probe in args.n_probe:
+            started = time.perf_counter()
+            found = [index.search(q, k=args.k, n_probe=n_probe) for q in queries]
+            ms = (time.perf_counter() - started) * 1000 / len(queries)
+            recall = np.mean([
+                len(truth[i] & {hit for hit, _ in found[i]}) / args.k for i in range(len(queries))
+            ])
+            print(f"  n_probe={n_probe:<4d}: {ms:7.3f} ms/query  recall@{args.k}={recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
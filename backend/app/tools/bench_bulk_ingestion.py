@@ -0,0 +1,103 @@
+"""
+Benchmark de l'ingestion en masse : chaîne unitaire (extract_cv_file ->
+parse_cv -> score_cv, un CV à la fois) contre ingest_cv_files par chunks.
+
+Les deux modes tournent en local (sans broker) sur les cv_files d'une offre.
+À lancer sur une base de dev : avant chaque mode, les fichiers sont remis à
+UPLOADED et leurs sorties (parsing, scores, embeddings) invalidées.
+
+Usage:
+    python -m app.tools.bench_bulk_ingestion --offer-id 12
+    python -m app.tools.bench_bulk_ingestion --offer-id 12 --limit 500 --chunk-size 100
+"""
+import argparse
+import time
+from typing import List
+
+from sqlalchemy import delete, update
+
+from app.db.session import SessionLocal
+from app.models.application import Application
+from app.models.application_score import ApplicationScoreResult
+from app.models.cv_file import CVFile, CVFileStatus
+from app.models.cv_text import CVText
+from app.models.embedding import EmbeddingOwner, TextEmbedding
+from app.models.parsed_cv import ParsedCV
+from app.services import bulk_ingestion
+from app.workers.tasks import extract_cv_file, parse_cv, score_cv
+
+
+def _reset(cv_file_ids: List[int], application_ids: List[int]) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(CVFile).where(CVFile.id.in_(cv_file_ids)).values(
+            status=CVFileStatus.UPLOADED.value, error_message=None
+        ))
+        db.execute(update(CVText).where(CVText.application_id.in_(application_ids)).values(status="PENDING"))
+        db.execute(update(ParsedCV).where(ParsedCV.application_id.in_(application_ids)).values(
+            source_hash=None, score_inputs_hash=None
+        ))
+        db.execute(delete(ApplicationScoreResult).where(ApplicationScoreResult.application_id.in_(application_ids)))
+        db.execute(delete(TextEmbedding).where(
+            TextEmbedding.owner_type == EmbeddingOwner.CV, TextEmbedding.owner_id.in_(application_ids)
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingestion : chaîne unitaire vs batch")
+    parser.add_argument("--offer-id", type=int, required=True)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int)
+    parser.add_argument("--extract-workers", type=int)
+    parser.add_argument("--skip-per-file", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(CVFile.id, CVFile.application_id)
+            .join(Application, Application.id == CVFile.application_id)
+            .filter(Application.offer_id == args.offer_id)
+            .order_by(CVFile.id)
+            .limit(args.limit)
+            .all()
+        )
+    finally:
+        db.close()
+    cv_file_ids = [r.id for r in rows]
+    application_ids = [r.application_id for r in rows]
+    if not cv_file_ids:
+        parser.error(f"Aucun cv_file pour l'offre {args.offer_id}")
+    print(f"N={len(cv_file_ids)} cv_files")
+
+    if not args.skip_per_file:
+        _reset(cv_file_ids, application_ids)
+        started = time.perf_counter()
+        for cv_file_id in cv_file_ids:
+            application_id = extract_cv_file.apply(args=[cv_file_id]).get()
+            application_id = parse_cv.apply(args=[application_id]).get()
+            score_cv.apply(args=[application_id]).get()
+        elapsed = time.perf_counter() - started
+        print(f"chaîne unitaire : {elapsed * 1000:9.1f} ms  ({len(cv_file_ids) / elapsed:.1f} CV/s)")
+
+    _reset(cv_file_ids, application_ids)
+    totals = bulk_ingestion.IngestionStats()
+    started = time.perf_counter()
+    for chunk in bulk_ingestion.chunks(cv_file_ids, args.chunk_size):
+        db = SessionLocal()
+        try:
+            totals.merge(bulk_ingestion.ingest_cv_files(db, chunk, extract_workers=args.extract_workers))
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"batch           : {elapsed * 1000:9.1f} ms  ({len(cv_file_ids) / elapsed:.1f} CV/s)  "
+        f"étapes={totals.timings_ms}  extraits={totals.extracted} échecs={totals.failed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Débit d'encodage du sidecar sous concurrence (micro-batching dynamique).
+
+Simule N workers qui encodent chacun 1 à 2 textes par requête, comme le
+scoring, et mesure le débit global. Avec --local, compare à un modèle chargé
+dans ce processus et appelé texte par texte.
+
+Usage:
+    python -m app.tools.bench_embedding_server --socket /run/ats/embeddings.sock \
+        --concurrency 1 4 16 --requests 200
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services.embedding_server import EmbeddingServerClient
+from app.tools.bench_embeddings import _synthetic_docs
+
+
+def _run(client, texts, concurrency: int, requests: int) -> float:
+    def worker(i: int) -> None:
+        for j in range(requests):
+            k = (i * requests + j) % len(texts)
+            client.encode(texts[k:k + 2], normalize_embeddings=True)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return concurrency * requests * 2 / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Débit du sidecar d'embeddings")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "/run/ats/embeddings.sock")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=50, help="Requêtes par worker simulé")
+    parser.add_argument("--local", action="store_true", help="Référence: modèle local, 1 appel par requête")
+    args = parser.parse_args()
+
+    texts = [line for doc in _synthetic_docs(50) for line in doc.split("\n") if len(line) > 20]
+    client = EmbeddingServerClient(args.socket)
+    print(f"serveur: {client.info()}")
+
+    if args.local:
+        from app.services.embeddings import EmbeddingModelRegistry
+        local = EmbeddingModelRegistry(settings.SBERT_MODEL_NAME, backend=settings.SBERT_BACKEND).get()
+        print(f"local, séquentiel      : {_run(local, texts, 1, args.requests):8.1f} textes/s")
+
+    for concurrency in args.concurrency:
+        rate = _run(client, texts, concurrency, args.requests)
+        print(f"sidecar, {concurrency:3d} clients   : {rate:8.1f} textes/s")
+    print(f"serveur: {client.info()}")
+
+
+if __name__ == "__main__":
+    main()
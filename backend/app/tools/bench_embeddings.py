@@ -0,0 +1,100 @@
+"""
+Benchmark CPU de l'encodage SBERT des documents.
+
+Compare l'encodage historique (un appel par texte, tronqué à max_seq_length)
+à l'encodage par fenêtres batché (toutes les fenêtres en un appel).
+
+Usage:
+    python -m app.tools.bench_embeddings --source synthetic --docs 200
+    python -m app.tools.bench_embeddings --source db --docs 500
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from app.services import embeddings
+from app.services.chunking import chunk_text
+
+_SYNTHETIC_LINES = [
+    "Développeur Python senior, 6 ans d'expérience sur des API FastAPI et Django.",
+    "Mise en place de pipelines CI/CD GitLab et déploiement Kubernetes sur AWS.",
+    "Conception de modèles de machine learning avec scikit-learn et PyTorch.",
+    "Encadrement d'une équipe de quatre développeurs, revues de code et mentorat.",
+    "Optimisation de requêtes PostgreSQL et mise en cache Redis.",
+    "Master Informatique, Université de Lyon, spécialité données.",
+    "Anglais courant (C1), espagnol intermédiaire.",
+]
+_SECTIONS = ["Expérience professionnelle", "Formation", "Compétences", "Langues", "Projets"]
+
+
+def _synthetic_docs(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        parts = ["Jean Dupont\njean.dupont@example.com"]
+        for section in _SECTIONS:
+            lines = [f"- {rng.choice(_SYNTHETIC_LINES)}" for _ in range(rng.randint(3, 8))]
+            parts.append(section + "\n" + "\n".join(lines))
+        docs.append("\n\n".join(parts))
+    return docs
+
+
+def _db_docs(n: int) -> List[str]:
+    from app.db.session import SessionLocal
+    from app.models.cv_text import CVText
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(CVText.extracted_text)
+            .filter(CVText.status == "SUCCESS", CVText.extracted_text.isnot(None))
+            .limit(n)
+            .all()
+        )
+    finally:
+        db.close()
+    return [text for (text,) in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Débit CPU de l'encodage SBERT")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--batch-docs", type=int, default=32, help="Documents par appel batché")
+    args = parser.parse_args()
+
+    docs = _db_docs(args.docs) if args.source == "db" else _synthetic_docs(args.docs)
+    model = embeddings.get_sbert_model()
+    if model is None:
+        raise SystemExit(f"Modèle indisponible: {embeddings.registry.stats()}")
+    print(f"registry: {embeddings.registry.stats()}")
+
+    window = embeddings._window_tokens(model)
+    count = embeddings._token_counter(model)
+    total_tokens = sum(count(docs))
+    chunks = [chunk_text(d, window, count) for d in docs]
+    n_chunks = sum(len(c) for c in chunks)
+    print(
+        f"{len(docs)} docs, {total_tokens / len(docs):.0f} tokens/doc, "
+        f"{n_chunks / len(docs):.1f} fenêtres/doc (fenêtre={window} tokens)"
+    )
+
+    embeddings.encode_texts(docs[:2])  # warm-up
+
+    started = time.perf_counter()
+    for doc in docs:
+        embeddings.encode_texts([doc])
+    elapsed = time.perf_counter() - started
+    covered = sum(min(n, window) for n in count(docs)) / total_tokens
+    print(f"tronqué, 1 appel/doc  : {len(docs) / elapsed:7.1f} docs/s  (tokens vus: {covered:.0%})")
+
+    started = time.perf_counter()
+    for i in range(0, len(docs), args.batch_docs):
+        embeddings.encode_documents(docs[i:i + args.batch_docs])
+    elapsed = time.perf_counter() - started
+    print(f"fenêtres, batché      : {len(docs) / elapsed:7.1f} docs/s  (tokens vus: 100%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Vérification des voies de priorité sous charge : un flot de chaînes sur la
+voie bulk (cv_bulk) pendant des uploads interactifs, puis latences par voie
+publiées par les workers (histogrammes lane.<voie>.queue_wait / end_to_end).
+
+Nécessite le broker et les workers de docker-compose (worker_extract,
+worker_parse, worker, worker_bulk). Les histogrammes des workers sont
+cumulés depuis leur démarrage : redémarrer les workers avant une mesure.
+
+Usage:
+    python -m app.tools.bench_lanes --offer-id 12 --bulk 2000 --interactive 50
+"""
+import argparse
+import time
+
+from app.core import timing
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.application import Application
+from app.models.cv_file import CVFile
+from app.workers.celery_app import QUEUE_BULK
+from app.workers.tasks import enqueue_cv_pipeline
+
+
+def _lane_histograms():
+    merged = {}
+    for histograms in timing.collect_published(settings.CELERY_BROKER_URL).values():
+        for stage, h in histograms.items():
+            if not stage.startswith("lane."):
+                continue
+            if stage in merged:
+                merged[stage].merge(h)
+            else:
+                merged[stage] = h
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latence par voie sous un flot bulk")
+    parser.add_argument("--offer-id", type=int, required=True)
+    parser.add_argument("--bulk", type=int, default=1000, help="chaînes envoyées sur la voie bulk")
+    parser.add_argument("--interactive", type=int, default=50, help="uploads interactifs simulés")
+    parser.add_argument("--interval", type=float, default=0.5, help="secondes entre deux uploads interactifs")
+    parser.add_argument("--wait", type=float, default=60.0, help="attente finale avant lecture des métriques")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cv_file_ids = [
+            cv_file_id for (cv_file_id,) in db.query(CVFile.id)
+            .join(Application, Application.id == CVFile.application_id)
+            .filter(Application.offer_id == args.offer_id)
+            .order_by(CVFile.id)
+        ]
+    finally:
+        db.close()
+    if not cv_file_ids:
+        parser.error(f"Aucun cv_file pour l'offre {args.offer_id}")
+
+    for i in range(args.bulk):
+        enqueue_cv_pipeline(cv_file_ids[i % len(cv_file_ids)], queue=QUEUE_BULK)
+    print(f"{args.bulk} chaînes envoyées sur {QUEUE_BULK}")
+
+    for i in range(args.interactive):
+        enqueue_cv_pipeline(cv_file_ids[i % len(cv_file_ids)])
+        time.sleep(args.interval)
+    print(f"{args.interactive} chaînes interactives envoyées, attente {args.wait:.0f} s")
+    time.sleep(args.wait + 2 * settings.TIMING_REPORT_INTERVAL_SECONDS)
+
+    for stage, summary in timing.summaries(_lane_histograms()).items():
+        print(
+            f"{stage:32s} n={summary['count']:6d}  p50={summary['p50_ms']} ms  "
+            f"p95={summary['p95_ms']} ms  max={summary['max_ms']} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark du classement d'une offre (GET /offers/{id}/ranking) : calcul par
+ligne (combined_score appelé une fois par candidature) contre le calcul en
+une passe de app.services.ranking.
+
+Usage:
+    python -m app.tools.bench_offer_ranking --docs 1000
+    python -m app.tools.bench_offer_ranking --source db --offer-id 12
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from app.services import embeddings
+from app.services.ranking import RankingCandidate, load_candidates, rank_candidates
+from app.services.scoring import combined_score
+from app.tools.bench_embeddings import _synthetic_docs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classement d'une offre : par ligne vs une passe")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--offer-id", type=int)
+    parser.add_argument("--job-text", default=(
+        "Développeur Python senior FastAPI, PostgreSQL, Redis, déploiement Kubernetes sur AWS."
+    ))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-per-row", action="store_true")
+    args = parser.parse_args()
+
+    job_text = args.job_text
+    load_ms = 0.0
+    if args.source == "db":
+        if args.offer_id is None:
+            parser.error("--offer-id est requis avec --source db")
+        from app.db.session import SessionLocal
+        from app.models.offer import Offer
+
+        db = SessionLocal()
+        try:
+            job_text = db.get(Offer, args.offer_id).description or ""
+            started = time.perf_counter()
+            candidates = load_candidates(db, args.offer_id)
+            load_ms = (time.perf_counter() - started) * 1000
+        finally:
+            db.close()
+    else:
+        texts = _synthetic_docs(args.docs)
+        vectors = embeddings.encode_documents(texts)
+        candidates = [
+            RankingCandidate(
+                application_id=i,
+                cv_text=text,
+                quality_score=0.8,
+                cv_vector=None if vectors is None else vectors[i],
+            )
+            for i, text in enumerate(texts)
+        ]
+
+    job_vectors = embeddings.encode_documents([job_text])
+    job_vector = None if job_vectors is None else job_vectors[0]
+    stored = sum(c.cv_vector is not None for c in candidates)
+    print(f"N={len(candidates)}  vecteurs stockés={stored}  chargement db={load_ms:.1f} ms")
+
+    if not args.skip_per_row:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for c in candidates:
+                combined_score(
+                    job_text, c.cv_text, c.quality_score,
+                    job_vector=job_vector, cv_vector=c.cv_vector,
+                )
+        print(f"par ligne : {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = rank_candidates(job_text, candidates, shortlist_k=0, job_vector=job_vector)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"une passe : {min(timings):9.1f} ms (min sur {args.repeat})  "
+        f"étapes={result.timings_ms}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Parité et performance du backend ONNX int8 face au backend torch.
+
+- Parité : cosinus entre les vecteurs des deux backends sur les mêmes textes
+  (code de sortie 1 si le minimum passe sous --min-cosine)
+- Performance : latence par batch et RSS ajouté par le chargement de chaque backend
+
+Usage:
+    python -m app.tools.bench_onnx --docs 200 --threads 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import EmbeddingModelRegistry, current_rss_mb
+from app.tools.bench_embeddings import _db_docs, _synthetic_docs
+
+
+def _load(backend: str, threads: int) -> EmbeddingModelRegistry:
+    registry = EmbeddingModelRegistry(
+        settings.SBERT_MODEL_NAME,
+        torch_threads=threads,
+        backend=backend,
+        onnx_dir=settings.SBERT_ONNX_DIR,
+        onnx_threads=threads,
+    )
+    if registry.get() is None:
+        raise SystemExit(f"Backend {backend} indisponible: {registry.stats()}")
+    return registry
+
+
+def _time_encode(model, texts, batch_size: int, repeat: int = 3):
+    model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        vectors = model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+        best = min(best, time.perf_counter() - started)
+    return np.asarray(vectors, dtype=np.float32), best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parité/latence ONNX int8 vs torch")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    docs = _db_docs(args.docs) if args.source == "db" else _synthetic_docs(args.docs)
+
+    results = {}
+    for backend in ("onnx", "torch"):
+        rss_before = current_rss_mb()
+        registry = _load(backend, args.threads)
+        rss_delta = current_rss_mb() - rss_before
+        vectors, seconds = _time_encode(registry.get(), docs, args.batch_size)
+        results[backend] = vectors
+        print(
+            f"{backend:5s}: {1000 * seconds / len(docs) * args.batch_size:8.1f} ms/batch({args.batch_size})  "
+            f"{len(docs) / seconds:7.1f} textes/s  RSS +{rss_delta:.0f} Mo  "
+            f"(chargement {registry.stats().get('load_seconds')}s)"
+        )
+
+    cosines = np.sum(results["onnx"] * results["torch"], axis=1)
+    print(
+        f"parité cosinus: moyenne={cosines.mean():.4f} p5={np.percentile(cosines, 5):.4f} "
+        f"min={cosines.min():.4f} (seuil {args.min_cosine})"
+    )
+    if cosines.min() < args.min_cosine:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
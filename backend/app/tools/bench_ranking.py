@@ -0,0 +1,73 @@
+"""
+Benchmark du classement en deux étapes contre le pipeline complet (SBERT sur
+tous les CV) : latence et accord des classements (recouvrement top-k, tau).
+
+Usage:
+    python -m app.tools.bench_ranking --source synthetic --docs 1000 --k 20 50 100
+    python -m app.tools.bench_ranking --source db --offer-id 12
+"""
+import argparse
+import time
+
+from app.services.ranking import RankingCandidate, load_candidates, rank_candidates, ranking_agreement
+from app.tools.bench_embeddings import _synthetic_docs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classement deux étapes vs pipeline complet")
+    parser.add_argument("--source", choices=["synthetic", "db"], default="synthetic")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--offer-id", type=int)
+    parser.add_argument("--job-text", default=(
+        "Développeur Python senior FastAPI, PostgreSQL, Redis, déploiement Kubernetes sur AWS."
+    ))
+    parser.add_argument("--k", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--top", type=int, default=10, help="k de l'accord top-k")
+    parser.add_argument("--budget-ms", type=float, default=0.0)
+    parser.add_argument("--stored-vectors", action="store_true",
+                        help="source db : utiliser les embeddings stockés (sinon encodage à la volée)")
+    args = parser.parse_args()
+
+    job_text = args.job_text
+    if args.source == "db":
+        if args.offer_id is None:
+            parser.error("--offer-id est requis avec --source db")
+        from app.db.session import SessionLocal
+        from app.models.offer import Offer
+
+        db = SessionLocal()
+        try:
+            job_text = db.get(Offer, args.offer_id).description or ""
+            candidates = load_candidates(db, args.offer_id)
+        finally:
+            db.close()
+        if not args.stored_vectors:
+            for c in candidates:
+                c.cv_vector = None
+    else:
+        candidates = [
+            RankingCandidate(application_id=i, cv_text=text)
+            for i, text in enumerate(_synthetic_docs(args.docs))
+        ]
+
+    started = time.perf_counter()
+    full = rank_candidates(job_text, candidates, shortlist_k=0, semantic_budget_ms=0)
+    full_ms = (time.perf_counter() - started) * 1000
+    reference = [r.application_id for r in full.ranked]
+    print(f"N={len(candidates)}  complet: {full_ms:9.1f} ms  (sbert sur {full.semantic_scored})")
+
+    for k in args.k:
+        started = time.perf_counter()
+        result = rank_candidates(job_text, candidates, shortlist_k=k, semantic_budget_ms=args.budget_ms)
+        elapsed = (time.perf_counter() - started) * 1000
+        agreement = ranking_agreement(reference, [r.application_id for r in result.ranked], args.top)
+        print(
+            f"K={k:<5d} {elapsed:9.1f} ms  x{full_ms / max(elapsed, 1e-6):5.1f}  "
+            f"sbert={result.semantic_scored:<5d} "
+            f"overlap@{args.top}={agreement['overlap_at_k']:.3f}  tau={agreement['kendall_tau']:.3f}"
+            + ("  (budget épuisé)" if result.budget_exhausted else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
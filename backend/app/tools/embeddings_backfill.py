@@ -0,0 +1,78 @@
+"""
+Calcule les embeddings manquants ou obsolètes (texte ou modèle changé).
+
+Usage:
+    python -m app.tools.embeddings_backfill [--kind cv|offer|all] [--batch-size 64] [--force]
+"""
+import argparse
+import time
+
+import structlog
+
+from app.db.session import SessionLocal
+from app.models.cv_text import CVText
+from app.models.embedding import EmbeddingOwner
+from app.models.offer import Offer
+from app.services import embedding_store
+
+logger = structlog.get_logger(__name__)
+
+
+def _backfill(kind: str, query, batch_size: int, force: bool) -> int:
+    """Parcours par clé (id > dernier id) : chaque lot est commité indépendamment."""
+    total = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = query(db, last_id).limit(batch_size).all()
+            if not batch:
+                break
+            embedding_store.ensure_embeddings(db, kind, batch, force=force)
+            db.commit()
+            total += len(batch)
+            last_id = batch[-1][0]
+    finally:
+        db.close()
+    return total
+
+
+def _cv_query(db, after_id: int):
+    return (
+        db.query(CVText.application_id, CVText.extracted_text)
+        .filter(
+            CVText.status == "SUCCESS",
+            CVText.extracted_text.isnot(None),
+            CVText.application_id > after_id,
+        )
+        .order_by(CVText.application_id)
+    )
+
+
+def _offer_query(db, after_id: int):
+    return (
+        db.query(Offer.id, Offer.description)
+        .filter(Offer.deleted == False, Offer.id > after_id)  # noqa: E712
+        .order_by(Offer.id)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill des embeddings SBERT (CV et offres)")
+    parser.add_argument("--kind", choices=["cv", "offer", "all"], default="all")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--force", action="store_true", help="Ré-encoder même si le hash est identique")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.kind in ("offer", "all"):
+        n = _backfill(EmbeddingOwner.OFFER, _offer_query, args.batch_size, args.force)
+        logger.info("embeddings_backfill_done", kind="offer", processed=n)
+    if args.kind in ("cv", "all"):
+        n = _backfill(EmbeddingOwner.CV, _cv_query, args.batch_size, args.force)
+        logger.info("embeddings_backfill_done", kind="cv", processed=n)
+    logger.info("embeddings_backfill_finished", duration_s=round(time.perf_counter() - started, 1))
+
+
+if __name__ == "__main__":
+    main()
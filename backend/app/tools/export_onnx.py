@@ -0,0 +1,85 @@
+"""
+Exporte le modèle SBERT en ONNX puis le quantifie dynamiquement en int8.
+
+Nécessite torch + sentence-transformers + onnxruntime (à lancer une fois,
+ex. dans une étape de build) ; l'inférence n'a ensuite besoin que de
+onnxruntime et tokenizers.
+
+Usage:
+    python -m app.tools.export_onnx [--output /app/data/models/onnx/<modèle>]
+"""
+import argparse
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.onnx_encoder import CONFIG_FILE, MODEL_FILE, TOKENIZER_FILE
+
+
+def default_output_dir() -> Path:
+    from app.services.embeddings import registry
+    return Path(registry.onnx_dir)
+
+
+def export(model_name: str, output: Path, opset: int = 14) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    output.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    auto_model = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    class _TokenEmbeddings(torch.nn.Module):
+        # Sortie tensorielle simple (pas de ModelOutput) pour l'export
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    transformer = _TokenEmbeddings(auto_model)
+
+    sample = tokenizer(["exemple de texte"], return_tensors="pt")
+    inputs = ("input_ids", "attention_mask")
+    fp32_path = output / "model_fp32.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in inputs),
+            str(fp32_path),
+            input_names=list(inputs),
+            output_names=["token_embeddings"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "token_embeddings": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+        )
+
+    quantize_dynamic(str(fp32_path), str(output / MODEL_FILE), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+
+    tokenizer.backend_tokenizer.save(str(output / TOKENIZER_FILE))
+    (output / CONFIG_FILE).write_text(json.dumps({
+        "model_name": model_name,
+        "max_seq_length": st_model.max_seq_length,
+        "pad_token_id": tokenizer.pad_token_id,
+        "pooling": "mean",
+    }))
+    print(f"ONNX int8 exporté dans {output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export ONNX int8 du modèle SBERT")
+    parser.add_argument("--model", default=settings.SBERT_MODEL_NAME)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    export(args.model, args.output or default_output_dir())
+
+
+if __name__ == "__main__":
+    main()
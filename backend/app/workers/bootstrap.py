@@ -0,0 +1,203 @@
+"""
+Démarrage des workers Celery (pool prefork).
+
+- Processus parent (signal worker_init, avant le fork des enfants) : chargement
+  des modèles utilisés par les tâches des files consommées (-Q, cf.
+  QUEUE_MODELS) parmi spaCy, SBERT (backend torch) et TF-IDF, puis
+  gc.freeze() pour que le GC ne réécrive pas les pages des objets chargés.
+  Un worker cv_extract ne charge rien, un worker cv_parse spaCy seulement.
+  Les enfants héritent des poids en copy-on-write, y compris ceux recréés par
+  --max-tasks-per-child.
+- Chaque enfant (worker_process_init) : inférence de chauffe (pools de threads
+  torch, caches spaCy), puis suivi de la latence de sa première tâche et de
+  sa mémoire (RSS / PSS / privée) dans les logs et les histogrammes de timing.
+
+ONNX Runtime et le client du sidecar d'embeddings ne sont pas fork-safe
+(pools de threads, socket) : dans ces modes le modèle reste chargé par enfant.
+"""
+import gc
+import os
+import time
+from typing import Dict, FrozenSet, Iterable, Optional
+
+import structlog
+
+from app.core import timing
+from app.core.config import settings
+from app.workers.celery_app import QUEUE_BULK, QUEUE_DEFAULT, QUEUE_EXTRACT, QUEUE_PARSE, QUEUE_SCORE
+
+logger = structlog.get_logger(__name__)
+
+_WARMUP_TEXT = (
+    "Jean Dupont\nDéveloppeur Python\nCompétences\nPython, FastAPI, PostgreSQL\n"
+    "Expérience professionnelle\n5 ans d'expérience\nLangues\nFrançais, Anglais"
+)
+
+
+SPACY = "spacy"
+SBERT = "sbert"
+TFIDF = "tfidf"
+ALL_MODELS: FrozenSet[str] = frozenset({SPACY, SBERT, TFIDF})
+
+# Modèles utilisés par les tâches de chaque file (une file inconnue : tous)
+QUEUE_MODELS: Dict[str, FrozenSet[str]] = {
+    QUEUE_EXTRACT: frozenset(),
+    QUEUE_PARSE: frozenset({SPACY}),
+    QUEUE_SCORE: frozenset({SBERT, TFIDF}),
+    QUEUE_BULK: ALL_MODELS,
+    QUEUE_DEFAULT: frozenset({SBERT, TFIDF}),  # embed_offer, refit_tfidf_model, ...
+}
+
+
+class _ChildState:
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.task_started: Optional[float] = None
+        self.tasks_done = 0
+
+
+_child = _ChildState()
+# Modèles de ce worker, fixés par preload_models dans le parent (hérités au fork)
+_models: FrozenSet[str] = ALL_MODELS
+
+
+def models_for_queues(queues: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """Modèles utiles aux files consommées ; tous si elles ne sont pas connues (claim worker)."""
+    if queues is None:
+        return ALL_MODELS
+    needed = set()
+    for queue in queues:
+        needed |= QUEUE_MODELS.get(queue, ALL_MODELS)
+    return frozenset(needed)
+
+
+def memory_stats() -> Dict[str, float]:
+    """
+    Mémoire du processus en Mo. PSS et privée (smaps_rollup, Linux) montrent
+    la part réellement partagée avec le parent ; à défaut, RSS seul.
+    """
+    from app.services.embeddings import current_rss_mb
+
+    stats = {"rss_mb": round(current_rss_mb(), 1)}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        kb = lambda name: int(fields[name].split()[0])
+        stats["pss_mb"] = round(kb("Pss") / 1024, 1)
+        stats["private_mb"] = round((kb("Private_Clean") + kb("Private_Dirty")) / 1024, 1)
+        stats["shared_mb"] = round((kb("Shared_Clean") + kb("Shared_Dirty")) / 1024, 1)
+    except (OSError, KeyError, ValueError):
+        pass
+    return stats
+
+
+def _sbert_fork_safe() -> bool:
+    return settings.SBERT_BACKEND == "torch" and not settings.EMBEDDING_SERVER_SOCKET
+
+
+def preload_models(queues: Optional[Iterable[str]] = None) -> None:
+    """
+    Charge les modèles des files `queues` (None : tous) dans le processus
+    parent, avant le fork des enfants.
+    """
+    global _models
+    queues = list(queues) if queues is not None else None
+    _models = models_for_queues(queues)
+    if not settings.WORKER_PRELOAD_MODELS:
+        return
+    started = time.perf_counter()
+    loaded = []
+
+    if SPACY in _models:
+        try:
+            # spaCy est chargé à l'import ; un parse complète les tables paresseuses
+            from app.services.cv_parser import CVParser
+            CVParser().parse(_WARMUP_TEXT)
+            loaded.append(SPACY)
+        except Exception as e:
+            logger.warning("preload_spacy_failed", error=repr(e))
+
+    if SBERT in _models and _sbert_fork_safe():
+        # Chargement seul : une inférence démarrerait les threads OpenMP de
+        # torch, qui ne survivent pas au fork (warm-up fait dans chaque enfant)
+        from app.services import embeddings
+        if embeddings.get_sbert_model() is not None:
+            loaded.append(SBERT)
+
+    if TFIDF in _models:
+        try:
+            from app.services import tfidf_model
+            if tfidf_model.get_model() is not None:
+                loaded.append(TFIDF)
+        except Exception as e:
+            logger.warning("preload_tfidf_failed", error=repr(e))
+
+    # Objets chargés -> génération permanente : le GC ne les parcourt plus,
+    # leurs pages restent partagées avec les enfants
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "worker_models_preloaded",
+        models=loaded,
+        queues=sorted(queues) if queues is not None else None,
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        pid=os.getpid(),
+        **memory_stats(),
+    )
+
+
+def warm_up_child() -> None:
+    """Chauffe d'un enfant fraîchement forké (signal worker_process_init)."""
+    _child.started_at = time.perf_counter()
+    _child.task_started = None
+    _child.tasks_done = 0
+    if not settings.WORKER_WARMUP or not _models:
+        return
+
+    started = time.perf_counter()
+    if SBERT in _models:
+        try:
+            from app.services import embeddings
+            if embeddings.registry.torch_threads > 0 and _sbert_fork_safe():
+                import torch
+                torch.set_num_threads(embeddings.registry.torch_threads)
+            embeddings.encode_texts([_WARMUP_TEXT])
+        except Exception as e:
+            logger.warning("warmup_sbert_failed", error=repr(e))
+    if SPACY in _models:
+        try:
+            from app.services.cv_parser import CVParser
+            CVParser().parse(_WARMUP_TEXT)
+        except Exception as e:
+            logger.warning("warmup_spacy_failed", error=repr(e))
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    timing.observe("worker.warmup", duration_ms)
+    logger.info("worker_child_ready", pid=os.getpid(), warmup_ms=round(duration_ms, 1), **memory_stats())
+
+
+def on_task_start() -> None:
+    _child.task_started = time.perf_counter()
+
+
+def on_task_end(task_name: str) -> None:
+    if _child.task_started is None:
+        return
+    _child.tasks_done += 1
+    if _child.tasks_done == 1:
+        duration_ms = (time.perf_counter() - _child.task_started) * 1000
+        timing.observe("worker.first_task", duration_ms)
+        logger.info(
+            "worker_child_first_task",
+            pid=os.getpid(),
+            task=task_name,
+            duration_ms=round(duration_ms, 1),
+            since_fork_ms=round((time.perf_counter() - _child.started_at) * 1000, 1)
+            if _child.started_at else None,
+            **memory_stats(),
+        )
+    _child.task_started = None
+
+
+def on_child_shutdown() -> None:
+    logger.info("worker_child_exit", pid=os.getpid(), tasks_done=_child.tasks_done, **memory_stats())
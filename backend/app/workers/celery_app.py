@@ -1,6 +1,42 @@
 """Celery application configuration with DLQ support."""
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
 import os
+import time
+
+# Files de la chaîne de traitement d'un CV
+QUEUE_DEFAULT = "default"
+QUEUE_EXTRACT = "cv_extract"
+QUEUE_PARSE = "cv_parse"
+QUEUE_SCORE = "cv_score"
+QUEUE_BULK = "cv_bulk"  # voie basse priorité : imports, rescoring, admission sous charge
+QUEUES = (QUEUE_EXTRACT, QUEUE_PARSE, QUEUE_SCORE, QUEUE_BULK, QUEUE_DEFAULT)
+
+# Voies de priorité. Les files par étape (voie interactive : uploads d'un
+# recruteur) et cv_bulk (toutes les étapes des traitements de masse) sont
+# consommées par des workers distincts (cf. docker-compose) : un flot d'imports
+# ne prend jamais la capacité réservée aux uploads interactifs.
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+
+def queue_lane(queue: str) -> str:
+    return LANE_BULK if queue == QUEUE_BULK else LANE_INTERACTIVE
+
+
+def task_lane(request) -> str:
+    """Voie d'une tâche en cours, d'après la file dont elle a été consommée."""
+    delivery_info = getattr(request, "delivery_info", None) or {}
+    return queue_lane(delivery_info.get("routing_key") or "")
+
 
 celery_app = Celery(
     "ats_worker",
@@ -21,9 +57,47 @@ celery_app.conf.update(
     task_reject_on_worker_lost=True,
     task_default_retry_delay=60,
     task_max_retries=3,
-    # Task routing
+    # Le warm-up des modèles dans worker_process_init dépasse les 4 s par défaut
+    worker_proc_alive_timeout=float(os.getenv("WORKER_PROC_ALIVE_TIMEOUT", "60")),
+    # Task routing : une file par étape du traitement d'un CV (concurrence
+    # réglée par worker, cf. docker-compose), traitements de masse sur
+    # cv_bulk, le reste sur "default"
+    task_default_queue=QUEUE_DEFAULT,
     task_routes={
-        "app.workers.tasks.*": {"queue": "default"},
+        "app.workers.tasks.extract_cv_file": {"queue": QUEUE_EXTRACT},
+        "app.workers.tasks.ingest_cv_batch": {"queue": QUEUE_BULK},
+        "app.workers.tasks.rescore_offer": {"queue": QUEUE_BULK},
+        "app.workers.tasks.parse_cv": {"queue": QUEUE_PARSE},
+        "app.workers.tasks.score_cv": {"queue": QUEUE_SCORE},
+        "app.workers.tasks.*": {"queue": QUEUE_DEFAULT},
+    },
+    # Tâches périodiques (celery beat)
+    beat_schedule={
+        "refit-tfidf-model": {
+            "task": "app.workers.tasks.refit_tfidf_model",
+            "schedule": crontab(minute=0, hour=os.getenv("TFIDF_REFIT_CRON_HOURS", "*/6")),
+        },
+        "sync-cv-ann-index": {
+            "task": "app.workers.tasks.sync_cv_ann_index",
+            "schedule": 60.0,
+        },
+        "reap-stalled-cv-files": {
+            "task": "app.workers.tasks.reap_stalled_cv_files",
+            "schedule": float(os.getenv("REAPER_INTERVAL_SECONDS", "60")),
+        },
+        "release-deferred-uploads": {
+            "task": "app.workers.tasks.release_deferred_uploads",
+            "schedule": 30.0,
+        },
+        "purge-pipeline-traces": {
+            "task": "app.workers.tasks.purge_pipeline_traces",
+            "schedule": crontab(minute=15, hour=4),
+        },
+        "rebuild-cv-ann-index": {
+            "task": "app.workers.tasks.sync_cv_ann_index",
+            "schedule": crontab(minute=30, hour=3),
+            "kwargs": {"rebuild": True},
+        },
     },
     # Dead Letter Queue configuration
     task_annotations={
@@ -40,3 +114,67 @@ celery_app.conf.update(
 
 # Auto-discover tasks
 celery_app.autodiscover_tasks(["app.workers"])
+
+
+@before_task_publish.connect
+def _stamp_enqueued_at(headers=None, **kwargs):
+    """Horodatage d'envoi : âge du plus ancien message d'une file (services.backlog)."""
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@worker_init.connect
+def _preload_models(sender=None, **kwargs):
+    """
+    Modèles des files consommées (-Q, déjà appliqué à worker_init) chargés
+    dans le parent avant le fork (partagés copy-on-write).
+    """
+    from app.workers import bootstrap
+    queues = list(sender.app.amqp.queues.consume_from) if sender is not None else None
+    bootstrap.preload_models(queues)
+
+
+@worker_process_init.connect
+def _publish_stage_timings(**kwargs):
+    """Chaque process worker publie ses histogrammes de latence dans Redis (/metrics de l'API)."""
+    from app.core import timing
+    timing.configure(publish_redis_url=celery_app.conf.broker_url)
+
+
+@worker_process_init.connect
+def _warm_up_child(**kwargs):
+    from app.workers import bootstrap
+    bootstrap.warm_up_child()
+
+
+@task_prerun.connect
+def _task_started(task=None, **kwargs):
+    from app.workers import bootstrap
+    bootstrap.on_task_start()
+    if task is not None:
+        _observe_queue_wait(task.request)
+
+
+def _observe_queue_wait(request) -> None:
+    """Attente en file par voie (histogramme lane.<voie>.queue_wait)."""
+    enqueued_at = request.get("enqueued_at")
+    if enqueued_at is None:
+        return
+    from app.core import timing
+    timing.observe(f"lane.{task_lane(request)}.queue_wait", max(0.0, time.time() - enqueued_at) * 1000)
+
+
+@task_postrun.connect
+def _task_finished(task=None, **kwargs):
+    from app.workers import bootstrap
+    bootstrap.on_task_end(task.name if task is not None else "")
+
+
+@worker_process_shutdown.connect
+def _flush_stage_timings(**kwargs):
+    from app.core import timing
+    from app.services import extraction_pool
+    from app.workers import bootstrap
+    extraction_pool.shutdown()
+    bootstrap.on_child_shutdown()
+    timing.report()
@@ -0,0 +1,110 @@
+"""
+Worker du mode "claim" (CV_PROCESSING_MODE=claim) : traitement des CV sans
+broker. Chaque itération prend un lot de cv_files en base (SELECT ... FOR
+UPDATE SKIP LOCKED, cf. services.job_claims) et le traite avec l'ingestion
+groupée (extraction, parsing, scoring). Plusieurs processus / conteneurs se
+répartissent les lignes ; le reaper intégré reprend les lots d'un worker tué.
+
+Usage:
+    python -m app.workers.claim_worker
+    python -m app.workers.claim_worker --batch-size 50 --once
+"""
+import argparse
+import signal
+import time
+
+import structlog
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services import bulk_ingestion, extraction_pool, job_claims
+from app.workers import bootstrap
+
+logger = structlog.get_logger(__name__)
+
+
+class _Stop:
+    requested = False
+
+
+def _request_stop(signum, frame) -> None:
+    # Le lot en cours est terminé avant l'arrêt
+    _Stop.requested = True
+
+
+def _reap() -> None:
+    db = SessionLocal()
+    try:
+        job_claims.reap_stalled(db)
+    except Exception as e:
+        logger.error("claim_worker_reap_error", error=repr(e))
+        db.rollback()
+    finally:
+        db.close()
+
+
+def process_batch(owner: str, batch_size: int) -> int:
+    """Prend et traite un lot ; retourne le nombre de lignes prises."""
+    db = SessionLocal()
+    try:
+        ids = job_claims.claim_batch(db, owner, batch_size)
+        if not ids:
+            return 0
+        log = logger.bind(owner=owner, files=len(ids))
+        try:
+            # resume : les lignes viennent d'être passées EXTRACTING par le claim
+            stats = bulk_ingestion.ingest_cv_files(db, ids, resume=True, lane="claim", owner=owner)
+        except Exception as e:
+            # Lease conservé : les lignes seront reprises à son expiration
+            log.error("claim_batch_error", error=repr(e), error_type=type(e).__name__)
+            db.rollback()
+            return len(ids)
+        job_claims.release(db, ids, owner)
+        db.commit()
+        log.info(
+            "claim_batch_done",
+            extracted=stats.extracted,
+            reused=stats.reused,
+            failed=stats.failed,
+            retried=len(stats.retry_ids),
+            scored=stats.scored,
+        )
+        return len(ids)
+    finally:
+        db.close()
+
+
+def run(batch_size: int, poll_seconds: float, once: bool = False) -> None:
+    owner = job_claims.worker_id()
+    logger.info("claim_worker_start", owner=owner, batch_size=batch_size)
+    last_reap = 0.0
+    while not _Stop.requested:
+        if time.monotonic() - last_reap >= settings.REAPER_INTERVAL_SECONDS:
+            _reap()
+            last_reap = time.monotonic()
+        claimed = process_batch(owner, batch_size)
+        if once:
+            break
+        if claimed < batch_size:
+            time.sleep(poll_seconds)
+    logger.info("claim_worker_stop", owner=owner)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Traitement des CV par claim en base (SKIP LOCKED)")
+    parser.add_argument("--batch-size", type=int, default=settings.CLAIM_BATCH_SIZE)
+    parser.add_argument("--poll", type=float, default=settings.CLAIM_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="un seul lot puis arrêt")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    bootstrap.preload_models()
+    try:
+        run(args.batch_size, args.poll, once=args.once)
+    finally:
+        extraction_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
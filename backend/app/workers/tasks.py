@@ -1,8 +1,12 @@
 # backend/app/workers/tasks.py
 """Celery tasks with idempotence, retries, and structured logging."""
 import logging
+import time
+import uuid
+from typing import List, Optional
+
 import structlog
-from celery import shared_task
+from celery import chain, group, shared_task
 from celery.exceptions import MaxRetriesExceededError
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
@@ -11,34 +15,161 @@ from sqlalchemy import text
 from app.db.session import SessionLocal
 from app.models.cv_file import CVFile, CVFileStatus
 from app.models.cv_text import CVText
-from app.services.cv_extraction import extract_cv_text, ExtractionError
+from app.services.cv_extraction import EXTRACTOR_VERSION, ExtractionError
 from app.models.parsed_cv import ParsedCV
 from app.models.offer import Offer
 from app.models.application import Application
 from app.services.cv_parser import CVParser
 from app.services.cv_scorer import CVScorer
+from app.services import (
+    tfidf_model, embedding_store, ann_index, application_scores, token_counts, bulk_ingestion,
+    single_flight, pipeline_events, backlog, job_claims, extraction_pool, pipeline_traces,
+)
+from app.models.embedding import EmbeddingOwner
+from app.core.config import settings
+from app.core import timing
+from app.workers.celery_app import QUEUE_BULK, QUEUE_EXTRACT, task_lane
 
 logger = structlog.get_logger(__name__)
 
 
-@shared_task(name="app.workers.tasks.process_cv_file",
+_STAGE_RETRY = dict(
     bind=True,
-    autoretry_for=(OSError, ConnectionError, SQLAlchemyError),
+    autoretry_for=(OSError, ConnectionError, SQLAlchemyError, extraction_pool.ExtractionRetryable),
     max_retries=3,
     retry_backoff=True,
     retry_backoff_max=600,
-    retry_jitter=True
+    retry_jitter=True,
 )
-def process_cv_file(self, cv_file_id: int) -> None:
+
+
+def _lane_options(queue: Optional[str], run_id: Optional[str] = None, started_at: Optional[float] = None) -> dict:
+    """
+    Options d'envoi des étapes d'un pipeline : file forcée (ex. QUEUE_BULK,
+    voie basse priorité), en-têtes pipeline_started_at (latence de bout en
+    bout par voie) et pipeline_run_id (clé de la trace, cf.
+    services.pipeline_traces). Un appel par pipeline : le root_id Celery est
+    partagé par tout ce qu'envoie une même tâche (release_deferred_uploads,
+    rescore_offer, ...). `run_id` / `started_at` : pipeline commencé hors
+    Celery (extraction inline à l'upload).
+    """
+    options = {"headers": {
+        "pipeline_started_at": started_at or time.time(),
+        "pipeline_run_id": run_id or uuid.uuid4().hex,
+    }}
+    if queue:
+        options["queue"] = queue
+    return options
+
+
+def _observe_pipeline_latency(request) -> None:
+    started_at = request.get("pipeline_started_at")
+    if started_at is not None:
+        timing.observe(f"lane.{task_lane(request)}.end_to_end", max(0.0, time.time() - started_at) * 1000)
+
+
+def _trace(request, stage: str, started: float, **fields) -> None:
+    """Durée de l'étape depuis `started` (perf_counter) dans la trace de l'exécution."""
+    pipeline_traces.record_stage(request, stage, (time.perf_counter() - started) * 1000, **fields)
+
+
+def enqueue_cv_pipeline(cv_file_id: int, queue: Optional[str] = None):
+    """
+    Chaîne extraction -> parsing -> scoring ; chaque étape sur sa propre file
+    (voie interactive), ou toutes sur `queue` (QUEUE_BULK : voie bulk).
+    """
+    if settings.CV_PROCESSING_MODE == "claim":
+        # Les workers app.workers.claim_worker prennent les lignes UPLOADED en base
+        return None
+    options = _lane_options(queue)
+    return chain(
+        extract_cv_file.s(cv_file_id).set(**options),
+        parse_cv.s().set(**options),
+        score_cv.s().set(**options),
+    ).apply_async()
+
+
+def enqueue_cv_scoring(
+    application_id: int,
+    queue: Optional[str] = None,
+    run_id: Optional[str] = None,
+    started_at: Optional[float] = None,
+):
+    """
+    Chaîne parsing -> scoring d'un CV déjà extrait (extraction inline à
+    l'upload, tracée sous `run_id` depuis `started_at`).
+    """
+    options = _lane_options(queue, run_id=run_id, started_at=started_at)
+    return chain(
+        parse_cv.s(application_id).set(**options),
+        score_cv.s().set(**options),
+    ).apply_async()
+
+
+@shared_task(name="app.workers.tasks.process_cv_file")
+def process_cv_file(cv_file_id: int) -> None:
+    """
+    Point d'entrée historique : délègue à la chaîne extract -> parse -> score
+    (conservé pour les messages déjà en file).
+    """
+    enqueue_cv_pipeline(cv_file_id)
+
+
+def _offer_id(db: Session, application_id: int) -> Optional[int]:
+    return db.query(Application.offer_id).filter(Application.id == application_id).scalar()
+
+
+def _extracted_twin(db: Session, cv_file: CVFile) -> Optional[CVText]:
+    """Texte déjà extrait (version courante) d'un autre fichier identique (même sha256)."""
+    return (
+        db.query(CVText)
+        .join(CVFile, CVFile.application_id == CVText.application_id)
+        .filter(
+            CVFile.sha256 == cv_file.sha256,
+            CVFile.id != cv_file.id,
+            CVFile.status == CVFileStatus.EXTRACTED.value,
+            CVText.status == "SUCCESS",
+            CVText.extractor_version == EXTRACTOR_VERSION,
+        )
+        .first()
+    )
+
+
+def _parsed_twin(db: Session, source_hash: str, application_id: int) -> Optional[ParsedCV]:
+    """Parsing déjà stocké (version courante) pour le même texte (autre candidature)."""
+    return (
+        db.query(ParsedCV)
+        .filter(
+            ParsedCV.source_hash == source_hash,
+            ParsedCV.application_id != application_id,
+            ParsedCV.parser_version == CVParser.VERSION,
+        )
+        .first()
+    )
+
+
+@shared_task(name="app.workers.tasks.extract_cv_file", **_STAGE_RETRY)
+def extract_cv_file(self, cv_file_id: int) -> Optional[int]:
     """
-    Tâche Celery qui traite un CV.
+    Étape 1 (file cv_extract) : extraction du texte (pdfminer / OCR / DOCX).
+
+    Idempotente : si le texte est déjà stocké (EXTRACTED + CVText SUCCESS,
+    version d'extracteur courante), l'extraction n'est pas refaite et la
+    chaîne continue. Un texte d'une version antérieure est ré-extrait ; en
+    cas d'échec, il est conservé.
+    Retourne application_id pour l'étape suivante, None pour arrêter la chaîne.
     """
     task_id = self.request.id
-    log = logger.bind(task_id=task_id, cv_file_id=cv_file_id)
+    owner = f"celery:{task_id}"  # un retry garde le même task_id, donc le lease
+    log = logger.bind(task_id=task_id, cv_file_id=cv_file_id, stage="extract")
     
-    log.info("process_cv_file_start")
+    log.info("extract_cv_file_start")
+    started = time.perf_counter()
 
     db: Session = SessionLocal()
+    cv_text: CVText | None = None
+    offer_id: Optional[int] = None
+    lease = single_flight.Lease()
     try:
         # ✅ Vérifier la connexion DB
         db.execute(text("SELECT 1"))
@@ -47,28 +178,17 @@ def process_cv_file(self, cv_file_id: int) -> None:
         cv_file: CVFile | None = db.get(CVFile, cv_file_id)
         if not cv_file:
             log.error("cv_file_not_found")
-            return
+            return None
         
         log = log.bind(
             application_id=cv_file.application_id,
             original_filename=cv_file.original_filename,
             current_status=cv_file.status
         )
+        offer_id = _offer_id(db, cv_file.application_id)
 
-        # 2. IDEMPOTENCE CHECK
-        if cv_file.status in [CVFileStatus.EXTRACTED.value, CVFileStatus.EXTRACTING.value]:
-            log.info("task_already_processed_or_in_progress", status=cv_file.status)
-            return
-        
-        # 3. Marquer comme en cours
-        cv_file.status = CVFileStatus.EXTRACTING.value
-        db.flush()
-        db.commit()
-        
-        log.info("extraction_started")
-
-        # 4. Récupérer CVText
-        cv_text: CVText | None = (
+        # 2. Récupérer CVText
+        cv_text = (
             db.query(CVText)
             .filter(CVText.application_id == cv_file.application_id)
             .one_or_none()
@@ -79,11 +199,71 @@ def process_cv_file(self, cv_file_id: int) -> None:
             cv_file.status = CVFileStatus.FAILED.value
             cv_file.error_message = error_msg
             db.commit()
-            return
+            pipeline_events.publish(offer_id, cv_file.application_id, pipeline_events.FAILED, error=error_msg)
+            _trace(
+                self.request, "extract", started, cv_file_id=cv_file_id, application_id=cv_file.application_id,
+                status=pipeline_traces.FAILED, error=error_msg,
+            )
+            return None
+
+        # 3. IDEMPOTENCE CHECK : sortie déjà stockée -> étapes suivantes seulement
+        stored = cv_text.status == "SUCCESS" and cv_text.extracted_text is not None
+        if (
+            cv_file.status == CVFileStatus.EXTRACTED.value
+            and stored
+            and cv_text.extractor_version == EXTRACTOR_VERSION
+        ):
+            log.info("extraction_already_stored")
+            _trace(
+                self.request, "extract", started, cache_hit=True, cv_file_id=cv_file_id,
+                application_id=cv_file.application_id, mime_type=cv_file.mime_type,
+            )
+            return cv_file.application_id
+        if job_claims.lease_held_elsewhere(cv_file, owner):
+            log.info("extraction_in_progress", claimed_by=cv_file.claimed_by)
+            return None
+
+        # 3b. SINGLE-FLIGHT : même fichier (sha256) extrait par une autre tâche.
+        #     Transaction close avant l'attente éventuelle du lease (lectures
+        #     seules jusqu'ici ; cv_file / cv_text sont rechargés ensuite)
+        sha256 = cv_file.sha256
+        db.rollback()
+        lease = single_flight.acquire("extract", sha256)
+        twin = _extracted_twin(db, cv_file)
+        if twin is not None:
+            cv_file.status = CVFileStatus.EXTRACTED.value
+            cv_file.error_message = None
+            job_claims.clear_lease(cv_file)
+            cv_text.status = "SUCCESS"
+            cv_text.extracted_text = twin.extracted_text
+            cv_text.quality_score = twin.quality_score
+            cv_text.content_hash = twin.content_hash
+            cv_text.token_counts = twin.token_counts
+            cv_text.extractor_version = twin.extractor_version
+            cv_text.error_message = None
+            db.commit()
+            single_flight.record_saved("extract")
+            log.info("extraction_reused", source_application_id=twin.application_id, waited=lease.waited)
+            pipeline_events.publish(offer_id, cv_file.application_id, pipeline_events.EXTRACTED, reused=True)
+            _trace(
+                self.request, "extract", started, cache_hit=True, cv_file_id=cv_file_id,
+                application_id=cv_file.application_id, mime_type=cv_file.mime_type,
+            )
+            return cv_file.application_id
+        
+        # 4. Marquer comme en cours : UPDATE conditionnel avec lease, une seule
+        #    tâche passe ; un worker tué laisse un lease expiré (reaper)
+        if not job_claims.claim_file(db, cv_file.id, owner):
+            log.info("extraction_in_progress")
+            return None
+        db.refresh(cv_file)
+        pipeline_events.publish(offer_id, cv_file.application_id, pipeline_events.EXTRACTING)
+        
+        log.info("extraction_started")
 
         # 5. Extraction de texte
         try:
-            result = extract_cv_text(cv_file.storage_path, cv_file.mime_type)
+            result = extraction_pool.extract(cv_file.storage_path, cv_file.mime_type)
 
             if isinstance(result, tuple):
                 extracted_text = result[0]
@@ -104,13 +284,31 @@ def process_cv_file(self, cv_file_id: int) -> None:
         except ExtractionError as e:
             msg = str(e)
             log.error("extraction_error", error=msg, error_type="ExtractionError")
+            if stored:
+                # Ré-extraction d'un texte d'une version antérieure : il est conservé
+                cv_file.status = CVFileStatus.EXTRACTED.value
+                cv_file.error_message = f"Re-extraction failed: {msg}"
+                job_claims.clear_lease(cv_file)
+                db.commit()
+                log.warning("reextraction_failed_previous_text_kept", extractor_version=cv_text.extractor_version)
+                _trace(
+                    self.request, "extract", started, cv_file_id=cv_file_id, application_id=cv_file.application_id,
+                    mime_type=cv_file.mime_type, error=msg,
+                )
+                return cv_file.application_id
             
             cv_file.status = CVFileStatus.FAILED.value
             cv_file.error_message = msg
+            job_claims.clear_lease(cv_file)
             cv_text.status = "FAILED"
             cv_text.error_message = msg
             db.commit()
-            return
+            pipeline_events.publish(offer_id, cv_file.application_id, pipeline_events.FAILED, error=msg)
+            _trace(
+                self.request, "extract", started, cv_file_id=cv_file_id, application_id=cv_file.application_id,
+                mime_type=cv_file.mime_type, status=pipeline_traces.FAILED, error=msg,
+            )
+            return None
             
         except Exception as e:
             log.error("extraction_unexpected_error", error=repr(e), error_type=type(e).__name__)
@@ -121,111 +319,421 @@ def process_cv_file(self, cv_file_id: int) -> None:
         # 6. Mise à jour succès extraction
         cv_file.status = CVFileStatus.EXTRACTED.value
         cv_file.error_message = None
+        job_claims.clear_lease(cv_file)
         cv_text.status = "SUCCESS"
         cv_text.extracted_text = extracted_text
         cv_text.quality_score = quality_score
+        cv_text.content_hash = embedding_store.content_hash(extracted_text)
+        cv_text.token_counts = token_counts.count_tokens(extracted_text)
+        cv_text.extractor_version = EXTRACTOR_VERSION
         cv_text.error_message = None
 
-        # 7. Parser et scorer le CV
-        try:
-            log.info("cv_parsing_started")
-            
-            parser = CVParser()
-            parsed_data = parser.parse(extracted_text)
-            
-            application = db.get(Application, cv_file.application_id)
-            if not application:
-                log.warning("application_not_found_for_scoring")
-            else:
-                offer = db.get(Offer, application.offer_id)
-                if offer:
-                    # ✅ CORRECTION: Utiliser getattr avec valeurs par défaut
-                    offer_data = {
-                        "required_skills": getattr(offer, 'required_skills', []) or [],
-                        "min_experience_years": getattr(offer, 'min_experience_years', 0) or 0,
-                        "required_education": getattr(offer, 'required_education', []) or [],
-                        "required_languages": getattr(offer, 'required_languages', []) or []
-                    }
-                    
-                    # Calculer le score
-                    scorer = CVScorer()
-                    scoring_result = scorer.calculate_score(parsed_data, offer_data)
-                    
-                    # Créer ou mettre à jour ParsedCV
-                    parsed_cv = db.query(ParsedCV).filter(
-                        ParsedCV.application_id == application.id
-                    ).one_or_none()
-                    
-                    if parsed_cv:
-                        for key, value in parsed_data.items():
-                            setattr(parsed_cv, key, value)
-                        for key, value in scoring_result.items():
-                            if key != 'scoring_details':
-                                setattr(parsed_cv, key, value)
-                        parsed_cv.scoring_details = scoring_result.get('scoring_details', {})
-                    else:
-                        parsed_cv = ParsedCV(
-                            application_id=application.id,
-                            **parsed_data,
-                            matching_score=scoring_result['matching_score'],
-                            skills_score=scoring_result['skills_score'],
-                            experience_score=scoring_result['experience_score'],
-                            education_score=scoring_result['education_score'],
-                            language_score=scoring_result['language_score'],
-                            scoring_details=scoring_result['scoring_details']
-                        )
-                        db.add(parsed_cv)
-                    
-                    log.info(
-                        "cv_parsed_and_scored",
-                        matching_score=scoring_result['matching_score'],
-                        skills_count=len(parsed_data.get('skills', []))
-                    )
-                else:
-                    log.warning("offer_not_found_for_scoring")
-        
-        except Exception as parse_error:
-            log.error(
-                "cv_parsing_error",
-                error=str(parse_error),
-                error_type=type(parse_error).__name__
-            )
-
-        # ✅ Vérifier la connexion avant commit final
-        try:
-            db.execute(text("SELECT 1"))
-        except Exception:
-            log.warning("db_reconnecting_before_commit")
-            db.rollback()
-            db.close()
-            db = SessionLocal()
-            # Re-fetch les objets dans la nouvelle session
-            cv_file = db.get(CVFile, cv_file_id)
-            cv_text = db.query(CVText).filter(
-                CVText.application_id == cv_file.application_id
-            ).first()
-
         db.commit()
-        log.info("process_cv_file_success")
+        log.info("extract_cv_file_success")
+        pipeline_events.publish(
+            offer_id, cv_file.application_id, pipeline_events.EXTRACTED, quality_score=quality_score
+        )
+        _trace(
+            self.request, "extract", started, cv_file_id=cv_file_id, application_id=cv_file.application_id,
+            mime_type=cv_file.mime_type, page_count=meta.get("page_count"), ocr_pages=meta.get("ocr_pages"),
+        )
+        return cv_file.application_id
         
     except MaxRetriesExceededError:
         log.error("max_retries_exceeded")
         try:
             cv_file.status = CVFileStatus.FAILED.value
             cv_file.error_message = "Max retries exceeded"
+            job_claims.clear_lease(cv_file)
             if cv_text:
                 cv_text.status = "FAILED"
                 cv_text.error_message = "Max retries exceeded"
             db.commit()
+            pipeline_events.publish(
+                offer_id, cv_file.application_id, pipeline_events.FAILED, error="Max retries exceeded"
+            )
+            _trace(
+                self.request, "extract", started, cv_file_id=cv_file_id, application_id=cv_file.application_id,
+                status=pipeline_traces.FAILED, error="Max retries exceeded",
+            )
         except Exception as commit_error:
             log.error("failed_to_update_status_after_max_retries", error=repr(commit_error))
         raise
         
     except Exception as e:
-        log.error("process_cv_file_error", error=repr(e), error_type=type(e).__name__)
+        log.error("extract_cv_file_error", error=repr(e), error_type=type(e).__name__)
         db.rollback()
         raise
         
+    finally:
+        lease.release()
+        db.close()
+        log.info("extract_cv_file_end")
+
+
+@shared_task(name="app.workers.tasks.parse_cv", **_STAGE_RETRY)
+def parse_cv(self, application_id: Optional[int]) -> Optional[int]:
+    """
+    Étape 2 (file cv_parse) : parsing spaCy du texte extrait -> ParsedCV.
+
+    Idempotente : rien n'est refait si ParsedCV.source_hash correspond déjà
+    au hash du texte extrait et que le parsing est de la version courante.
+    """
+    if application_id is None:
+        return None
+    log = logger.bind(task_id=self.request.id, application_id=application_id, stage="parse")
+    started = time.perf_counter()
+
+    db: Session = SessionLocal()
+    lease = single_flight.Lease()
+    try:
+        cv_text = (
+            db.query(CVText)
+            .filter(CVText.application_id == application_id, CVText.status == "SUCCESS")
+            .one_or_none()
+        )
+        if not cv_text:
+            log.warning("cv_text_not_extracted")
+            return None
+
+        source_hash = cv_text.content_hash or embedding_store.content_hash(cv_text.extracted_text)
+        parsed_cv = db.query(ParsedCV).filter(ParsedCV.application_id == application_id).one_or_none()
+        if parsed_cv and parsed_cv.source_hash == source_hash and parsed_cv.parser_version == CVParser.VERSION:
+            log.info("parse_already_stored")
+            _trace(self.request, "parse", started, cache_hit=True, application_id=application_id)
+            return application_id
+
+        # SINGLE-FLIGHT : même texte déjà parsé pour une autre candidature ;
+        # transaction close avant l'attente éventuelle du lease
+        db.rollback()
+        lease = single_flight.acquire("parse", source_hash)
+        twin = _parsed_twin(db, source_hash, application_id)
+        if twin is not None:
+            parsed_data = {name: getattr(twin, name) for name in CVParser.FIELDS}
+            single_flight.record_saved("parse")
+            log.info("parse_reused", source_application_id=twin.application_id, waited=lease.waited)
+        else:
+            log.info("cv_parsing_started")
+            parsed_data = CVParser().parse(cv_text.extracted_text or "")
+
+        if parsed_cv is None:
+            parsed_cv = ParsedCV(application_id=application_id)
+            db.add(parsed_cv)
+        for key, value in parsed_data.items():
+            setattr(parsed_cv, key, value)
+        parsed_cv.source_hash = source_hash
+        parsed_cv.parser_version = CVParser.VERSION
+        # Nouveau parsing -> le score CVScorer doit être recalculé
+        parsed_cv.score_inputs_hash = None
+
+        db.commit()
+        log.info("cv_parsed", skills_count=len(parsed_data.get("skills", [])))
+        pipeline_events.publish(
+            _offer_id(db, application_id), application_id, pipeline_events.PARSED,
+            skills_count=len(parsed_data.get("skills") or []),
+        )
+        _trace(self.request, "parse", started, cache_hit=twin is not None, application_id=application_id)
+        return application_id
+
+    except Exception as e:
+        log.error("parse_cv_error", error=repr(e), error_type=type(e).__name__)
+        db.rollback()
+        raise
+
+    finally:
+        lease.release()
+        db.close()
+
+
+@shared_task(name="app.workers.tasks.score_cv", **_STAGE_RETRY)
+def score_cv(self, application_id: Optional[int]) -> Optional[int]:
+    """
+    Étape 3 (file cv_score) : score structuré (CVScorer), embedding SBERT et
+    score combiné de la candidature.
+
+    Idempotente : CVScorer n'est relancé que si le parsing, les critères de
+    l'offre ou ses pondérations (score_inputs_hash), ou la version de
+    CVScorer ont changé ; le score
+    combiné et l'embedding ont leurs propres hash (application_scores,
+    embedding_store).
+    """
+    if application_id is None:
+        return None
+    log = logger.bind(task_id=self.request.id, application_id=application_id, stage="score")
+    started = time.perf_counter()
+
+    db: Session = SessionLocal()
+    try:
+        application = db.get(Application, application_id)
+        offer = db.get(Offer, application.offer_id) if application else None
+        if not offer:
+            log.warning("offer_not_found_for_scoring")
+            return None
+
+        # 1. Score structuré (CVScorer) à partir des champs parsés
+        cache_hit = False
+        parsed_cv = db.query(ParsedCV).filter(ParsedCV.application_id == application_id).one_or_none()
+        if parsed_cv is None:
+            log.warning("parsed_cv_not_found")
+        else:
+            offer_data = CVScorer.offer_criteria(offer)
+            scorer = CVScorer(weights=offer.scoring_weights)
+            inputs_hash = scorer.inputs_hash(parsed_cv.source_hash, offer_data)
+            if parsed_cv.score_inputs_hash == inputs_hash and parsed_cv.scorer_version == CVScorer.VERSION:
+                log.info("structured_score_already_stored")
+                cache_hit = True
+            else:
+                parsed_data = {
+                    "skills": parsed_cv.skills or [],
+                    "experience_years": parsed_cv.experience_years,
+                    "education": parsed_cv.education or [],
+                    "languages": parsed_cv.languages or [],
+                }
+                scoring_result = scorer.calculate_score(parsed_data, offer_data)
+                for key, value in scoring_result.items():
+                    setattr(parsed_cv, key, value)
+                parsed_cv.score_inputs_hash = inputs_hash
+                parsed_cv.scorer_version = CVScorer.VERSION
+                log.info("cv_scored", matching_score=scoring_result["matching_score"])
+
+        # 2. Embedding SBERT + score combiné (servi par GET /applications/{id}/scoring)
+        combined = None
+        cv_text = db.query(CVText).filter(CVText.application_id == application_id).one_or_none()
+        if cv_text and cv_text.status == "SUCCESS":
+            try:
+                combined = application_scores.ensure_score(
+                    db,
+                    application_id=application_id,
+                    offer_id=offer.id,
+                    job_text=offer.description or "",
+                    cv_hash=cv_text.content_hash,
+                    quality_score=cv_text.quality_score,
+                )
+            except Exception as score_error:
+                log.warning("application_score_failed", error=repr(score_error))
+
+        db.commit()
+        log.info("score_cv_success")
+        _observe_pipeline_latency(self.request)
+        pipeline_events.publish(
+            offer.id, application_id, pipeline_events.SCORED,
+            matching_score=parsed_cv.matching_score if parsed_cv else None,
+            combined_score=combined.combined_score if combined else None,
+        )
+        _trace(
+            self.request, "score", started, cache_hit=cache_hit, application_id=application_id,
+            status=pipeline_traces.SCORED,
+        )
+        return application_id
+
+    except Exception as e:
+        log.error("score_cv_error", error=repr(e), error_type=type(e).__name__)
+        db.rollback()
+        raise
+
+    finally:
+        db.close()
+
+
+def enqueue_bulk_ingestion(cv_file_ids: List[int], chunk_size: Optional[int] = None):
+    """Une tâche ingest_cv_batch par chunk (voie bulk, file cv_bulk)."""
+    return group(
+        ingest_cv_batch.s(chunk)
+        for chunk in bulk_ingestion.chunks(cv_file_ids, chunk_size)
+    ).apply_async()
+
+
+@shared_task(name="app.workers.tasks.ingest_cv_batch", **_STAGE_RETRY)
+def ingest_cv_batch(self, cv_file_ids: List[int]) -> dict:
+    """
+    Ingestion en masse (import d'un export de job board) : extraction, parsing
+    et scoring d'une liste de cv_files avec chargements et écritures groupés
+    par chunk (cf. services.bulk_ingestion). Les fichiers en erreur transitoire
+    repartent dans la chaîne unitaire, qui a ses propres retries.
+    """
+    log = logger.bind(task_id=self.request.id, files=len(cv_file_ids), stage="bulk")
+    log.info("ingest_cv_batch_start")
+
+    totals = bulk_ingestion.IngestionStats()
+    for chunk in bulk_ingestion.chunks(cv_file_ids):
+        db: Session = SessionLocal()
+        try:
+            totals.merge(bulk_ingestion.ingest_cv_files(db, chunk, resume=bool(self.request.retries)))
+        except Exception as e:
+            log.error("ingest_cv_batch_error", error=repr(e), error_type=type(e).__name__)
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    for cv_file_id in totals.retry_ids:
+        enqueue_cv_pipeline(cv_file_id, queue=QUEUE_BULK)
+
+    summary = {
+        "files": totals.files,
+        "extracted": totals.extracted,
+        "reused": totals.reused,
+        "in_progress": totals.in_progress,
+        "failed": totals.failed,
+        "parsed": totals.parsed,
+        "scored": totals.scored,
+        "retried": len(totals.retry_ids),
+        "timings_ms": totals.timings_ms,
+    }
+    log.info("ingest_cv_batch_end", **{k: v for k, v in summary.items() if k != "timings_ms"})
+    return summary
+
+
+@shared_task(name="app.workers.tasks.rescore_offer")
+def rescore_offer(offer_id: int) -> dict:
+    """
+    Rescoring des candidatures d'une offre après modification de ses critères
+    (voie bulk) : une tâche score_cv par candidature parsée, sur cv_bulk.
+    score_cv ne recalcule que les scores dont les entrées ont changé.
+    """
+    db: Session = SessionLocal()
+    try:
+        application_ids = [
+            application_id for (application_id,) in db.query(ParsedCV.application_id)
+            .join(Application, Application.id == ParsedCV.application_id)
+            .filter(Application.offer_id == offer_id)
+            .order_by(ParsedCV.application_id)
+        ]
+    finally:
+        db.close()
+
+    if application_ids:
+        group(
+            score_cv.s(application_id).set(**_lane_options(QUEUE_BULK)) for application_id in application_ids
+        ).apply_async()
+    logger.info("rescore_offer_enqueued", offer_id=offer_id, applications=len(application_ids))
+    return {"offer_id": offer_id, "applications": len(application_ids)}
+
+
+@shared_task(name="app.workers.tasks.refit_tfidf_model")
+def refit_tfidf_model() -> dict:
+    """
+    Réentraîne le modèle TF-IDF sur tout le corpus (CV extraits + offres actives)
+    et le publie ; les processus de l'API/worker le rechargent à chaud.
+    """
+    db: Session = SessionLocal()
+    try:
+        cv_texts = (
+            text_ for (text_,) in db.query(CVText.extracted_text)
+            .filter(CVText.status == "SUCCESS", CVText.extracted_text.isnot(None))
+            .yield_per(500)
+        )
+        offer_texts = [
+            description for (description,) in db.query(Offer.description)
+            .filter(Offer.deleted == False)  # noqa: E712
+        ]
+        corpus = list(cv_texts) + offer_texts
+    finally:
+        db.close()
+
+    if not corpus:
+        logger.info("tfidf_refit_skipped_empty_corpus")
+        return {"status": "skipped"}
+
+    model = tfidf_model.refit_and_publish(corpus)
+    return {"status": "ok", "version": model.version, "n_docs": model.n_docs}
+
+
+@shared_task(name="app.workers.tasks.embed_offer",
+    autoretry_for=(OSError, ConnectionError, SQLAlchemyError),
+    max_retries=3,
+    retry_backoff=True,
+)
+def embed_offer(offer_id: int) -> None:
+    """Calcule (si besoin) l'embedding SBERT de la description d'une offre."""
+    db: Session = SessionLocal()
+    try:
+        offer = db.get(Offer, offer_id)
+        if not offer or offer.deleted:
+            return
+        embedding_store.ensure_embedding(db, EmbeddingOwner.OFFER, offer.id, offer.description)
+        db.commit()
+    finally:
+        db.close()
+
+
+@shared_task(name="app.workers.tasks.sync_cv_ann_index")
+def sync_cv_ann_index(rebuild: bool = False) -> dict:
+    """Ajoute à l'index ANN les embeddings de CV récents (ou le reconstruit)."""
+    db: Session = SessionLocal()
+    try:
+        index = ann_index.sync_cv_index(db, rebuild=rebuild)
+    finally:
+        db.close()
+    return {"size": len(index), "n_lists": index.n_lists}
+
+
+@shared_task(name="app.workers.tasks.release_deferred_uploads")
+def release_deferred_uploads() -> dict:
+    """
+    Met en file les uploads différés (statut DEFERRED) quand la file d'entrée
+    repasse sous les seuils, dans la limite de la marge restante.
+    """
+    try:
+        entry = backlog.queue_backlog(max_age=0)[QUEUE_EXTRACT]
+    except Exception as e:
+        logger.warning("release_deferred_backlog_unavailable", error=repr(e))
+        return {"released": 0}
+    if entry.overloaded:
+        return {"released": 0, "depth": entry.depth}
+
+    limit = min(settings.DEFERRED_RELEASE_BATCH, max(0, settings.BACKLOG_MAX_DEPTH - entry.depth))
+    if limit == 0:
+        return {"released": 0, "depth": entry.depth}
+
+    db: Session = SessionLocal()
+    try:
+        # SKIP LOCKED : deux passages concurrents ne relâchent pas les mêmes fichiers
+        cv_files = (
+            db.query(CVFile)
+            .filter(CVFile.status == CVFileStatus.DEFERRED.value)
+            .order_by(CVFile.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        ids = [cv_file.id for cv_file in cv_files]
+        for cv_file in cv_files:
+            cv_file.status = CVFileStatus.UPLOADED.value
+        db.commit()
+    finally:
+        db.close()
+
+    for cv_file_id in ids:
+        enqueue_cv_pipeline(cv_file_id)
+    if ids:
+        logger.info("deferred_uploads_released", count=len(ids), depth=entry.depth)
+    return {"released": len(ids), "depth": entry.depth}
+
+
+@shared_task(name="app.workers.tasks.reap_stalled_cv_files")
+def reap_stalled_cv_files() -> dict:
+    """
+    Reprise des cv_files restés EXTRACTING après la mort d'un worker (lease
+    expiré) : remis en file, ou FAILED après CLAIM_MAX_ATTEMPTS tentatives.
+    """
+    db: Session = SessionLocal()
+    try:
+        result = job_claims.reap_stalled(db)
+    finally:
+        db.close()
+    for cv_file_id in result.requeued:
+        enqueue_cv_pipeline(cv_file_id)
+    return {"requeued": len(result.requeued), "failed": len(result.failed)}
+
+
+@shared_task(name="app.workers.tasks.purge_pipeline_traces")
+def purge_pipeline_traces() -> dict:
+    """Supprime les traces du pipeline au-delà de PIPELINE_TRACE_RETENTION_DAYS."""
+    db: Session = SessionLocal()
+    try:
+        deleted = pipeline_traces.purge(db)
     finally:
         db.close()
-        log.info("process_cv_file_end")
+    logger.info("pipeline_traces_purged", deleted=deleted)
+    return {"deleted": deleted}
@@ -0,0 +1,68 @@
+"""
+Configuration commune des tests.
+
+Base de test : TEST_DATABASE_URL (PostgreSQL, pour SKIP LOCKED réel) ou, à
+défaut, un fichier SQLite temporaire. DATABASE_URL est toujours écrasée :
+les tests ne touchent jamais la base configurée pour l'application.
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="ats-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_TMP_DIR}/test.db"
+os.environ.setdefault("JWT_SECRET", "test-secret-not-for-production-0123456789")
+os.environ["PIPELINE_EVENTS_ENABLED"] = "false"
+os.environ["PIPELINE_TRACES_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.application import Application  # noqa: E402
+from app.models.candidate import Candidate  # noqa: E402
+from app.models.cv_file import CVFile, CVFileStatus  # noqa: E402
+from app.models.cv_text import CVText  # noqa: E402
+from app.models.offer import Offer  # noqa: E402
+import app.models  # noqa: E402,F401
+import app.models.auditlog  # noqa: E402,F401
+import app.models.parsed_cv  # noqa: E402,F401
+
+
+@pytest.fixture()
+def db():
+    """Schéma neuf par test ; session fermée et tables supprimées ensuite."""
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture()
+def make_cv_files(db):
+    """Crée n candidatures (une offre) avec leur CVText PENDING et un cv_file UPLOADED ; ids des cv_files."""
+    def _make(n):
+        offer = Offer(title="Dev", description="Python")
+        db.add(offer)
+        db.flush()
+        ids = []
+        for i in range(n):
+            candidate = Candidate(full_name=f"C{i}")
+            db.add(candidate)
+            db.flush()
+            application = Application(offer_id=offer.id, candidate_id=candidate.id)
+            db.add(application)
+            db.flush()
+            db.add(CVText(application_id=application.id, status="PENDING"))
+            cv_file = CVFile(
+                application_id=application.id, storage_path=f"/cv/{i}.pdf", original_filename=f"{i}.pdf",
+                mime_type="application/pdf", size_bytes=1, sha256=str(i), status=CVFileStatus.UPLOADED.value,
+            )
+            db.add(cv_file)
+            db.flush()
+            ids.append(cv_file.id)
+        db.commit()
+        return ids
+    return _make
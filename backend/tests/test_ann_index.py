@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.services.ann_index import IVFIndex
+
+
+def _clustered(n, dim, seed=0):
+    # Mélange de gaussiennes normalisées (même générateur que bench_ann)
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 500), dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def _recall(index, vectors, ids, queries, k, n_probe):
+    hits = 0
+    for query in queries:
+        scores = vectors @ query
+        exact = set(ids[np.argsort(-scores)[:k]].tolist())
+        hits += len(exact & {i for i, _ in index.search(query, k=k, n_probe=n_probe)})
+    return hits / (k * len(queries))
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors = _clustered(5000, 64)
+    ids = np.arange(1000, 1000 + len(vectors), dtype=np.int64)
+    # Requêtes proches de CV existants (offres du même domaine que le corpus)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), 50, replace=False)] + 0.1 * rng.normal(size=(50, 64))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    return ids, vectors, queries
+
+
+@pytest.mark.parametrize("quantize,min_recall", [(False, 0.95), (True, 0.9)])
+def test_recall_on_synthetic_data(corpus, quantize, min_recall):
+    ids, vectors, queries = corpus
+    index = IVFIndex.build(ids, vectors, n_lists=70, quantize=quantize)
+    assert len(index) == len(ids)
+    assert _recall(index, vectors, ids, queries, k=10, n_probe=8) >= min_recall
+    # Toutes les listes parcourues : recherche exhaustive
+    assert _recall(index, vectors, ids, queries, k=10, n_probe=index.n_lists) >= (0.999 if not quantize else 0.95)
+
+
+def test_search_returns_sorted_similarities_and_filters(corpus):
+    ids, vectors, queries = corpus
+    index = IVFIndex.build(ids, vectors, n_lists=70)
+    results = index.search(queries[0], k=10, n_probe=70)
+    scores = [s for _, s in results]
+    assert scores == sorted(scores, reverse=True)
+    for i, score in results:
+        assert score == pytest.approx(float(vectors[i - 1000] @ queries[0]), abs=1e-5)
+
+    allowed = ids[::7]
+    filtered = index.search(queries[0], k=10, n_probe=70, allowed_ids=allowed)
+    assert filtered and all(i in set(allowed.tolist()) for i, _ in filtered)
+    assert index.search(queries[0], k=10, allowed_ids=np.array([-1])) == []
+
+
+def test_add_remove_and_persistence(corpus, tmp_path):
+    ids, vectors, queries = corpus
+    index = IVFIndex.build(ids[:4000], vectors[:4000], n_lists=50, quantize=True)
+    index.add(ids[4000:], vectors[4000:])
+    index.add(ids[:10], vectors[:10])  # remplacement : pas de doublon
+    assert len(index) == len(ids)
+    index.remove(ids[:100])
+    assert len(index) == len(ids) - 100
+
+    index.synced_at = "2026-01-01T00:00:00+00:00"
+    path = tmp_path / "cv_index.npz"
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert (len(loaded), loaded.n_lists, loaded.quantize, loaded.synced_at) == (
+        len(index), index.n_lists, True, index.synced_at,
+    )
+    assert loaded.search(queries[0], k=5) == index.search(queries[0], k=5)
+    assert not set(ids[:100].tolist()) & {i for i, _ in loaded.search(vectors[0], k=50, n_probe=50)}
@@ -0,0 +1,57 @@
+import pytest
+
+from app.models.application import Application
+from app.models.cv_text import CVText
+from app.models.offer import Offer
+from app.services import application_scores, embedding_store, embeddings
+
+
+@pytest.fixture()
+def application(db, make_cv_files):
+    make_cv_files(1)
+    app = db.query(Application).one()
+    cv_text = db.query(CVText).one()
+    cv_text.status = "SUCCESS"
+    cv_text.extracted_text = "Développeur Python, Django et PostgreSQL"
+    cv_text.content_hash = embedding_store.content_hash(cv_text.extracted_text)
+    db.commit()
+    return app
+
+
+def _ensure(db, app):
+    offer = db.get(Offer, app.offer_id)
+    cv_text = db.query(CVText).one()
+    return application_scores.ensure_score(
+        db, application_id=app.id, offer_id=offer.id, job_text="Python Django",
+        cv_hash=cv_text.content_hash,
+    )
+
+
+def test_encoder_error_gives_a_degraded_score(db, application, monkeypatch):
+    def down(texts, pooling=None):
+        raise ConnectionError("sidecar down")
+
+    monkeypatch.setattr(embeddings, "encode_documents", down)
+    monkeypatch.setattr(embeddings.registry, "_model", object())
+
+    row = _ensure(db, application)
+    assert row.semantic is None
+    assert row.combined_score > 0
+    db.commit()
+    # Modèle chargé : le score dégradé est périmé et retenté à la lecture suivante
+    assert not application_scores.is_fresh(row, row.cv_hash, row.offer_hash)
+
+
+def test_degraded_score_is_served_without_loading_the_model(db, application, monkeypatch):
+    monkeypatch.setattr(embeddings, "encode_documents", lambda texts, pooling=None: None)
+    row = _ensure(db, application)
+    db.commit()
+    assert row.semantic is None
+
+    def no_load():
+        raise AssertionError("SBERT chargé par une lecture de score")
+
+    monkeypatch.setattr(embeddings, "get_sbert_model", no_load)
+    monkeypatch.setattr(embeddings.registry, "_model", None)
+    assert application_scores.is_fresh(row, row.cv_hash, row.offer_hash)
+    assert _ensure(db, application) is row
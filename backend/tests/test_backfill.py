@@ -0,0 +1,68 @@
+from app.models.application import Application
+from app.models.parsed_cv import ParsedCV
+from app.services import bulk_ingestion
+from app.services.cv_parser import CVParser
+from app.tools import backfill
+
+
+def _stale_parsed_cvs(db, make_cv_files, n):
+    """n candidatures dont le parsing est d'une version antérieure (parser_version NULL)."""
+    make_cv_files(n)
+    application_ids = [a for (a,) in db.query(Application.id).order_by(Application.id)]
+    for application_id in application_ids:
+        db.add(ParsedCV(application_id=application_id, parser_version=None))
+    db.commit()
+    return application_ids
+
+
+def _run(monkeypatch, tmp_path, checkpoint, fail_on=None):
+    processed = []
+
+    def process_chunk(application_ids, pause):
+        if fail_on is not None and fail_on in application_ids:
+            raise RuntimeError("chunk en échec")
+        processed.extend(application_ids)
+        return len(application_ids), bulk_ingestion.IngestionStats(parsed=len(application_ids))
+
+    monkeypatch.setattr(backfill, "_process_chunk", process_chunk)
+    monkeypatch.setattr(backfill, "_live_traffic_backlogged", lambda db: False)
+    ok = backfill.run(checkpoint, tmp_path / "parse.json", None, chunk_size=3, workers=1, pause=0, throttle_seconds=0)
+    return ok, processed
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint = backfill.Checkpoint(stage="parse", version=CVParser.VERSION, since=None, watermark=42, parsed=7)
+    path = tmp_path / "sub" / "parse.json"
+    checkpoint.save(path)
+    assert backfill.Checkpoint.load(path) == checkpoint
+    assert not path.with_suffix(".tmp").exists()
+
+
+def test_failed_chunk_keeps_watermark_and_resume_finishes(db, make_cv_files, monkeypatch, tmp_path):
+    application_ids = _stale_parsed_cvs(db, make_cv_files, 10)
+    checkpoint = backfill.Checkpoint(stage="parse", version=CVParser.VERSION, since=None)
+
+    ok, processed = _run(monkeypatch, tmp_path, checkpoint, fail_on=application_ids[4])
+    assert not ok
+    assert processed == application_ids[:3]
+    saved = backfill.Checkpoint.load(tmp_path / "parse.json")
+    assert saved.watermark == application_ids[2]  # dernier chunk terminé avant l'échec
+    assert (saved.chunks, saved.applications, saved.parsed) == (1, 3, 3)
+
+    # Reprise depuis le fichier : seules les candidatures après le point de reprise
+    ok, processed = _run(monkeypatch, tmp_path, saved)
+    assert ok
+    assert processed == application_ids[3:]
+    resumed = backfill.Checkpoint.load(tmp_path / "parse.json")
+    assert resumed.watermark == application_ids[-1]
+    assert (resumed.applications, resumed.parsed) == (10, 10)
+
+
+def test_up_to_date_rows_are_not_selected(db, make_cv_files):
+    application_ids = _stale_parsed_cvs(db, make_cv_files, 4)
+    db.query(ParsedCV).filter(ParsedCV.application_id.in_(application_ids[:2])).update(
+        {ParsedCV.parser_version: CVParser.VERSION}, synchronize_session=False,
+    )
+    db.commit()
+    stale = [a for (a,) in backfill._stale_query(db, "parse", None, 0)]
+    assert stale == application_ids[2:]
@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+
+from app.services import backlog
+from app.workers.celery_app import QUEUE_EXTRACT, QUEUE_PARSE, QUEUES
+
+
+class _FakePipeline:
+    def __init__(self, lists):
+        self.lists = lists
+        self.replies = []
+
+    def llen(self, key):
+        self.replies.append(len(self.lists.get(key, [])))
+
+    def lindex(self, key, index):
+        items = self.lists.get(key, [])
+        self.replies.append(items[index] if items else None)
+
+    def execute(self):
+        return self.replies
+
+
+class _FakeRedis:
+    def __init__(self, lists):
+        self.lists = lists
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self.lists)
+
+
+def _message(enqueued_at=None):
+    headers = {"task": "app.workers.tasks.extract_cv_file"}
+    if enqueued_at is not None:
+        headers["enqueued_at"] = enqueued_at
+    return json.dumps({"headers": headers, "body": ""}).encode()
+
+
+@pytest.fixture()
+def redis_lists(monkeypatch):
+    lists = {}
+    monkeypatch.setattr(backlog, "_redis", lambda: _FakeRedis(lists))
+    return lists
+
+
+def test_read_backlog_depth_and_oldest_age(redis_lists):
+    now = time.time()
+    sep = backlog._PRIORITY_SEP
+    # LPUSH : le plus ancien message est en fin de liste
+    redis_lists[QUEUE_EXTRACT] = [_message(now - 5), _message(now - 30)]
+    redis_lists[f"{QUEUE_EXTRACT}{sep}3"] = [_message(now - 120)]
+    redis_lists[f"{QUEUE_EXTRACT}{sep}9"] = [_message(now - 1)]
+    redis_lists[QUEUE_PARSE] = [_message()]  # sans enqueued_at
+
+    result = backlog._read_backlog()
+
+    assert set(result) == set(QUEUES)
+    extract = result[QUEUE_EXTRACT]
+    assert extract.depth == 4
+    assert extract.oldest_age_seconds == pytest.approx(120, abs=2)
+    assert result[QUEUE_PARSE].depth == 1
+    assert result[QUEUE_PARSE].oldest_age_seconds is None
+    for name in set(QUEUES) - {QUEUE_EXTRACT, QUEUE_PARSE}:
+        assert (result[name].depth, result[name].oldest_age_seconds) == (0, None)
+
+
+def test_read_backlog_ignores_unparseable_messages(redis_lists):
+    redis_lists[QUEUE_EXTRACT] = [b"not json", b'{"body": ""}', b'{"headers": {"enqueued_at": "x"}}']
+    extract = backlog._read_backlog()[QUEUE_EXTRACT]
+    assert extract.depth == 3
+    assert extract.oldest_age_seconds is None
+
+
+def test_overloaded_thresholds(monkeypatch):
+    monkeypatch.setattr(backlog.settings, "BACKLOG_MAX_DEPTH", 10)
+    monkeypatch.setattr(backlog.settings, "BACKLOG_MAX_AGE_SECONDS", 60)
+    assert not backlog.QueueBacklog(QUEUE_EXTRACT, 10, 60.0).overloaded
+    assert backlog.QueueBacklog(QUEUE_EXTRACT, 11, None).overloaded
+    assert backlog.QueueBacklog(QUEUE_EXTRACT, 0, 61.0).overloaded
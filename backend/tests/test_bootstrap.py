@@ -0,0 +1,29 @@
+from app.core.config import settings
+from app.workers import bootstrap
+
+
+def test_models_for_queues():
+    assert bootstrap.models_for_queues(["cv_extract"]) == frozenset()
+    assert bootstrap.models_for_queues(["cv_parse"]) == {bootstrap.SPACY}
+    assert bootstrap.models_for_queues(["default", "cv_score"]) == {bootstrap.SBERT, bootstrap.TFIDF}
+    assert bootstrap.models_for_queues(["cv_bulk"]) == bootstrap.ALL_MODELS
+    assert bootstrap.models_for_queues(None) == bootstrap.ALL_MODELS  # claim worker
+    assert bootstrap.models_for_queues(["autre"]) == bootstrap.ALL_MODELS
+
+
+def test_extract_worker_loads_nothing(monkeypatch):
+    from app.services import embeddings, tfidf_model
+
+    def fail(*args, **kwargs):
+        raise AssertionError("modèle chargé par un worker cv_extract")
+
+    monkeypatch.setattr(settings, "WORKER_PRELOAD_MODELS", True)
+    monkeypatch.setattr(settings, "WORKER_WARMUP", True)
+    monkeypatch.setattr(embeddings, "get_sbert_model", fail)
+    monkeypatch.setattr(embeddings, "encode_texts", fail)
+    monkeypatch.setattr(tfidf_model, "get_model", fail)
+    monkeypatch.setattr(bootstrap, "_models", bootstrap.ALL_MODELS)
+
+    bootstrap.preload_models(["cv_extract"])
+    bootstrap.warm_up_child()
+    assert bootstrap._models == frozenset()
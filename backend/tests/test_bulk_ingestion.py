@@ -0,0 +1,36 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.cv_file import CVFile
+from app.services import bulk_ingestion, job_claims
+
+
+def test_long_batch_keeps_its_leases_while_extracting(db, make_cv_files, monkeypatch):
+    ids = make_cv_files(2)
+    monkeypatch.setattr(settings, "CLAIM_LEASE_SECONDS", 3.0)
+    job_claims.claim_batch(db, "w1", limit=2)
+
+    futures = [Future(), Future()]
+    reaped = []
+
+    def slow_extractions():
+        # Plus long que le lease : sans renouvellement, le reaper reprendrait le lot
+        time.sleep(4.0)
+        session = SessionLocal()
+        try:
+            reaped.extend(job_claims.reap_stalled(session).requeued)
+        finally:
+            session.close()
+        for future in futures:
+            future.set_result(None)
+
+    thread = threading.Thread(target=slow_extractions)
+    thread.start()
+    bulk_ingestion._wait_renewing_leases(db, futures, ids, "w1")
+    thread.join()
+
+    assert reaped == []
+    assert [row.claimed_by for row in db.query(CVFile).order_by(CVFile.id)] == ["w1", "w1"]
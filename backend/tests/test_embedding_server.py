@@ -0,0 +1,151 @@
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services import embeddings
+from app.services.embedding_server import (
+    _HEADER,
+    EmbeddingServer,
+    EmbeddingServerClient,
+    EmbeddingServerError,
+    _recv_exact,
+)
+
+
+class _FakeModel:
+    """Vecteur déterministe par texte (longueur, somme des codes), dim 4."""
+
+    max_seq_length = 64
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[len(t), sum(map(ord, t)) % 97, 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture()
+def server(tmp_path):
+    """Serveur sur un socket Unix temporaire, dans une boucle asyncio d'un thread dédié."""
+    model = _FakeModel()
+    srv = EmbeddingServer(model, "fake+test", max_batch=32, max_wait_ms=50)
+    path = str(tmp_path / "embeddings.sock")
+    loop = asyncio.new_event_loop()
+    loop.create_task(srv.serve(path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "embeddings.sock").exists():
+        assert time.monotonic() < deadline, "serveur non démarré"
+        time.sleep(0.01)
+    yield srv, path
+
+    async def shutdown():
+        # serve, batcher et une coroutine _serve_client par connexion restée ouverte
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+    srv._executor.shutdown(wait=True)
+
+
+def test_recv_exact_reassembles_partial_reads():
+    a, b = socket.socketpair()
+    try:
+        frame = _HEADER.pack(5) + b"hello"
+
+        def send_slowly():
+            for byte in frame:
+                b.sendall(bytes([byte]))
+                time.sleep(0.001)
+
+        sender = threading.Thread(target=send_slowly)
+        sender.start()
+        size = _HEADER.unpack(_recv_exact(a, 4))[0]
+        assert _recv_exact(a, size) == b"hello"
+        sender.join()
+    finally:
+        a.close()
+        b.close()
+
+
+def test_recv_exact_raises_when_peer_closes():
+    a, b = socket.socketpair()
+    b.sendall(b"ab")
+    b.close()
+    try:
+        with pytest.raises(ConnectionError):
+            _recv_exact(a, 4)
+    finally:
+        a.close()
+
+
+def test_client_round_trip(server):
+    srv, path = server
+    client = EmbeddingServerClient(path, timeout=5)
+
+    assert client.model_version == "fake+test"
+    assert client.max_seq_length == 64
+
+    texts = ["python", "django", "data engineer"]
+    vectors = client.encode(texts)
+    assert vectors.shape == (3, 4)
+    np.testing.assert_array_equal(vectors, _FakeModel().encode(texts))
+
+    normalized = client.encode(texts, normalize_embeddings=True)
+    np.testing.assert_allclose(np.linalg.norm(normalized, axis=1), 1.0, rtol=1e-6)
+    assert client.encode("python").shape == (4,)
+    assert client.encode([]).shape == (0, 0)
+
+
+def test_concurrent_requests_are_batched_and_routed(server):
+    srv, path = server
+    texts = [f"cv {i} " + "x" * i for i in range(16)]
+    results = {}
+
+    def worker(i):
+        # Une connexion par thread : chaque réponse doit revenir à son appelant
+        results[i] = EmbeddingServerClient(path, timeout=5).encode([texts[i]])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    expected = _FakeModel().encode(texts)
+    for i in range(len(texts)):
+        np.testing.assert_array_equal(results[i][0], expected[i])
+    assert srv.stats["texts"] == len(texts)
+    assert srv.stats["batches"] < len(texts)  # micro-batching effectif
+
+
+def test_server_error_is_reported_to_client(server):
+    _, path = server
+    client = EmbeddingServerClient(path, timeout=5)
+    with pytest.raises(EmbeddingServerError, match="unknown op"):
+        client.request({"op": "nope"})
+    # La connexion reste utilisable après une erreur applicative
+    assert client.info()["model_version"] == "fake+test"
+
+
+def test_sidecar_down_disables_sbert_instead_of_raising(tmp_path, monkeypatch):
+    registry = embeddings.EmbeddingModelRegistry(
+        "fake", server_socket=str(tmp_path / "absent.sock"), server_timeout=1.0,
+    )
+    monkeypatch.setattr(embeddings, "registry", registry)
+
+    assert registry.get() is not None  # le client se crée sans connexion
+    assert embeddings.encode_texts(["python"]) is None
+    assert embeddings.encode_document_chunks(["python"]) is None
+    assert embeddings.sbert_similarity("python", "django") == 0.0
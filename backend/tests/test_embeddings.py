@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import embeddings
+from app.services.chunking import chunk_text
+
+
+class _FakeModel:
+    """Un token par mot ; vecteur d'une fenêtre = [nombre de mots, 1], normalisé."""
+
+    max_seq_length = 18  # fenêtres de 16 tokens
+
+    def __init__(self):
+        self.calls = []
+
+    def tokenizer(self, texts, add_special_tokens=False):
+        return {"input_ids": [t.split() for t in texts]}
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.array([[len(t.split()), 1.0] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture()
+def model(monkeypatch):
+    fake = _FakeModel()
+    monkeypatch.setattr(embeddings, "get_sbert_model", lambda: fake)
+    return fake
+
+
+def _cv(n_sentences):
+    return "Expérience\n" + "\n".join(f"- mission {i} en python sur une plateforme data" for i in range(n_sentences))
+
+
+def test_chunks_of_all_documents_are_encoded_in_one_call(model):
+    docs = [_cv(1), _cv(12), "", _cv(5)]
+    chunked = embeddings.encode_document_chunks(docs)
+
+    assert len(model.calls) == 1
+    expected = [chunk_text(doc, 16, lambda texts: [len(t.split()) for t in texts]) or [doc] for doc in docs]
+    assert model.calls[0] == [chunk for chunks in expected for chunk in chunks]
+    assert [len(c) for c in chunked] == [len(c) for c in expected]
+    assert len(chunked[1]) > 1  # CV long : plusieurs fenêtres
+    assert all(len(chunk.split()) <= 16 for chunk in model.calls[0])
+
+
+def test_encode_documents_pools_and_normalizes(model, monkeypatch):
+    monkeypatch.setattr(settings, "SBERT_CHUNKING", True)
+    docs = [_cv(1), _cv(12)]
+    chunked = embeddings.encode_document_chunks(docs)
+
+    for pooling in ("mean", "max"):
+        vectors = embeddings.encode_documents(docs, pooling=pooling)
+        assert vectors.shape == (2, 2)
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
+        for vector, chunks in zip(vectors, chunked):
+            pooled = chunks.max(axis=0) if pooling == "max" else chunks.mean(axis=0)
+            np.testing.assert_allclose(vector, pooled / np.linalg.norm(pooled), rtol=1e-6)
+
+
+def test_max_sim_is_clipped():
+    chunks = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    assert embeddings.max_sim(np.array([0.6, 0.8], dtype=np.float32), chunks) == pytest.approx(0.8)
+    assert embeddings.max_sim(np.array([-1.0, 0.0], dtype=np.float32), chunks) == 0.0
+    assert embeddings.max_sim(np.array([1.0, 0.0], dtype=np.float32), np.empty((0, 2))) == 0.0
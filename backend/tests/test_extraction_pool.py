@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import extraction_pool
+from app.services.cv_extraction import ExtractionError
+from app.workers import tasks
+
+
+class _FakeChild:
+    def __init__(self, reply):
+        self.reply = reply
+        self.jobs = 0
+        self.proc = SimpleNamespace(pid=0)
+
+    def request(self, payload, timeout):
+        return self.reply
+
+    def stop(self, kill=False):
+        pass
+
+
+def _run(reply):
+    pool = extraction_pool.ExtractionPool(1)
+    return pool._run(_FakeChild(reply), "/cv/1.pdf", "application/pdf", 5)
+
+
+def test_unexpected_child_error_is_retried_by_the_extract_task():
+    with pytest.raises(extraction_pool.ExtractionRetryable):
+        _run({"ok": False, "kind": "unexpected", "error": "KeyError('x')", "rss_mb": 1})
+    assert issubclass(extraction_pool.ExtractionRetryable, tasks.extract_cv_file.autoretry_for)
+
+
+def test_document_errors_are_final():
+    with pytest.raises(ExtractionError):
+        _run({"ok": False, "kind": "extraction", "error": "bad pdf", "rss_mb": 1})
+    assert not issubclass(ExtractionError, tasks.extract_cv_file.autoretry_for)
@@ -0,0 +1,77 @@
+import threading
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.cv_file import CVFile, CVFileStatus
+from app.services import job_claims
+
+
+def test_concurrent_claims_take_disjoint_rows(db, make_cv_files):
+    ids = make_cv_files(60)
+    claimed = {}
+    errors = []
+
+    def worker(owner):
+        session = SessionLocal()
+        try:
+            while True:
+                batch = job_claims.claim_batch(session, owner, limit=7)
+                if not batch:
+                    return
+                claimed.setdefault(owner, []).extend(batch)
+        except Exception as e:  # pragma: no cover - remonté par l'assertion
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    taken = [cv_file_id for batch in claimed.values() for cv_file_id in batch]
+    assert sorted(taken) == ids  # chaque ligne prise une fois, par un seul worker
+    rows = db.query(CVFile.id, CVFile.claimed_by, CVFile.attempts, CVFile.status).all()
+    owners = {cv_file_id: owner for owner, batch in claimed.items() for cv_file_id in batch}
+    for row in rows:
+        assert row.status == CVFileStatus.EXTRACTING.value
+        assert row.claimed_by == owners[row.id]
+        assert row.attempts == 1
+
+
+def test_reap_requeues_expired_leases_and_fails_exhausted_rows(db, make_cv_files):
+    ids = make_cv_files(4)
+    job_claims.claim_batch(db, "dead-worker", limit=4, lease_seconds=-1)  # lease déjà expiré
+    db.query(CVFile).filter(CVFile.id == ids[0]).update({"attempts": settings.CLAIM_MAX_ATTEMPTS})
+    db.commit()
+
+    result = job_claims.reap_stalled(db)
+
+    assert result.failed == [ids[0]]
+    assert result.requeued == ids[1:]
+    statuses = dict(db.query(CVFile.id, CVFile.status).all())
+    assert statuses[ids[0]] == CVFileStatus.FAILED.value
+    assert all(statuses[i] == CVFileStatus.UPLOADED.value for i in ids[1:])
+    # Les lignes remises en file sont reprises au claim suivant
+    assert job_claims.claim_batch(db, "next-worker", limit=10) == ids[1:]
+
+
+def test_valid_lease_is_neither_reaped_nor_reclaimed(db, make_cv_files):
+    ids = make_cv_files(3)
+    assert job_claims.claim_batch(db, "w1", limit=3) == ids
+
+    assert job_claims.reap_stalled(db).requeued == []
+    assert job_claims.claim_batch(db, "w2", limit=3) == []
+
+
+def test_renew_only_extends_own_leases(db, make_cv_files):
+    ids = make_cv_files(4)
+    job_claims.claim_batch(db, "w1", limit=4, lease_seconds=-1)  # leases expirés, non encore repris
+    db.query(CVFile).filter(CVFile.id.in_(ids[2:])).update({"claimed_by": "w2"}, synchronize_session=False)
+    db.commit()
+
+    assert job_claims.renew(db, ids, "w1") == 2
+    result = job_claims.reap_stalled(db)
+    assert result.requeued == ids[2:]  # seuls les leases de w2 ont expiré
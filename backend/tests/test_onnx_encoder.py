@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.onnx_encoder import OnnxSentenceEncoder
+
+
+class _FakeTokenizer:
+    """Un token par mot, padding à droite jusqu'au plus long du batch."""
+
+    def encode_batch(self, texts):
+        width = max(len(t.split()) for t in texts)
+        encodings = []
+        for text in texts:
+            ids = [len(word) for word in text.split()]
+            pad = width - len(ids)
+            encodings.append(SimpleNamespace(ids=ids + [0] * pad, attention_mask=[1] * len(ids) + [0] * pad))
+        return encodings
+
+
+class _FakeSession:
+    """Embedding de token : [id, 1] ; les positions paddées valent 1000."""
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"]
+        self.batches.append(ids.shape)
+        tokens = np.stack([ids, np.ones_like(ids)], axis=-1).astype(np.float32)
+        tokens[feeds["attention_mask"] == 0] = 1000.0
+        return [tokens]
+
+
+def _encoder():
+    encoder = OnnxSentenceEncoder.__new__(OnnxSentenceEncoder)
+    encoder._raw_tokenizer = _FakeTokenizer()
+    encoder._session = _FakeSession()
+    encoder._input_names = {"input_ids", "attention_mask"}
+    return encoder
+
+
+def test_mean_pooling_ignores_padding():
+    vectors = _encoder().encode(["ab abcd", "abcdef", "a b c d"], batch_size=8)
+    np.testing.assert_allclose(vectors, [[3.0, 1.0], [6.0, 1.0], [1.0, 1.0]])
+
+
+def test_length_sorted_batches_keep_input_order():
+    encoder = _encoder()
+    texts = [" ".join("x" * (i % 5 + 1) for _ in range(i % 7 + 1)) for i in range(20)]
+    batched = encoder.encode(texts, batch_size=3, normalize_embeddings=True)
+    single = np.stack([_encoder().encode(t, normalize_embeddings=True) for t in texts])
+    np.testing.assert_allclose(batched, single, rtol=1e-6)
+    assert len(encoder._session.batches) == 7
+    assert encoder.encode([]).shape == (0, 0)
+
+
+def test_parity_with_torch_backend():
+    """Parité cosinus ONNX int8 / torch (même seuil que bench_onnx) ; nécessite le modèle exporté."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")
+    from app.services.embeddings import EmbeddingModelRegistry
+    from app.tools.bench_embeddings import _synthetic_docs
+
+    vectors = {}
+    for backend in ("onnx", "torch"):
+        registry = EmbeddingModelRegistry(settings.SBERT_MODEL_NAME, backend=backend, onnx_dir=settings.SBERT_ONNX_DIR)
+        model = registry.get()
+        if model is None:
+            pytest.skip(f"backend {backend} indisponible: {registry.stats()}")
+        vectors[backend] = np.asarray(model.encode(_synthetic_docs(50), normalize_embeddings=True))
+    cosines = np.sum(vectors["onnx"] * vectors["torch"], axis=1)
+    assert cosines.min() >= 0.98
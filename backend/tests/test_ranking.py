@@ -0,0 +1,24 @@
+import numpy as np
+
+from app.services import embeddings, ranking, token_counts
+from app.services.ranking import RankingCandidate
+
+
+def test_persisted_token_counts_are_used_without_retokenizing(monkeypatch):
+    job_text = "Développeur Python Django"
+    candidates = [
+        RankingCandidate(i, text, token_counts=token_counts.count_tokens(text))
+        for i, text in enumerate(["python django postgresql", "java spring", "python"], start=1)
+    ]
+
+    def no_tokenize(text):
+        raise AssertionError("description re-tokenisée malgré offers.token_counts")
+
+    monkeypatch.setattr(token_counts, "cached_counts", no_tokenize)
+    monkeypatch.setattr(embeddings, "encode_documents", lambda texts, pooling=None: None)
+
+    result = ranking.rank_candidates(
+        job_text, candidates, shortlist_k=0, job_counts=token_counts.count_tokens(job_text),
+    )
+    overlap = {r.application_id: r.overlap for r in result.ranked}
+    np.testing.assert_allclose([overlap[1], overlap[2], overlap[3]], [2 / 3, 0.0, 1 / 3], atol=0.01)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.services.scoring import combine_score_arrays
+
+
+def _reference(tfidf, overlap, semantic, quality=None, alpha=0.5, sbert_weight=0.6):
+    """Formule scalaire historique de combined_score."""
+    base = sbert_weight * semantic + (1 - sbert_weight) * (alpha * tfidf + (1 - alpha) * overlap)
+    if quality is not None:
+        base *= 0.9 + 0.1 * min(max(quality, 0.0), 1.0)
+    return min(max(base * 100, 0.0), 100.0)
+
+
+def test_matches_scalar_formula():
+    rng = np.random.default_rng(0)
+    tfidf, overlap, semantic, quality = rng.random((4, 50))
+    scores = combine_score_arrays(tfidf, overlap, semantic, quality, alpha=0.3, sbert_weight=0.7)
+    expected = [
+        _reference(t, o, s, q, alpha=0.3, sbert_weight=0.7)
+        for t, o, s, q in zip(tfidf, overlap, semantic, quality)
+    ]
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_quality_nan_or_missing_means_no_weighting():
+    tfidf, overlap, semantic = np.array([0.4, 0.4]), np.array([0.2, 0.2]), np.array([0.8, 0.8])
+    unweighted = combine_score_arrays(tfidf, overlap, semantic)
+    scores = combine_score_arrays(tfidf, overlap, semantic, np.array([np.nan, 0.0]))
+    assert scores[0] == pytest.approx(unweighted[0])
+    assert scores[1] == pytest.approx(unweighted[1] * 0.9)
+
+
+def test_clipped_to_0_100():
+    scores = combine_score_arrays(np.array([1.0, 0.0]), np.array([1.0, 0.0]), np.array([2.0, -1.0]), np.array([5.0, 1.0]))
+    assert scores.tolist() == [100.0, 0.0]
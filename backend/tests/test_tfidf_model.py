@@ -0,0 +1,27 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.services.tfidf_model import NGRAM_RANGE, TfidfCorpusModel
+
+CORPUS = [
+    "Développeur Python Django, API REST et PostgreSQL",
+    "Data engineer Python, Spark et Airflow",
+    "Développeur Java Spring Boot",
+    "Chef de projet agile, Scrum",
+]
+
+
+def test_loaded_model_matches_sklearn_and_keeps_idf_mapped(tmp_path):
+    TfidfCorpusModel.fit(CORPUS, min_df=1).save(tmp_path)
+    model = TfidfCorpusModel.load(tmp_path)
+    assert isinstance(model.idf, np.memmap)
+
+    reference = TfidfVectorizer(ngram_range=NGRAM_RANGE, dtype=np.float32).fit(CORPUS)
+    texts = ["Python et Django", "Scrum master", "", "Rust"]
+    expected = reference.transform(texts)
+    # Même vocabulaire, ordre des colonnes éventuellement différent
+    order = [reference.vocabulary_[t] for t in sorted(model._counter.vocabulary, key=model._counter.vocabulary.get)]
+    np.testing.assert_allclose(model.transform(texts).toarray(), expected.toarray()[:, order], rtol=1e-5, atol=1e-7)
+
+    scores = model.cosine_scores("Développeur Python", CORPUS)
+    assert np.argmax(scores) == 0